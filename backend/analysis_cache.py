@@ -0,0 +1,283 @@
+# =============================================================================
+# Video Analysis Cache Module
+# =============================================================================
+# This file keeps the per-frame detections of analyzed videos on disk, so
+# re-uploading the same recording does not run YOLO again.
+#
+# How it works:
+#   - Entries are keyed by the video's content hash (SHA-256) plus a
+#     fingerprint of the detector configuration (model, backend,
+#     confidence, cascade settings). Renaming a file still hits the
+#     cache; changing the detector misses it.
+#   - An entry stores the detections of every frame analyzed so far,
+#     by frame index, plus the finished result of each analysis setting.
+#     A re-upload with the same settings returns the stored result at
+#     once; another frame_skip (or progressive mode) only runs YOLO on
+#     frames not cached yet.
+#   - Entries are JSON files in ANALYSIS_CACHE_DIR. Reading an entry
+#     refreshes its modification time, and the least recently used
+#     entries are deleted when the directory grows past
+#     ANALYSIS_CACHE_MAX_MB (0 disables the cache).
+# =============================================================================
+
+import hashlib
+import json
+import os
+import threading
+
+from .detector_registry import BASE_DIR, MODEL_PATH
+from .person_detect import CASCADE_IMGSZ, CASCADE_MARGIN, get_backend
+
+# Cache location and size limit (overridable through environment variables)
+ANALYSIS_CACHE_DIR = os.environ.get("ANALYSIS_CACHE_DIR", str(BASE_DIR / ".analysis_cache"))
+ANALYSIS_CACHE_MAX_MB = float(os.environ.get("ANALYSIS_CACHE_MAX_MB", "256"))
+
+# Bump when the stored format or the detection pipeline changes
+CACHE_VERSION = 1
+
+# Read size for hashing video files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """
+    Hash a file's content.
+
+    Parameters:
+        path: Path to the file
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detector_fingerprint(conf, backend=None, cascade=True):
+    """
+    Fingerprint the detector configuration used for an analysis.
+
+    Parameters:
+        conf: Confidence threshold
+        backend: Inference backend (default DETECTOR_BACKEND)
+        cascade: Whether the occupancy cascade is used
+
+    Returns:
+        Short hex string - equal fingerprints mean equal detections
+    """
+    model_size = MODEL_PATH.stat().st_size if MODEL_PATH.exists() else 0
+    config = {
+        "version": CACHE_VERSION,
+        "model": [MODEL_PATH.name, model_size],
+        "backend": get_backend(backend),
+        "conf": conf,
+        "cascade": [CASCADE_IMGSZ, CASCADE_MARGIN] if cascade else None
+    }
+    encoded = json.dumps(config, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _encode_boxes(boxes):
+    """Round boxes for storage (pixels to 0.1, confidence to 0.001)."""
+    return [
+        [round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1), round(conf, 3)]
+        for x1, y1, x2, y2, conf in boxes
+    ]
+
+
+class AnalysisCache:
+    """
+    Size-bounded on-disk LRU cache of per-frame video detections.
+
+    Attributes:
+        directory: Folder holding the entry files
+        max_bytes: Total size limit (0 = cache disabled)
+    """
+
+    def __init__(self, directory=ANALYSIS_CACHE_DIR, max_mb=ANALYSIS_CACHE_MAX_MB):
+        """
+        Initialize the cache.
+
+        Parameters:
+            directory: Cache folder (default ANALYSIS_CACHE_DIR)
+            max_mb: Size limit in megabytes (default ANALYSIS_CACHE_MAX_MB)
+        """
+        self.directory = str(directory)
+        self.max_bytes = int(max(0.0, max_mb) * 1024 * 1024)
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, digest, fingerprint):
+        return os.path.join(self.directory, f"{digest}-{fingerprint}.json")
+
+    def load(self, digest, fingerprint):
+        """
+        Get the cached detections of a video.
+
+        Parameters:
+            digest: Video content hash (see file_digest)
+            fingerprint: Detector fingerprint (see detector_fingerprint)
+
+        Returns:
+            Dictionary with:
+            - frames: {frame_index: [(x1, y1, x2, y2, conf), ...]}
+            - results: {settings key: analysis result}
+            or None if the video is not cached
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(digest, fingerprint)
+        with self._lock:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+                os.utime(path)  # mark as recently used
+            except (OSError, ValueError):
+                self._misses += 1
+                return None
+            self._hits += 1
+
+        return {
+            "frames": {
+                int(index): [tuple(box) for box in boxes]
+                for index, boxes in entry["frames"].items()
+            },
+            "results": entry.get("results", {})
+        }
+
+    def store(self, digest, fingerprint, frames, results=None):
+        """
+        Save the detections of a video (replacing its entry).
+
+        Parameters:
+            digest: Video content hash
+            fingerprint: Detector fingerprint
+            frames: {frame_index: boxes} - every frame analyzed so far
+            results: {settings key: analysis result}
+        """
+        if not self.enabled:
+            return
+
+        entry = {
+            "version": CACHE_VERSION,
+            "results": results or {},
+            "frames": {str(index): _encode_boxes(boxes) for index, boxes in sorted(frames.items())}
+        }
+
+        path = self._path(digest, fingerprint)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Write to a temporary file first so readers never see half an entry
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(temp_path, path)
+
+            self._evict(keep=path)
+
+    def _entries(self):
+        """List (mtime, size, path) of the entry files, oldest first (lock held)."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return sorted(entries)
+
+    def _evict(self, keep=None):
+        """Delete least recently used entries beyond max_bytes (lock held)."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            self._evictions += 1
+
+    def clear(self):
+        """Delete every entry."""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        """
+        Get cache usage.
+
+        Returns:
+            Dictionary with entries, size, limit, hits, misses and evictions
+        """
+        with self._lock:
+            entries = self._entries()
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions
+            }
+
+
+# =============================================================================
+# Global Analysis Cache
+# =============================================================================
+# One cache for the whole API process, created on first use.
+# =============================================================================
+
+# The shared cache (None until first use)
+_analysis_cache = None
+
+# Lock for creating the cache
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """
+    Get the process-wide analysis cache, creating it on first use.
+
+    Returns:
+        AnalysisCache instance
+    """
+    global _analysis_cache
+
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisCache()
+        return _analysis_cache
@@ -10,32 +10,75 @@
 #   - POST /api/cctv/connect: Connect to CCTV camera
 #   - POST /api/cctv/disconnect: Disconnect from CCTV camera
 #   - GET /api/stream/{room_id}: Stream video with detection overlays
+#   - GET /api/stream/mosaic: Stream several rooms tiled into one video
 #   - POST /api/webcam/test/start: Start webcam demo mode
 #   - POST /api/webcam/test/stop: Stop webcam demo mode
-#   - POST /api/video/upload: Upload and analyze video file
+#   - POST /api/video/upload: Upload a video and queue its analysis
+#   - GET /api/video/jobs/{job_id}: Analysis progress, ETA and result
+#   - GET /api/video/cache: Usage of the on-disk video analysis cache
+#   - GET /api/video/sessions: Uploaded-video sessions, disk use, evictions
+#   - POST /api/video/upload/stream: Upload a video as the raw request body
+#   - POST /api/video/uploads: Start a resumable (chunked) upload
 #
 # All endpoints return JSON responses and handle errors appropriately.
+#
+# Startup speed: the vision stack (cv2, numpy, ultralytics/torch) is only
+# imported inside the functions that need it, so importing this module
+# (every uvicorn --reload restart) stays cheap. backend/test_import_time.py
+# guards this.
 # =============================================================================
 
-import cv2
-import numpy as np
 from contextlib import asynccontextmanager
 
 import os
-import shutil
-from pathlib import Path
-from tempfile import NamedTemporaryFile
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.requests import ClientDisconnect
 
 # Import local modules
 from .room_config import get_initial_rooms_state
 from .energy_logic import auto_control
 from .multi_room_energy import start_ai_process, stop_ai_process
-from .person_detect import count_people
+from .person_detect import get_backend, export_model, get_cascade_stats, result_boxes
+from .detector_registry import DEFAULT_BACKEND, get_registry
+from .inference_scheduler import get_scheduler, shutdown_scheduler
+from .motion_gate import get_motion_stats
+from .detection_rate import DEFAULT_POLICY, get_detection_rates
+from .roi import RegionOfInterest
+from .warmup import get_readiness, start_warmup
+from .analysis_cache import get_analysis_cache
+from .video_analysis import ANALYSIS_MODES, analyze_video_file
+from .video_jobs import JobQueueFullError, get_job_manager, shutdown_job_manager
+from .video_replay import annotate_frame, get_replay
+from .video_proxy import create_proxy, get_proxy, start_proxy_render
+from .video_sessions import (
+    SessionBusyError,
+    SessionQuotaError,
+    get_session_manager,
+    shutdown_session_manager,
+)
+from .frame_broadcast import FULL_VARIANT, multipart_chunk, stream_variant
+from .mosaic import (
+    MOSAIC_FPS,
+    MOSAIC_MAX_FPS,
+    MOSAIC_MAX_ROOMS,
+    MOSAIC_TILE_WIDTH,
+    MOSAIC_TILE_WIDTH_RANGE,
+    get_mosaic,
+    get_mosaic_stats,
+    stop_all_mosaics,
+)
+from .video_ingest import (
+    IngestUpload,
+    UploadOffsetError,
+    UploadTooLargeError,
+    get_upload_manager,
+    shutdown_upload_manager,
+)
 from .cctv_stream import (
     create_stream_processor,
     get_stream_processor,
@@ -53,6 +96,7 @@ from .webcam_stream import (
 # Lifespan Context Manager
 # =============================================================================
 # Handles startup and shutdown events for the FastAPI application.
+# On startup, warms the configured detectors in the background.
 # On shutdown, cleans up all running processes and stream processors.
 # =============================================================================
 
@@ -61,19 +105,33 @@ async def lifespan(app):
     """
     Lifespan context manager for FastAPI application.
     
-    Startup: Prints welcome message
+    Startup: Prints welcome message and starts detector warm-up
+             (in the background - the server accepts requests at once)
     Shutdown: Stops all AI processes and cleans up resources
     """
     # Startup
     print("Energy AI Management Backend starting up...")
     
+    # Load and warm the default detector plus any room-specific ones,
+    # so no request handler pays the model load cost
+    backends = [DEFAULT_BACKEND] + [
+        room["detector_backend"]
+        for room in rooms_state.values()
+        if room.get("detector_backend")
+    ]
+    start_warmup(backends)
+    
+    # Remove abandoned video uploads in the background
+    get_session_manager().start_reaper()
+    
     yield  # Application runs here
     
     # Shutdown
     print("Shutting down server and stopping processes...")
     global webcam_test_process
     
-    # Clean up all CCTV stream processors
+    # Stop the mosaic streams, then clean up all CCTV stream processors
+    stop_all_mosaics()
     cleanup_all_processors()
     
     # Stop webcam test process if running
@@ -89,6 +147,16 @@ async def lifespan(app):
     for room_id in rooms_state:
         stop_ai_process(rooms_state, room_id)
     
+    # Drop queued video analysis jobs, unfinished uploads and the
+    # uploaded video sessions
+    shutdown_job_manager()
+    shutdown_upload_manager()
+    shutdown_session_manager()
+    
+    # Stop batched inference and drop all shared detectors
+    shutdown_scheduler()
+    get_registry().unload_all()
+    
     print("All processes stopped")
 
 
@@ -125,12 +193,11 @@ rooms_state = get_initial_rooms_state()
 # Reference to webcam test process (if running)
 webcam_test_process = None
 
-# Storage for uploaded videos (session_id -> file_path)
-_uploaded_videos = {}
+# Uploads are written to disk in chunks of this size (1 MB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-# Storage for video stream occupancy state
-# session_id -> {occupied, person_count, light, ac, room_id}
-_video_occupancy_state = {}
+# Uploaded videos and their stream state live in the session manager
+# (see video_sessions.py) - expired and over-quota sessions are removed
 
 
 # =============================================================================
@@ -182,226 +249,489 @@ class AiModeRequest(BaseModel):
     ai_mode: str
 
 
+class DetectorBackendRequest(BaseModel):
+    """Request model for choosing a room's detector backend."""
+    room_id: str
+    backend: str = ""
+
+
+class DetectionPolicyRequest(BaseModel):
+    """Request model for a room's adaptive detection rate policy."""
+    room_id: str
+    fast_interval: float | None = None
+    slow_interval: float | None = None
+    settle_seconds: float | None = None
+    borderline_margin: float | None = None
+
+
+class RoiRequest(BaseModel):
+    """Request model for a room's region of interest."""
+    room_id: str
+    polygon: list[list[float]] = []
+
+
+class Int8CalibrationRequest(BaseModel):
+    """Request model for building the INT8 detector."""
+    max_frames: int = 200
+
+
 # =============================================================================
 # Helper Functions
 # =============================================================================
 
-def _save_upload_to_temp(upload_file):
+async def _save_upload_to_temp(upload_file):
     """
     Saves an uploaded file to a temporary location.
     
+    The upload is copied in chunks, with each write (and the content
+    hash) done in a worker thread, so other requests and streams keep
+    running meanwhile.
+    
     Parameters:
         upload_file: The uploaded file from FastAPI
     
     Returns:
-        Path to the saved temporary file
-    """
-    # Get file extension from original filename
-    suffix = Path(upload_file.filename or "upload").suffix or ".mp4"
+        (path, digest) - the saved temporary file and its SHA-256
     
-    # Create temporary file
-    tmp_file = NamedTemporaryFile(delete=False, suffix=suffix)
+    Raises:
+        UploadTooLargeError: If the file is over VIDEO_UPLOAD_MAX_MB
+    """
+    upload = IngestUpload(upload_file.filename, getattr(upload_file, "size", None))
     
     try:
-        # Copy uploaded content to temp file
-        shutil.copyfileobj(upload_file.file, tmp_file)
-    finally:
-        tmp_file.close()
-    
-    return tmp_file.name
+        # Copy uploaded content to temp file, one chunk at a time
+        while True:
+            chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_in_threadpool(upload.write, chunk)
+        return upload.finish()
+    except Exception:
+        upload.abort()
+        raise
 
 
-def _analyze_video_file(video_path, room_id, frame_skip=5):
+async def _receive_request_body(upload, request, offset=None):
     """
-    Analyzes a video file for person detection.
+    Append a request body to an upload as it arrives.
+    
+    The body is never held in memory: received data is written to the
+    upload's file (and hash) whenever a full UPLOAD_CHUNK_SIZE buffer
+    has arrived. If the client disconnects, the data received so far is
+    kept, so a resumable upload can continue from upload.received.
     
     Parameters:
-        video_path: Path to the video file
-        room_id: ID of the room for simulation
-        frame_skip: Process every Nth frame (default 5)
+        upload: IngestUpload to append to
+        request: The incoming request
+        offset: Where the body starts in the file (None = don't check)
     
     Returns:
-        Dictionary with analysis results including:
-        - frames_total: Total frames in video
-        - frames_analyzed: Number of frames analyzed
-        - fps: Frames per second
-        - duration_seconds: Video duration
-        - occupied_frames: Frames with people detected
-        - occupancy_ratio: Ratio of occupied frames
-        - events: List of occupancy change events
-    """
-    # Validate frame_skip
+        True if the whole body arrived, False if the client disconnected
+    
+    Raises:
+        UploadOffsetError: If offset is not where the upload stopped
+        UploadTooLargeError: If the upload goes past its size limit
+        ValueError: If another request is sending to the same upload
+    """
+    length = request.headers.get("content-length", "")
+    upload.begin(offset, int(length) if length.isdigit() else 0)
+    
+    buffer = bytearray()
+    complete = True
+    try:
+        try:
+            async for chunk in request.stream():
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await run_in_threadpool(upload.write, bytes(buffer))
+                    buffer.clear()
+        except ClientDisconnect:
+            # Keep what arrived - the client resumes from the upload offset
+            complete = False
+        if buffer:
+            await run_in_threadpool(upload.write, bytes(buffer))
+    finally:
+        upload.end()
+    
+    return complete
+
+
+def _validate_analysis_options(frame_skip, sample_seconds, mode):
+    """
+    Check video analysis options before a video is accepted.
+    
+    Raises:
+        HTTPException: 400 if an option is invalid
+    """
     if frame_skip < 1:
         raise HTTPException(status_code=400, detail="frame_skip must be >= 1")
+    if sample_seconds < 0:
+        raise HTTPException(status_code=400, detail="sample_seconds must be >= 0")
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"mode must be one of: {', '.join(ANALYSIS_MODES)}"
+        )
 
-    # Open video file
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise HTTPException(status_code=400, detail="Could not read uploaded video")
-
-    # Get video properties
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
-    duration_seconds = total_frames / fps if fps else 0.0
-
-    # Initialize simulation state
-    sim_state = {room_id: {"occupied": False, "light": False, "ac": False}}
-    events = []
-    occupied_frames = 0
-    frames_analyzed = 0
-    previous_occupied = None
-    frame_index = 0
 
+def _analyze_session_video(session, *args, render_proxy=False, **kwargs):
+    """
+    Job body: analyze a session's video, keeping the session busy (and
+    its file safe from eviction) until the analysis ends. A requested
+    proxy is rendered afterwards, from the stored detections.
+    """
     try:
-        # Process each frame
-        while True:
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                break
+        return analyze_video_file(*args, **kwargs)
+    finally:
+        if render_proxy:
+            # The render keeps the session busy in turn
+            session.add_job(1)
+            start_proxy_render(session.session_id, lambda: session.add_job(-1))
+        session.add_job(-1)
 
-            # Skip frames for performance
-            if frame_skip > 1 and frame_index % frame_skip != 0:
-                frame_index += 1
-                continue
 
-            # Run person detection
-            people_count = count_people(frame)
-            occupied = people_count > 0
+def _queue_video_analysis(temp_path, digest, room_id, frame_skip, parallel,
+                          sample_seconds, mode, proxy):
+    """
+    Register an uploaded video as a session and queue its analysis.
+    
+    Parameters:
+        temp_path: Path to the received video (owned by the session from
+                   here on, deleted if anything fails)
+        digest: Content hash of the video (None to hash it when analyzing)
+        room_id, frame_skip, parallel, sample_seconds, mode, proxy:
+            Analysis options (see upload_video)
+    
+    Returns:
+        The queued job (job_id, session_id, status)
+    
+    Raises:
+        HTTPException: 413 over the session disk quota, 429 if the job
+                       queue is full or every session is in use, 500 on
+                       other errors
+    """
+    session = None
+    sessions = get_session_manager()
+    
+    try:
+        # Register the video for streaming (may evict idle sessions).
+        # The session is busy until its analysis job ends.
+        session = sessions.create(temp_path, room_id, digest=digest, jobs=1)
+        session_id = session.session_id
+        get_replay(temp_path, digest)
+        
+        # The proxy shows as pending until the analysis is done
+        if proxy:
+            create_proxy(session_id, temp_path)
+        
+        # Queue the analysis (then the proxy render)
+        job = get_job_manager().submit(
+            _analyze_session_video,
+            session,
+            temp_path,
+            room_id,
+            frame_skip,
+            parallel=parallel,
+            sample_seconds=sample_seconds or None,
+            mode=mode,
+            digest=digest,
+            render_proxy=proxy,
+            metadata={"session_id": session_id, "room_id": room_id}
+        )
+        
+        return job.to_dict()
+        
+    except SessionBusyError as e:
+        os.unlink(temp_path)
+        raise HTTPException(status_code=429, detail=str(e))
+    except SessionQuotaError as e:
+        os.unlink(temp_path)
+        raise HTTPException(status_code=413, detail=str(e))
+    except JobQueueFullError as e:
+        sessions.remove(session.session_id)
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        if session is not None:
+            sessions.remove(session.session_id)
+        elif os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise HTTPException(status_code=500, detail=f"Error uploading video: {str(e)}")
 
-            # Count occupied frames
-            if occupied:
-                occupied_frames += 1
 
-            # Update simulation state
-            sim_state[room_id]["occupied"] = occupied
-            
-            # Record event if occupancy changed
-            if previous_occupied is None or occupied != previous_occupied:
-                auto_control(sim_state, room_id)
-                events.append({
-                    "frame_index": frame_index,
-                    "time_seconds": round(frame_index / fps, 2) if fps else 0.0,
-                    "occupied": occupied,
-                    "light": sim_state[room_id]["light"],
-                    "ac": sim_state[room_id]["ac"],
-                    "person_count": people_count
-                })
-                previous_occupied = occupied
-
-            frames_analyzed += 1
-            frame_index += 1
-            
-    finally:
-        cap.release()
+def _stream_variant(max_width, quality, max_fps):
+    """
+    Validate a viewer's stream options.
+    
+    Parameters:
+        max_width: Largest frame width in pixels (0 = original)
+        quality: JPEG quality (0 = stream default)
+        max_fps: Most frames per second (0 = every frame)
+    
+    Returns:
+        Variant key for FrameBroadcaster (see stream_variant)
+    
+    Raises:
+        HTTPException: 400 if an option is negative or quality is over 100
+    """
+    if max_width < 0 or max_fps < 0:
+        raise HTTPException(status_code=400, detail="max_width and max_fps must be >= 0")
+    if not 0 <= quality <= 100:
+        raise HTTPException(status_code=400, detail="quality must be between 0 and 100")
+    
+    return stream_variant(max_width, quality)
 
-    # Calculate occupancy ratio
-    occupancy_ratio = (occupied_frames / frames_analyzed) if frames_analyzed else 0.0
 
-    return {
-        "room_id": room_id,
-        "frames_total": total_frames,
-        "frames_analyzed": frames_analyzed,
-        "fps": round(float(fps), 2),
-        "duration_seconds": round(duration_seconds, 2),
-        "occupied_frames": occupied_frames,
-        "occupancy_ratio": round(occupancy_ratio, 3),
-        "events": events
-    }
+def _frame_step(fps, max_fps):
+    """Send every Nth frame of a fps video to stay under max_fps."""
+    import math
+    
+    if not max_fps or max_fps >= fps:
+        return 1
+    return math.ceil(fps / max_fps)
+
+
+def _init_video_occupancy(session):
+    """
+    Reset the occupancy state of a video session.
+    
+    Parameters:
+        session: VideoSession being streamed
+    """
+    session.occupancy.update({
+        "occupied": False,
+        "person_count": 0,
+        "light": False,
+        "ac": False,
+        "room_id": session.room_id
+    })
+    session.occupancy.pop("occupied_prev", None)
 
 
-def _generate_video_stream_with_detection(video_path, session_id):
+def _update_video_occupancy(session, people_count):
     """
-    Generator that streams video frames with YOLO person detection overlays.
+    Record the person count of the frame being streamed.
     
-    Yields MJPEG frames for browser streaming.
+    Parameters:
+        session: VideoSession being streamed
+        people_count: People in the current frame
+    
+    Returns:
+        Whether the simulated light is on
+    """
+    state = session.occupancy
+    room_id = session.room_id
+    occupied = people_count > 0
+    
+    # A stream keeps its session alive
+    session.touch()
+    
+    # Update occupancy state
+    state["person_count"] = people_count
+    state["occupied"] = occupied
+    
+    # Simulate energy control when occupancy changes
+    if occupied != state.get("occupied_prev"):
+        sim_state = {room_id: {"occupied": occupied, "light": False, "ac": False}}
+        auto_control(sim_state, room_id)
+        state["light"] = sim_state[room_id]["light"]
+        state["ac"] = sim_state[room_id]["ac"]
+        state["occupied_prev"] = occupied
+    
+    return state["light"]
+
+
+async def _generate_video_stream_with_detection(session, variant=FULL_VARIANT, max_fps=None):
+    """
+    Async generator that streams video frames with YOLO person detection overlays.
+    
+    Yields MJPEG frames for browser streaming. Detections are replayed
+    from the video's ReplayDetections store (seeded by the upload
+    analysis), so YOLO only runs on frames no pass has detected yet -
+    after the first loop the stream only decodes, draws and encodes.
+    
+    Each frame is decoded, annotated and encoded in the event loop's
+    default executor, and the stream is paced at the video's frame rate
+    with asyncio.sleep. A viewer holds a worker thread only while one
+    frame is being rendered, never one of the threadpool workers that
+    run the sync endpoints - this is what viewers of an upload get until
+    its proxy (proxy=true) is ready.
     
     Parameters:
-        video_path: Path to video file
-        session_id: Session identifier for tracking state
+        session: VideoSession to stream (holds the video and its state)
+        variant: (max_width, quality) for this viewer (see stream_variant)
+        max_fps: Frames per second of video to send (others are skipped)
     """
-    # Open video file
-    cap = cv2.VideoCapture(video_path)
+    import asyncio
+    import time
+
+    import cv2
+
+    loop = asyncio.get_running_loop()
+    
+    # Open video file (off the event loop - opening probes the file)
+    video_path = session.video_path
+    session_id = session.session_id
+    cap = await loop.run_in_executor(None, cv2.VideoCapture, video_path)
     
     if not cap.isOpened():
         return
     
+    # This viewer's size, quality and frame rate
+    max_width, quality = variant
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, quality] if quality else []
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    step = _frame_step(fps, max_fps)
+    interval = step / fps
+    
     # Initialize occupancy state for this session
-    room_id = _video_occupancy_state.get(session_id, {}).get("room_id", "UploadedVideo")
-    _video_occupancy_state[session_id] = {
-        "occupied": False,
-        "person_count": 0,
-        "light": False,
-        "ac": False,
-        "room_id": room_id
-    }
+    _init_video_occupancy(session)
+    session.add_viewer(1)
     
-    frame_count = 0
+    # Detection runs through the shared inference scheduler, batched
+    # with the CCTV and webcam streams
+    scheduler = get_scheduler()
+    source = f"video:{session_id}"
+    scheduler.register_source(source)
     
-    while True:
-        ret, frame = cap.read()
+    def detect(frame):
+        return result_boxes(scheduler.detect(frame, source, conf=0.4, classes=[0]))
+    
+    # Detections shared by every viewer of this video
+    replay = get_replay(video_path)
+    
+    frame_index = 0
+    held = None
+    
+    def render_next():
+        """
+        Decode, annotate and encode the next frame (runs in a worker thread).
+        
+        Returns:
+            Multipart chunk (empty if encoding failed), or None if the
+            video can't be read
+        """
+        nonlocal frame_index, held
         
+        ret, frame = cap.read()
         if not ret:
-            # Loop back to start when video ends
+            # Loop back to start when video ends (and pick up the
+            # analysis detections if the job finished meanwhile)
             cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            continue
-        
-        # Run person detection
-        people_count = count_people(frame)
-        occupied = people_count > 0
-        
-        # Update occupancy state
-        _video_occupancy_state[session_id]["person_count"] = people_count
-        _video_occupancy_state[session_id]["occupied"] = occupied
-        
-        # Simulate energy control when occupancy changes
-        if occupied != _video_occupancy_state[session_id].get("occupied_prev"):
-            sim_state = {room_id: {"occupied": occupied, "light": False, "ac": False}}
-            auto_control(sim_state, room_id)
-            _video_occupancy_state[session_id]["light"] = sim_state[room_id]["light"]
-            _video_occupancy_state[session_id]["ac"] = sim_state[room_id]["ac"]
-            _video_occupancy_state[session_id]["occupied_prev"] = occupied
-        
-        # Draw detection boxes using YOLO
-        from ultralytics import YOLO
-        from pathlib import Path as PathlibPath
-        MODEL_PATH = PathlibPath(__file__).resolve().parent.parent / "yolov8n.pt"
-        model = YOLO(MODEL_PATH)
-        results = model(frame, conf=0.4, classes=[0], verbose=False)
+            replay.seed_from_analysis()
+            frame_index = 0
+            held = None
+            ret, frame = cap.read()
+            if not ret:
+                return None
         
-        # Draw bounding boxes for each detected person
-        # Draw bounding boxes for each detected person
-        if results[0] and results[0].boxes:
-            for box in results[0].boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = box.conf[0]
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                label = f"Person {confidence:.2f}"
-                cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        # Stored boxes for this frame, else the recent boxes, else
+        # run detection once and store it for later loops/viewers
+        boxes, held = replay.boxes_for(frame_index, frame, detect, held)
         
-        # Draw overlay with status information
-        cv2.rectangle(frame, (0, 0), (400, 90), (0, 0, 0), -1)
-        cv2.putText(frame, f"People: {people_count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+        light = _update_video_occupancy(session, len(boxes))
         
-        # Draw occupancy status
-        status_color = (0, 0, 255) if people_count > 0 else (0, 255, 0)
-        occupancy_text = "OCCUPIED" if people_count > 0 else "EMPTY"
-        cv2.putText(frame, occupancy_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
+        # Downscale for this viewer, then draw (boxes are in
+        # original video pixels)
+        height, width = frame.shape[:2]
+        scale = 1.0
+        if max_width and width > max_width:
+            scale = max_width / width
+            frame = cv2.resize(
+                frame, (max_width, max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+        annotate_frame(frame, boxes, light, scale)
         
-        # Draw power status
-        light_color = (0, 255, 0) if _video_occupancy_state[session_id]["light"] else (0, 0, 255)
-        light_text = "💡 ON" if _video_occupancy_state[session_id]["light"] else "💡 OFF"
-        cv2.putText(frame, light_text, (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, light_color, 2)
+        # Skip the frames over this viewer's max fps
+        for _ in range(step - 1):
+            if not cap.grab():
+                break
+            frame_index += 1
+        frame_index += 1
         
         # Encode frame as JPEG for streaming
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if ret:
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        frame_count += 1
+        ret, buffer = cv2.imencode('.jpg', frame, encode_params)
+        return multipart_chunk(buffer.tobytes()) if ret else b""
+    
+    def cleanup(_=None):
+        # Leave the batch and close the file
+        scheduler.unregister_source(source)
+        cap.release()
+        session.add_viewer(-1)
+    
+    pending = loop.run_in_executor(None, replay.seed_from_analysis)
+    next_frame_at = time.monotonic()
+    
+    try:
+        await pending
+        while True:
+            pending = loop.run_in_executor(None, render_next)
+            chunk = await pending
+            if chunk is None:
+                return
+            if chunk:
+                yield chunk
+            
+            # Keep the original playback speed
+            next_frame_at += interval
+            delay = next_frame_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_frame_at = time.monotonic()
+    
+    finally:
+        # Client disconnected - a frame still rendering keeps using the
+        # capture, so clean up once it is done
+        if pending.done():
+            cleanup()
+        else:
+            pending.add_done_callback(cleanup)
+
+
+async def _generate_video_stream_from_proxy(proxy, session, max_fps=None):
+    """
+    Async generator that streams a pre-rendered video proxy.
+    
+    Frames are served straight from the proxy's memory-mapped segment
+    file at the video's frame rate - no decoding, drawing or encoding,
+    and no worker thread: pacing is an asyncio sleep.
+    
+    Parameters:
+        proxy: Ready VideoProxy of the session
+        session: VideoSession being streamed
+        max_fps: Frames per second of video to send (others are skipped;
+                 size and quality are fixed when the proxy is rendered)
+    """
+    import asyncio
+    import time
+
+    _init_video_occupancy(session)
+    session.add_viewer(1)
     
-    cap.release()
+    fps = proxy.fps or 25.0
+    step = _frame_step(fps, max_fps)
+    interval = step / fps
+    next_frame_at = time.monotonic()
+    
+    try:
+        while True:
+            for index in range(0, proxy.frame_count, step):
+                _update_video_occupancy(session, proxy.person_count(index))
+                yield proxy.frame(index)
+                
+                # Keep the original playback speed
+                next_frame_at += interval
+                delay = next_frame_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    next_frame_at = time.monotonic()
+    except ValueError:
+        # Proxy closed (session cleaned up) while streaming
+        return
+    finally:
+        session.add_viewer(-1)
 
 
 # =============================================================================
@@ -428,6 +758,39 @@ class VideoAnalysisResponse(BaseModel):
     occupied_frames: int
     occupancy_ratio: float
     events: list
+    processes: int = 1
+    sampling: dict | None = None
+    mode: str = "dense"
+    progressive: dict | None = None
+    cache: dict | None = None
+
+
+class VideoJobResponse(BaseModel):
+    """Response model for a video analysis job."""
+    job_id: str
+    status: str
+    session_id: str | None = None
+    room_id: str | None = None
+    progress: dict
+    eta_seconds: float | None = None
+    result: VideoAnalysisResponse | None = None
+    error: str | None = None
+
+
+class UploadCreateRequest(BaseModel):
+    """Request model for starting a resumable upload."""
+    filename: str = "upload"
+    size: int | None = None
+
+
+class UploadCompleteRequest(BaseModel):
+    """Request model for finishing a resumable upload (analysis options)."""
+    room_id: str = "UploadedVideo"
+    frame_skip: int = 5
+    parallel: bool = False
+    sample_seconds: float = 0.0
+    mode: str = "dense"
+    proxy: bool = False
 
 
 # =============================================================================
@@ -445,6 +808,21 @@ def root():
     return {"message": "Energy Management Backend Running", "version": "1.0.0"}
 
 
+@app.get("/api/ready")
+def readiness():
+    """
+    Readiness check - are the detectors loaded and warm?
+
+    Returns 503 while warm-up is still running (or failed), so a load
+    balancer or the frontend can wait before starting cameras.
+
+    Returns:
+        Dictionary with "ready" and the warm-up state of each backend
+    """
+    state = get_readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
 @app.get("/api/rooms", response_model=AllRoomsResponse)
 def get_rooms_status():
     """
@@ -506,73 +884,571 @@ def update_occupancy(data: OccupancyUpdate):
     }
 
 
+# =============================================================================
+# Detector Registry Endpoints
+# =============================================================================
+# All rooms share one copy of each detector. These endpoints show what is
+# loaded and allow loading/unloading detectors explicitly.
+# =============================================================================
+
+@app.get("/api/detectors")
+def get_detectors():
+    """
+    Get the detectors currently loaded in the shared registry.
+
+    Returns:
+        List of detectors with their reference counts
+    """
+    return {"detectors": get_registry().stats()}
+
+
+@app.post("/api/detectors/warm")
+def warm_detector():
+    """
+    Load the default detector and keep it resident.
+
+    Returns:
+        Updated list of loaded detectors
+    """
+    try:
+        get_registry().warm()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"status": "warm", "detectors": get_registry().stats()}
+
+
+@app.post("/api/detectors/unload")
+def unload_detector():
+    """
+    Unpin the default detector so it is unloaded once no room uses it.
+
+    Returns:
+        Whether the detector was removed, and the loaded detectors
+    """
+    removed = get_registry().unload()
+
+    return {"status": "unloaded" if removed else "in use", "detectors": get_registry().stats()}
+
+
+@app.post("/api/detector/backend")
+def set_room_detector_backend(data: DetectorBackendRequest):
+    """
+    Choose the detector backend used by a room's camera.
+
+    Rooms that only need an occupied/empty signal can use the cheaper
+    "int8" model. Takes effect the next time the room's camera or AI
+    process is started.
+
+    Parameters:
+        data: DetectorBackendRequest with room_id and backend
+              ("" for the server default)
+
+    Returns:
+        The room and its backend
+    """
+    if data.room_id not in rooms_state:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    backend = data.backend.strip().lower()
+
+    if backend:
+        try:
+            backend = get_backend(backend)
+            export_model(backend)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    rooms_state[data.room_id]["detector_backend"] = backend
+
+    # Have the detector warm before the room's camera starts
+    start_warmup([backend or get_backend()])
+
+    return {"room_id": data.room_id, "detector_backend": backend or get_backend()}
+
+
+@app.post("/api/detector/int8/calibrate")
+def calibrate_int8_detector(data: Int8CalibrationRequest):
+    """
+    Build the INT8 detector from frames of the uploaded videos.
+
+    Uses every uploaded video still on disk as calibration data, then
+    compares the INT8 model against the FP32 models on the same frames.
+
+    Parameters:
+        data: Int8CalibrationRequest with the number of frames to use
+
+    Returns:
+        Accuracy/latency report (person-count and occupancy agreement,
+        per-frame latency, speedup)
+    """
+    video_paths = [
+        session.video_path for session in get_session_manager().sessions()
+        if os.path.exists(session.video_path)
+    ]
+
+    if not video_paths:
+        raise HTTPException(status_code=400, detail="Upload at least one video to calibrate on")
+
+    # Import here - quantization pulls in onnx/onnxruntime
+    from .quantize import calibrate_and_report
+
+    try:
+        return calibrate_and_report(video_paths, max_frames=data.max_frames)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=500, detail=f"INT8 calibration needs onnx and onnxruntime: {e}")
+
+
+@app.get("/api/motion/stats")
+def get_motion_gate_stats():
+    """
+    Get motion gate statistics for every active stream.
+
+    The skip_ratio of each stream is the fraction of frames where YOLO
+    was skipped because the scene was static.
+
+    Returns:
+        Dictionary of stream name -> gate counters
+    """
+    return {"streams": get_motion_stats()}
+
+
+@app.post("/api/detection/policy")
+def set_detection_policy(data: DetectionPolicyRequest):
+    """
+    Set a room's adaptive detection rate policy.
+
+    Only the fields that are given are changed. The policy is applied
+    immediately to a running CCTV stream, and used the next time the
+    room's camera or AI process starts.
+
+    Parameters:
+        data: DetectionPolicyRequest with room_id and policy fields
+
+    Returns:
+        The room's effective policy
+    """
+    if data.room_id not in rooms_state:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    overrides = {
+        key: value
+        for key, value in data.model_dump(exclude={"room_id"}).items()
+        if value is not None
+    }
+
+    if any(value < 0 for value in overrides.values()):
+        raise HTTPException(status_code=400, detail="Policy values must be >= 0")
+
+    policy = rooms_state[data.room_id].setdefault("detection_policy", {})
+    policy.update(overrides)
+
+    # Apply to a running CCTV stream straight away
+    processor = get_stream_processor(data.room_id)
+    if processor is not None:
+        processor.detection_policy.update(overrides)
+        if processor.detection_rate is not None:
+            processor.detection_rate.update_policy(**overrides)
+
+    effective = dict(DEFAULT_POLICY)
+    effective.update(policy)
+
+    return {"room_id": data.room_id, "policy": effective}
+
+
+@app.get("/api/detection/rates")
+def get_detection_rate_stats():
+    """
+    Get the effective detection rate of every active stream.
+
+    Returns:
+        Per-stream mode (settled/unsettled), interval and detections/sec,
+        the building-wide total detections/sec, and how often the
+        occupancy cascade could skip the full-resolution pass
+    """
+    return {**get_detection_rates(), "cascade": get_cascade_stats()}
+
+
+@app.post("/api/rooms/roi")
+def set_room_roi(data: RoiRequest):
+    """
+    Set a room's region of interest.
+
+    Detection runs only on the polygon's bounding box, and people whose
+    box center is outside the polygon are ignored (e.g. a corridor seen
+    through a glass door). The ROI is applied immediately to a running
+    CCTV stream, and used the next time the room's camera or AI process
+    starts.
+
+    Parameters:
+        data: RoiRequest with room_id and polygon as normalized [x, y]
+              points (empty list = whole frame)
+
+    Returns:
+        The room's ROI polygon
+    """
+    if data.room_id not in rooms_state:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    # Validate before storing
+    try:
+        RegionOfInterest.from_config(data.polygon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rooms_state[data.room_id]["roi_polygon"] = data.polygon
+
+    # Apply to a running CCTV stream straight away
+    processor = get_stream_processor(data.room_id)
+    if processor is not None:
+        processor.set_roi(data.polygon)
+
+    return {"room_id": data.room_id, "roi_polygon": data.polygon}
+
+
+@app.get("/api/inference/stats")
+def get_inference_stats():
+    """
+    Get batching statistics from the cross-camera inference scheduler.
+
+    Returns:
+        Batch sizes, per-batch latency and queue wait figures
+    """
+    return get_scheduler().stats()
+
+
 # =============================================================================
 # Video Upload Endpoints
 # =============================================================================
 
-@app.post("/api/video/upload", response_model=VideoAnalysisResponse)
+@app.post("/api/video/upload", response_model=VideoJobResponse, status_code=202)
 async def upload_video(
     file: UploadFile = File(...),
     room_id: str = Form("UploadedVideo"),
-    frame_skip: int = Form(5)
+    frame_skip: int = Form(5),
+    parallel: bool = Form(False),
+    sample_seconds: float = Form(0.0),
+    mode: str = Form("dense"),
+    proxy: bool = Form(False)
 ):
     """
-    Upload and analyze a video file for person detection.
+    Upload a video file and queue it for person detection analysis.
+    
+    The upload is saved to disk and the analysis runs as a background
+    job, so this returns at once. The video can be streamed with
+    /api/video/stream/{session_id} straight away; poll
+    /api/video/jobs/{job_id} for progress and the analysis result.
     
     Parameters:
         file: Video file to upload
         room_id: Room ID to use for simulation (default "UploadedVideo")
         frame_skip: Process every Nth frame (default 5)
+        parallel: Analyze chunks of the video in several processes
+                  (for long recordings, VIDEO_ANALYSIS_PROCESSES)
+        sample_seconds: Process one frame every N seconds instead of
+                        every Nth frame (0 = use frame_skip)
+        mode: "dense" (analyze every sampled frame) or "progressive"
+              (coarse pass, then bisection of each occupancy change
+              down to the sampling stride - far fewer detector runs)
+        proxy: Pre-render an annotated, downscaled stream once in the
+               background; viewers are then served from it
     
     Returns:
-        Analysis results including occupancy events and statistics
+        The queued job (job_id, session_id, status)
     """
-    temp_path = None
+    _validate_analysis_options(frame_skip, sample_seconds, mode)
     
     try:
-        # Save uploaded file to temp location
-        temp_path = _save_upload_to_temp(file)
-        
-        # Generate session ID for streaming
-        import uuid
-        session_id = str(uuid.uuid4())
-        _uploaded_videos[session_id] = temp_path
-        
-        # Analyze the video
-        result = _analyze_video_file(temp_path, room_id, frame_skip)
-        result["session_id"] = session_id
-        
-        return result
-        
-    except HTTPException:
-        raise
+        # Save uploaded file to temp location (hashed while copying)
+        temp_path, digest = await _save_upload_to_temp(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading video: {str(e)}")
+    
+    return _queue_video_analysis(
+        temp_path, digest, room_id, frame_skip, parallel, sample_seconds, mode, proxy
+    )
+
+
+@app.post("/api/video/upload/stream", response_model=VideoJobResponse, status_code=202)
+async def upload_video_stream(
+    request: Request,
+    filename: str = "upload.mp4",
+    room_id: str = "UploadedVideo",
+    frame_skip: int = 5,
+    parallel: bool = False,
+    sample_seconds: float = 0.0,
+    mode: str = "dense",
+    proxy: bool = False
+):
+    """
+    Upload a video sent as the raw request body and queue its analysis.
+    
+    Unlike /api/video/upload (multipart form, spooled by the form parser
+    before the endpoint runs), the body is written straight to the video
+    file and hashed as it arrives. A Content-Length over
+    VIDEO_UPLOAD_MAX_MB is refused before any data is read.
+    
+    Parameters:
+        request: Request whose body is the video file
+        filename: Original file name (for the file extension)
+        room_id, frame_skip, parallel, sample_seconds, mode, proxy:
+            Analysis options as query parameters (see /api/video/upload)
+    
+    Returns:
+        The queued job (job_id, session_id, status)
+    """
+    _validate_analysis_options(frame_skip, sample_seconds, mode)
+    
+    length = request.headers.get("content-length", "")
+    try:
+        upload = IngestUpload(filename, int(length) if length.isdigit() else None)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
+        # Without a Content-Length, finish() can't tell a cut-off body
+        # from a complete one - this upload can't be resumed, so any
+        # disconnect is an error
+        if not await _receive_request_body(upload, request):
+            raise ValueError("Client disconnected before the whole video arrived")
+        temp_path, digest = upload.finish()
+    except UploadTooLargeError as e:
+        upload.abort()
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        # Client disconnected before the whole body arrived
+        upload.abort()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing video: {str(e)}")
+        upload.abort()
+        raise HTTPException(status_code=500, detail=f"Error uploading video: {str(e)}")
+    
+    return _queue_video_analysis(
+        temp_path, digest, room_id, frame_skip, parallel, sample_seconds, mode, proxy
+    )
+
+
+@app.post("/api/video/uploads", status_code=201)
+def create_resumable_upload(data: UploadCreateRequest):
+    """
+    Start a resumable upload for a large video.
+    
+    Send the file in chunks with PUT /api/video/uploads/{upload_id}
+    (each chunk is the raw request body, offset = bytes sent before it),
+    then POST /api/video/uploads/{upload_id}/complete to queue the
+    analysis. If a chunk fails, GET the upload for its offset and resend
+    from there. Unfinished uploads are deleted after VIDEO_UPLOAD_TTL.
+    
+    Parameters:
+        data: File name and total size in bytes (size is optional but
+              lets an oversized file be refused at once)
+    
+    Returns:
+        The upload (upload_id, offset, size, max_bytes)
+    """
+    try:
+        upload = get_upload_manager().create(data.filename, data.size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    return upload.to_dict()
+
+
+@app.get("/api/video/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str):
+    """
+    Get the progress of a resumable upload.
+    
+    Returns:
+        The upload - offset is where the next chunk must start
+    """
+    upload = get_upload_manager().get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return upload.to_dict()
+
+
+@app.put("/api/video/uploads/{upload_id}")
+async def put_upload_chunk(upload_id: str, request: Request, offset: int = 0):
+    """
+    Append a chunk (the raw request body) to a resumable upload.
+    
+    Parameters:
+        upload_id: Upload ID
+        request: Request whose body is the chunk
+        offset: Position of the chunk in the file - must equal the
+                upload's current offset
+    
+    Returns:
+        The upload with its new offset
+    """
+    manager = get_upload_manager()
+    upload = manager.get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    try:
+        await _receive_request_body(upload, request, offset)
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLargeError as e:
+        manager.abort(upload_id)
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return upload.to_dict()
+
+
+@app.post("/api/video/uploads/{upload_id}/complete",
+          response_model=VideoJobResponse, status_code=202)
+def complete_resumable_upload(upload_id: str, data: UploadCompleteRequest):
+    """
+    Finish a resumable upload and queue the analysis of the video.
+    
+    Parameters:
+        upload_id: Upload ID
+        data: Analysis options (see /api/video/upload)
+    
+    Returns:
+        The queued job (job_id, session_id, status)
+    """
+    _validate_analysis_options(data.frame_skip, data.sample_seconds, data.mode)
+    
+    try:
+        finished = get_upload_manager().finish(upload_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if finished is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    temp_path, digest = finished
+    return _queue_video_analysis(
+        temp_path, digest, data.room_id, data.frame_skip, data.parallel,
+        data.sample_seconds, data.mode, data.proxy
+    )
+
+
+@app.delete("/api/video/uploads/{upload_id}")
+def abort_resumable_upload(upload_id: str):
+    """
+    Cancel a resumable upload and delete the data received.
+    
+    Returns:
+        Status message
+    """
+    if not get_upload_manager().abort(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return {"status": "aborted"}
+
+
+@app.get("/api/video/jobs")
+def list_video_jobs():
+    """
+    List video analysis jobs (without their results).
+    
+    Returns:
+        Worker pool usage and the status/progress of every known job
+    """
+    manager = get_job_manager()
+    jobs = []
+    for job in manager.jobs():
+        state = job.to_dict()
+        state.pop("result")
+        jobs.append(state)
+    
+    return {"pool": manager.stats(), "jobs": jobs}
+
+
+@app.get("/api/video/jobs/{job_id}", response_model=VideoJobResponse)
+def get_video_job(job_id: str):
+    """
+    Get the progress of a video analysis job, and its result when done.
+    
+    Parameters:
+        job_id: Job ID from /api/video/upload
+    
+    Returns:
+        Job status, progress (frames analyzed), ETA, result or error
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    
+    # Polling the job keeps its video session alive
+    get_session_manager().get(job.metadata.get("session_id"))
+    
+    return job.to_dict()
+
+
+@app.get("/api/video/cache")
+def get_video_cache_stats():
+    """
+    Get usage of the video analysis cache.
+    
+    Returns:
+        Entries, size on disk, size limit, hits, misses and evictions
+    """
+    return get_analysis_cache().stats()
+
+
+@app.post("/api/video/cache/clear")
+def clear_video_cache():
+    """
+    Delete every cached video analysis.
+    
+    Returns:
+        Cache usage after clearing
+    """
+    cache = get_analysis_cache()
+    cache.clear()
+    return cache.stats()
 
 
 @app.get("/api/video/stream/{session_id}")
-def stream_uploaded_video(session_id: str):
+def stream_uploaded_video(session_id: str, max_width: int = 0, quality: int = 0,
+                          max_fps: float = 0):
     """
     Stream uploaded video with YOLO detection overlays as MJPEG.
     
     Parameters:
         session_id: Session ID from video upload
+        max_width: Largest frame width in pixels (live rendering only -
+                   the proxy has its own size)
+        quality: JPEG quality 10-95 (live rendering only)
+        max_fps: Most frames per second of video to send (0 = all)
     
     Returns:
-        MJPEG video stream
+        MJPEG video stream (from the pre-rendered proxy once it is
+        ready, rendered live until then)
     """
-    # Check if session exists
-    if session_id not in _uploaded_videos:
-        raise HTTPException(status_code=404, detail="Video session not found")
+    variant = _stream_variant(max_width, quality, max_fps)
     
-    video_path = _uploaded_videos[session_id]
+    # Check if session exists (and has not expired)
+    session = get_session_manager().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Video session not found")
     
     # Check if file still exists
-    if not os.path.exists(video_path):
+    if not os.path.exists(session.video_path):
         raise HTTPException(status_code=404, detail="Video file not found")
     
+    proxy = get_proxy(session_id)
+    if proxy is not None and proxy.ready:
+        frames = _generate_video_stream_from_proxy(proxy, session, max_fps or None)
+    else:
+        frames = _generate_video_stream_with_detection(session, variant, max_fps or None)
+    
     return StreamingResponse(
-        _generate_video_stream_with_detection(video_path, session_id),
+        frames,
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
@@ -586,13 +1462,16 @@ def get_video_stream_status(session_id: str):
         session_id: Session ID from video upload
     
     Returns:
-        Current occupancy state for the video stream
+        Current occupancy state for the video stream, how many frames
+        have replayable detections, and the proxy render state
     """
     # Check if session exists
-    if session_id not in _video_occupancy_state:
+    session = get_session_manager().get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Video session not found")
     
-    state = _video_occupancy_state[session_id]
+    state = session.occupancy
+    proxy = get_proxy(session_id)
     
     return {
         "session_id": session_id,
@@ -600,7 +1479,9 @@ def get_video_stream_status(session_id: str):
         "person_count": state.get("person_count", 0),
         "light": state.get("light", False),
         "ac": state.get("ac", False),
-        "room_id": state.get("room_id", "UploadedVideo")
+        "room_id": state.get("room_id", "UploadedVideo"),
+        "replay": get_replay(session.video_path).stats(),
+        "proxy": proxy.stats() if proxy else None
     }
 
 
@@ -609,28 +1490,32 @@ def cleanup_video_session(session_id: str):
     """
     Clean up uploaded video file after done.
     
+    Deletes the upload, its replay detections and its proxy. Sessions
+    that are never cleaned up expire after VIDEO_SESSION_TTL.
+    
     Parameters:
         session_id: Session ID to clean up
     
     Returns:
         Status message
     """
-    if session_id in _uploaded_videos:
-        video_path = _uploaded_videos[session_id]
-        
-        # Try to delete the file
-        try:
-            if os.path.exists(video_path):
-                os.remove(video_path)
-        except Exception as e:
-            print(f"Error cleaning up video: {e}")
-        
-        # Remove from storage
-        del _uploaded_videos[session_id]
+    get_session_manager().remove(session_id)
     
     return {"status": "cleaned up"}
 
 
+@app.get("/api/video/sessions")
+def get_video_sessions():
+    """
+    Get uploaded-video session usage.
+    
+    Returns:
+        Session count, bytes on disk, quotas, removals (cleanup, expired,
+        evicted) and the live sessions
+    """
+    return get_session_manager().stats()
+
+
 # =============================================================================
 # AI Process Control Endpoints
 # =============================================================================
@@ -708,8 +1593,14 @@ def connect_cctv(data: CctvConfigRequest):
         # Store RTSP URL in room state
         rooms_state[data.room_id]["rtsp_url"] = rtsp_url
         
-        # Create stream processor
-        processor = create_stream_processor(rtsp_url, data.room_id)
+        # Create stream processor (with the room's detector backend)
+        processor = create_stream_processor(
+            rtsp_url,
+            data.room_id,
+            rooms_state[data.room_id].get("detector_backend") or None,
+            rooms_state[data.room_id].get("detection_policy") or None,
+            rooms_state[data.room_id].get("roi_polygon") or None
+        )
         
         # Try to connect
         if not processor.connect():
@@ -811,7 +1702,11 @@ def get_cctv_status(room_id: str):
         "person_count": person_count,
         "occupied": is_occupied,
         "light": rooms_state[room_id]["light"],
-        "ac": rooms_state[room_id]["ac"]
+        "ac": rooms_state[room_id]["ac"],
+        "motion_gate": processor.get_motion_stats(),
+        "detection_rate": processor.get_detection_rate(),
+        "tracking": processor.get_tracking_stats(),
+        "broadcast": processor.get_broadcast_stats()
     }
 
 
@@ -819,16 +1714,26 @@ def get_cctv_status(room_id: str):
 # CCTV Stream Endpoint
 # =============================================================================
 
-def generate_annotated_stream(room_id):
+async def generate_annotated_stream(room_id, variant=FULL_VARIANT, max_fps=None):
     """
-    Generator that yields MJPEG frames from CCTV stream.
+    Async generator that yields MJPEG frames from CCTV stream.
+    
+    Waiting for frames takes no worker thread (see
+    FrameBroadcaster.aframes), so open streams don't starve the
+    threadpool that runs the sync endpoints.
     
     Parameters:
         room_id: ID of the room to stream
+        variant: (max_width, quality) to send (see stream_variant) -
+                 encoded once per frame for all viewers asking for it
+        max_fps: Send at most this many frames per second
     
     Yields:
         MJPEG frame bytes
     """
+    import cv2
+    import numpy as np
+
     processor = get_stream_processor(room_id)
     
     # Generate placeholder if no processor
@@ -849,34 +1754,133 @@ def generate_annotated_stream(room_id):
                b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
         return
     
-    # Stream frames while processor is running
-    while processor.is_running:
-        try:
-            frame_bytes = processor.get_annotated_frame()
-            
-            if frame_bytes:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            else:
-                import time
-                time.sleep(0.01)
-        
-        except Exception as e:
-            print(f"Stream error for {room_id}: {e}")
-            break
+    # Stream frames while processor is running. Blocks until each new
+    # frame is published and sends it once (encoded once, the same chunk
+    # goes to every viewer).
+    try:
+        frames = processor.frames.aframes(
+            lambda: processor.is_running, variant=variant, max_fps=max_fps
+        )
+        async for frame in frames:
+            yield frame.chunk
+    except Exception as e:
+        print(f"Stream error for {room_id}: {e}")
+
+
+def _mosaic_layout(rooms, cols, tile_width, fps):
+    """
+    Validate a mosaic viewer's options.
+    
+    Parameters:
+        rooms: Comma-separated room IDs ("" = every room)
+        cols: Grid columns (0 = as square as possible)
+        tile_width: Tile width in pixels (0 = MOSAIC_TILE_WIDTH)
+        fps: Mosaics per second (0 = MOSAIC_FPS)
+    
+    Returns:
+        (room_ids, cols, tile_width, fps) tuple for get_mosaic
+    
+    Raises:
+        HTTPException: 404 for an unknown room, 400 for invalid options
+    """
+    room_ids = [room_id.strip() for room_id in rooms.split(",") if room_id.strip()]
+    if not room_ids:
+        room_ids = list(rooms_state)
+    
+    unknown = [room_id for room_id in room_ids if room_id not in rooms_state]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Room not found: {', '.join(unknown)}")
+    if not room_ids or len(room_ids) > MOSAIC_MAX_ROOMS:
+        raise HTTPException(status_code=400, detail=f"A mosaic shows 1-{MOSAIC_MAX_ROOMS} rooms")
+    
+    if not 0 <= cols <= len(room_ids):
+        raise HTTPException(status_code=400, detail="cols must be between 0 and the number of rooms")
+    
+    low, high = MOSAIC_TILE_WIDTH_RANGE
+    tile_width = tile_width or MOSAIC_TILE_WIDTH
+    if not low <= tile_width <= high:
+        raise HTTPException(status_code=400, detail=f"tile_width must be between {low} and {high}")
+    
+    fps = fps or MOSAIC_FPS
+    if not 0 < fps <= MOSAIC_MAX_FPS:
+        raise HTTPException(status_code=400, detail=f"fps must be between 0 and {MOSAIC_MAX_FPS:g}")
+    
+    # Even tile sizes keep the JPEG blocks aligned; near-identical
+    # requests share one composer
+    return room_ids, cols, tile_width // 16 * 16, fps
+
+
+async def generate_mosaic_stream(mosaic):
+    """
+    Async generator for the MJPEG stream of a mosaic.
+    
+    Every viewer of the same layout gets the same encoded chunk.
+    
+    Parameters:
+        mosaic: MosaicComposer to stream
+    
+    Yields:
+        MJPEG frame bytes
+    """
+    try:
+        async for frame in mosaic.frames.aframes(lambda: mosaic.running):
+            yield frame.chunk
+    except Exception as e:
+        print(f"Mosaic stream error: {e}")
+
+
+@app.get("/api/stream/mosaic")
+def stream_mosaic(rooms: str = "", cols: int = 0, tile_width: int = 0, fps: float = 0):
+    """
+    Stream several rooms tiled into one MJPEG video.
+    
+    The mosaic is composed and encoded once per frame, whatever the
+    number of viewers; rooms without a camera show "No signal".
+    
+    Parameters:
+        rooms: Comma-separated room IDs (default: every room)
+        cols: Grid columns (0 = as square as possible)
+        tile_width: Tile width in pixels (0 = default, 16:9 tiles)
+        fps: Mosaics per second (0 = default)
+    
+    Returns:
+        MJPEG video stream
+    """
+    mosaic = get_mosaic(*_mosaic_layout(rooms, cols, tile_width, fps))
+    
+    return StreamingResponse(
+        generate_mosaic_stream(mosaic),
+        media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+@app.get("/api/stream/mosaic/stats")
+def mosaic_stats():
+    """
+    Get the running mosaic streams.
+    
+    Returns:
+        Layout, viewers and encode sharing of every mosaic
+    """
+    return {"mosaics": get_mosaic_stats()}
 
 
 @app.get("/api/stream/{room_id}")
-def stream_room(room_id: str):
+def stream_room(room_id: str, max_width: int = 0, quality: int = 0, max_fps: float = 0):
     """
     Stream MJPEG video from CCTV with YOLO detection.
     
     Parameters:
         room_id: ID of the room to stream
+        max_width: Largest frame width in pixels (0 = camera size)
+        quality: JPEG quality 10-95 (0 = default)
+        max_fps: Most frames per second to send (0 = every frame)
     
     Returns:
         MJPEG video stream
     """
+    variant = _stream_variant(max_width, quality, max_fps)
+    
     # Check if room exists
     if room_id not in rooms_state:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -887,7 +1891,7 @@ def stream_room(room_id: str):
         raise HTTPException(status_code=503, detail="CCTV not connected")
     
     return StreamingResponse(
-        generate_annotated_stream(room_id),
+        generate_annotated_stream(room_id, variant, max_fps or None),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
@@ -922,7 +1926,12 @@ def start_webcam_test():
         
         # Start the streaming processor
         print("Starting webcam stream processor...")
-        start_webcam_stream(camera_index=0, room_id=room_id)
+        start_webcam_stream(
+            camera_index=0,
+            room_id=room_id,
+            detection_policy=rooms_state[room_id].get("detection_policy") or None,
+            roi_polygon=rooms_state[room_id].get("roi_polygon") or None
+        )
         processor = get_webcam_processor()
         
         # Define callback for occupancy changes
@@ -984,7 +1993,11 @@ def get_webcam_test_status():
             return {
                 "status": "running",
                 "person_count": processor.get_person_count(),
-                "occupied": processor.get_person_count() > 0
+                "occupied": processor.get_person_count() > 0,
+                "motion_gate": processor.get_motion_stats(),
+                "detection_rate": processor.get_detection_rate(),
+                "tracking": processor.get_tracking_stats(),
+                "broadcast": processor.get_broadcast_stats()
             }
         
         return {"status": "stopped"}
@@ -994,38 +2007,42 @@ def get_webcam_test_status():
         return {"status": "stopped"}
 
 
-def generate_webcam_stream():
+async def generate_webcam_stream(variant=FULL_VARIANT, max_fps=None):
     """
-    Generator that yields MJPEG frames from webcam.
+    Async generator that yields MJPEG frames from webcam.
+    
+    Blocks until each new frame is published and sends it once (encoded
+    once per variant, the same chunk goes to every viewer). Keeps
+    waiting if the webcam is stopped, so the stream resumes when it is
+    started again.
+    
+    Parameters:
+        variant: (max_width, quality) to send (see stream_variant)
+        max_fps: Send at most this many frames per second
     
     Yields:
         MJPEG frame bytes
     """
-    import time
-    
     processor = get_webcam_processor()
     
-    while True:
-        frame_bytes = processor.get_annotated_frame()
-        
-        if frame_bytes is None:
-            time.sleep(0.01)
-            continue
-        
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n'
-               b'Content-Length: ' + str(len(frame_bytes)).encode() + b'\r\n'
-               b'\r\n' + frame_bytes + b'\r\n')
+    async for frame in processor.frames.aframes(variant=variant, max_fps=max_fps):
+        yield frame.chunk
 
 
 @app.get("/api/webcam/stream")
-def webcam_stream():
+def webcam_stream(max_width: int = 0, quality: int = 0, max_fps: float = 0):
     """
     Stream live webcam video with detection overlays as MJPEG.
     
+    Parameters:
+        max_width: Largest frame width in pixels (0 = camera size)
+        quality: JPEG quality 10-95 (0 = default, 60)
+        max_fps: Most frames per second to send (0 = every frame)
+    
     Returns:
         MJPEG video stream
     """
+    variant = _stream_variant(max_width, quality, max_fps)
     processor = get_webcam_processor()
     
     # Start streaming if not already running
@@ -1033,6 +2050,6 @@ def webcam_stream():
         processor.start_streaming()
     
     return StreamingResponse(
-        generate_webcam_stream(),
+        generate_webcam_stream(variant, max_fps or None),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
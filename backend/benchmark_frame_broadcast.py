@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Frame Broadcast Benchmark
+Simulates a camera publishing 720p frames at 25 fps with N viewer threads
+pulling the latest frame, and compares JPEG encodes and publisher stalls
+of the old per-viewer encode (under the processor lock) with the shared
+FrameBroadcaster.
+Run: .venv/bin/python backend/benchmark_frame_broadcast.py [seconds]
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.frame_broadcast import FrameBroadcaster
+
+# Simulated camera
+FPS = 25
+VIEWER_COUNTS = [1, 4, 16, 32]
+
+
+def make_frames(count=FPS):
+    """Distinct noisy 720p frames (so encodes cost what real ones do)"""
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    return [np.roll(noise, index * 8, axis=1) for index in range(count)]
+
+
+class PerViewerEncode:
+    """The old get_annotated_frame(): every call encodes under the lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current_frame = None
+        self.encodes = 0
+
+    def publish(self, frame):
+        with self.lock:
+            self.current_frame = frame
+
+    def latest(self):
+        import cv2
+
+        with self.lock:
+            if self.current_frame is None:
+                return None
+            ret, buffer = cv2.imencode('.jpg', self.current_frame)
+            self.encodes += 1
+            return buffer.tobytes()
+
+
+def run(publish, latest, viewers, seconds, frames):
+    """Publish at FPS while viewers poll; returns worst publish stall (ms)"""
+    stop = threading.Event()
+
+    def viewer():
+        while not stop.is_set():
+            if latest() is None:
+                time.sleep(0.001)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=viewer, daemon=True) for _ in range(viewers)]
+    for thread in threads:
+        thread.start()
+
+    worst = 0.0
+    interval = 1.0 / FPS
+    end = time.perf_counter() + seconds
+    index = 0
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        publish(frames[index % len(frames)])
+        worst = max(worst, time.perf_counter() - start)
+        index += 1
+        time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return worst * 1000, index
+
+
+def main():
+    print("=" * 60)
+    print("Frame Broadcast Benchmark")
+    print("=" * 60)
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    frames = make_frames()
+
+    print(f"{'Viewers':>8}{'Published':>11}{'Old encodes':>13}{'New encodes':>13}"
+          f"{'Old stall ms':>14}{'New stall ms':>14}")
+
+    ok = True
+    for viewers in VIEWER_COUNTS:
+        old = PerViewerEncode()
+        old_stall, published = run(old.publish, old.latest, viewers, seconds, frames)
+
+        new = FrameBroadcaster()
+        new_stall, new_published = run(new.publish, new.latest, viewers, seconds, frames)
+        new_encodes = new.stats()["encoded"]
+
+        print(f"{viewers:>8}{published:>11}{old.encodes:>13}{new_encodes:>13}"
+              f"{old_stall:>14.1f}{new_stall:>14.1f}")
+        ok = ok and new_encodes <= new_published
+
+    print()
+    print("=" * 60)
+    if ok:
+        print("✅ Shared broadcaster encodes each frame at most once")
+        print("=" * 60)
+        return 0
+
+    print("❌ Shared broadcaster encoded a frame more than once")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Progressive Video Analysis Benchmark
+Compares the dense scan with progressive mode (coarse pass + bisection):
+detector runs, time, and whether every event lands within one sampling
+stride of the dense scan's event.
+Run: .venv/bin/python backend/benchmark_progressive_analysis.py [video.mp4] [frame_skip]
+Without a video, the test video of benchmark_video_analysis.py is used.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.analysis_cache import get_analysis_cache
+from backend.benchmark_video_analysis import make_test_video
+from backend.video_analysis import analyze_video_file
+
+
+def run(video_path, frame_skip, mode):
+    """Analyze the video in one mode, returns (seconds, result)"""
+    start = time.perf_counter()
+    result = analyze_video_file(video_path, "Benchmark", frame_skip, mode=mode)
+    return time.perf_counter() - start, result
+
+
+def events_match(dense, progressive, tolerance):
+    """Same changes in the same order, each within tolerance frames"""
+    if len(dense) != len(progressive):
+        return False
+    return all(
+        a["occupied"] == b["occupied"] and abs(a["frame_index"] - b["frame_index"]) <= tolerance
+        for a, b in zip(dense, progressive)
+    )
+
+
+def main():
+    print("=" * 60)
+    print("Progressive Video Analysis Benchmark")
+    print("=" * 60)
+
+    video_path = Path(sys.argv[1]) if len(sys.argv) > 1 else make_test_video()
+    frame_skip = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"Video: {video_path} (frame_skip={frame_skip})")
+    print()
+
+    # Time real detection: with the cache on, the progressive run would
+    # reuse the dense run's frames
+    get_analysis_cache().max_bytes = 0
+
+    dense_time, dense = run(video_path, frame_skip, "dense")
+    progressive_time, progressive = run(video_path, frame_skip, "progressive")
+
+    print(f"{'Mode':>12}{'Seconds':>10}{'Detections':>12}{'Events':>8}")
+    print(f"{'dense':>12}{dense_time:>10.1f}{dense['frames_analyzed']:>12}{len(dense['events']):>8}")
+    print(f"{'progressive':>12}{progressive_time:>10.1f}"
+          f"{progressive['frames_analyzed']:>12}{len(progressive['events']):>8}")
+    print()
+    print(f"Detector runs: {progressive['frames_analyzed'] / dense['frames_analyzed']:.1%} of dense, "
+          f"speedup {dense_time / progressive_time:.2f}x")
+
+    tolerance = progressive["progressive"]["tolerance_frames"]
+    for a, b in zip(dense["events"], progressive["events"]):
+        print(f"  frame {a['frame_index']:>6} vs {b['frame_index']:>6}  "
+              f"({'occupied' if a['occupied'] else 'empty'})")
+
+    print()
+    print("=" * 60)
+    if events_match(dense["events"], progressive["events"], tolerance):
+        print(f"✅ Progressive events match the dense scan (within {tolerance} frames)")
+        print("=" * 60)
+        return 0
+
+    print("❌ Progressive events differ from the dense scan")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Stream Load Test
+Opens N concurrent MJPEG viewers against the running backend and compares
+/api/rooms latency before and during the load (async streams must not
+starve the threadpool that runs the sync endpoints).
+Run: .venv/bin/python backend/benchmark_stream_load.py [viewers] [stream_path]
+Needs the backend on BASE_URL (like test_api.py). Without a stream path,
+the test video of benchmark_video_analysis.py is uploaded twice and
+/api/video/stream/{session_id} is loaded for both: once without a proxy
+(the live decode/detect/encode path viewers get until a proxy is ready,
+at most LIVE_VIEWERS viewers) and once with proxy=true after the proxy
+is ready.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.benchmark_video_analysis import make_test_video
+
+BASE_URL = "http://localhost:8002"
+
+# Viewers are connected in batches (keeps the listen backlog from overflowing)
+CONNECT_BATCH = 100
+
+# Viewers of the live (no proxy yet) path - each one decodes and encodes
+# the video itself
+LIVE_VIEWERS = 100
+
+# /api/rooms samples per measurement
+LATENCY_SAMPLES = 50
+
+# Under load, p95 latency may be this many times the idle p95 (or this
+# many milliseconds, whichever is larger)
+LATENCY_FACTOR = 5.0
+LATENCY_BUDGET_MS = 250.0
+
+
+def raise_file_limit():
+    """Allow one socket per viewer (the soft limit is often 1024)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = 65536 if hard == resource.RLIM_INFINITY else hard
+    if soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def upload_test_video(proxy):
+    """Upload the test video, returns its session ID"""
+    video_path = make_test_video()
+    with open(video_path, "rb") as f:
+        response = requests.post(
+            f"{BASE_URL}/api/video/upload/stream",
+            params={"filename": video_path.name, "proxy": "true" if proxy else "false"},
+            data=f,
+            timeout=120
+        )
+    response.raise_for_status()
+    return response.json()["session_id"]
+
+
+def upload_live_stream():
+    """Upload the test video without a proxy, return its stream path (live rendering)"""
+    session_id = upload_test_video(proxy=False)
+    return f"/api/video/stream/{session_id}", session_id
+
+
+def upload_test_stream():
+    """Upload the test video with a proxy, wait until it is ready, return its stream path"""
+    session_id = upload_test_video(proxy=True)
+
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        status = requests.get(f"{BASE_URL}/api/video/status/{session_id}", timeout=5).json()
+        proxy = status.get("proxy") or {}
+        if proxy.get("status") == "ready":
+            return f"/api/video/stream/{session_id}", session_id
+        if proxy.get("status") == "failed":
+            raise RuntimeError(f"Proxy failed: {proxy.get('error')}")
+        time.sleep(1)
+
+    raise RuntimeError("Proxy not ready after 5 minutes")
+
+
+async def http_get(host, port, path):
+    """One GET with Connection: close, returns seconds until the full response"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    return time.perf_counter() - start
+
+
+async def measure_latency(host, port):
+    """p50/p95 of /api/rooms in milliseconds"""
+    samples = []
+    for _ in range(LATENCY_SAMPLES):
+        samples.append(await http_get(host, port, "/api/rooms") * 1000)
+        await asyncio.sleep(0.02)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+async def viewer(host, port, path, stop, stats):
+    """Read an MJPEG stream until stop is set, counting bytes"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats["failed"] += 1
+        return
+
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    stats["connected"] += 1
+
+    received = 0
+    try:
+        while not stop.is_set():
+            chunk = await asyncio.wait_for(reader.read(65536), 1.0)
+            if not chunk:
+                break
+            received += len(chunk)
+    except asyncio.TimeoutError:
+        pass
+    except OSError:
+        stats["failed"] += 1
+    finally:
+        writer.close()
+
+    stats["bytes"] += received
+    if received:
+        stats["receiving"] += 1
+
+
+async def run(viewers, path):
+    url = urlsplit(BASE_URL)
+    host, port = url.hostname, url.port or 80
+
+    idle_p50, idle_p95 = await measure_latency(host, port)
+    print(f"Idle /api/rooms: p50 {idle_p50:.1f} ms, p95 {idle_p95:.1f} ms")
+
+    stop = asyncio.Event()
+    stats = {"connected": 0, "failed": 0, "receiving": 0, "bytes": 0}
+    tasks = []
+    for start in range(0, viewers, CONNECT_BATCH):
+        for _ in range(min(CONNECT_BATCH, viewers - start)):
+            tasks.append(asyncio.create_task(viewer(host, port, path, stop, stats)))
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(2)
+    print(f"Viewers connected: {stats['connected']}/{viewers} ({stats['failed']} failed)")
+
+    load_p50, load_p95 = await measure_latency(host, port)
+    print(f"Loaded /api/rooms: p50 {load_p50:.1f} ms, p95 {load_p95:.1f} ms")
+
+    stop.set()
+    await asyncio.gather(*tasks)
+    print(f"Viewers that received frames: {stats['receiving']}, "
+          f"{stats['bytes'] / (1024 * 1024):.1f} MB total")
+
+    budget = max(LATENCY_BUDGET_MS, idle_p95 * LATENCY_FACTOR)
+    return load_p95 <= budget and stats["receiving"] >= viewers * 0.95, budget
+
+
+def main():
+    print("=" * 60)
+    print("Stream Load Test")
+    print("=" * 60)
+
+    viewers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    raise_file_limit()
+
+    # (name, function() -> (stream path, session ID to clean up), viewers)
+    if len(sys.argv) > 2:
+        scenarios = [("stream", lambda: (sys.argv[2], None), viewers)]
+    else:
+        scenarios = [
+            ("live (proxy not ready)", upload_live_stream, min(viewers, LIVE_VIEWERS)),
+            ("proxy", upload_test_stream, viewers),
+        ]
+
+    failed = []
+    for name, prepare, count in scenarios:
+        path, session_id = prepare()
+        print(f"Stream ({name}): {path} x {count} viewers")
+        try:
+            ok, budget = asyncio.run(run(count, path))
+        finally:
+            if session_id:
+                requests.post(f"{BASE_URL}/api/video/cleanup/{session_id}", timeout=5)
+        print(f"{'OK' if ok else 'FAILED'}: p95 budget {budget:.0f} ms")
+        print()
+        if not ok:
+            failed.append(name)
+
+    print("=" * 60)
+    if not failed:
+        print("✅ /api/rooms p95 stayed within budget under every stream load")
+        print("=" * 60)
+        return 0
+
+    print(f"❌ /api/rooms p95 over budget, or viewers got no frames: {', '.join(failed)}")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
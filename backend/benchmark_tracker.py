@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Person Tracker Benchmark
+Shows that the tracker costs far less per frame than a detector pass,
+and that its predicted boxes/counts are better than re-using stale ones.
+Run: .venv/bin/python backend/benchmark_tracker.py [--no-detector]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.tracker import PersonTracker, box_iou
+
+# Simulated stream: 25 fps, detection every 5th frame, 5 people walking
+FPS = 25.0
+DETECT_EVERY = 5
+FRAMES = 2000
+PEOPLE = 5
+DROPOUT_RATE = 0.1   # Chance the detector misses a person in a pass
+NOISE_PX = 3.0       # Detector box jitter
+
+
+def simulate_people(seed=0):
+    """Ground-truth boxes per frame for PEOPLE walking across a 1280x720 view"""
+    rng = random.Random(seed)
+    people = []
+    for _ in range(PEOPLE):
+        x, y = rng.uniform(100, 1000), rng.uniform(100, 500)
+        vx, vy = rng.uniform(-80, 80), rng.uniform(-20, 20)  # px/second
+        people.append([x, y, vx, vy])
+
+    frames = []
+    for _ in range(FRAMES):
+        boxes = []
+        for person in people:
+            person[0] += person[2] / FPS
+            person[1] += person[3] / FPS
+            # Bounce off the frame edges
+            if not 0 < person[0] < 1180:
+                person[2] = -person[2]
+            if not 0 < person[1] < 520:
+                person[3] = -person[3]
+            boxes.append((person[0], person[1], person[0] + 100, person[1] + 200, 0.8))
+        frames.append(boxes)
+    return frames
+
+
+def noisy_detections(boxes, rng):
+    """What the detector would return: jittered boxes, some missed"""
+    return [
+        tuple(v + rng.gauss(0, NOISE_PX) for v in box[:4]) + (box[4],)
+        for box in boxes
+        if rng.random() > DROPOUT_RATE
+    ]
+
+
+def mean_iou(truth, boxes):
+    """Mean best-match IoU of the ground-truth boxes"""
+    if not truth:
+        return 1.0
+    return sum(max((box_iou(t, b) for b in boxes), default=0.0) for t in truth) / len(truth)
+
+
+def benchmark_tracker(frames):
+    """Run the simulated stream through the tracker and a stale-box baseline"""
+    rng = random.Random(1)
+    tracker = PersonTracker()
+    stale = []
+
+    update_s = predict_s = 0.0
+    updates = predictions = 0
+    tracked_iou = stale_iou = 0.0
+    tracked_wrong = raw_wrong = 0
+
+    for index, truth in enumerate(frames):
+        now = index / FPS
+
+        if index % DETECT_EVERY == 0:
+            detections = noisy_detections(truth, rng)
+            start = time.perf_counter()
+            boxes = tracker.update(detections, now)
+            update_s += time.perf_counter() - start
+            updates += 1
+            stale = detections
+
+            # Counts after warm-up: raw detections vs tracked
+            if index >= DETECT_EVERY * 2:
+                raw_wrong += len(detections) != len(truth)
+                tracked_wrong += tracker.count() != len(truth)
+        else:
+            start = time.perf_counter()
+            boxes = tracker.predict(now)
+            predict_s += time.perf_counter() - start
+            predictions += 1
+
+            tracked_iou += mean_iou(truth, boxes)
+            stale_iou += mean_iou(truth, stale)
+
+    return {
+        "update_us": update_s / updates * 1e6,
+        "predict_us": predict_s / predictions * 1e6,
+        "tracked_iou": tracked_iou / predictions,
+        "stale_iou": stale_iou / predictions,
+        "raw_count_errors": raw_wrong,
+        "tracked_count_errors": tracked_wrong,
+        "detection_passes": updates - 2
+    }
+
+
+def benchmark_detector(runs=20):
+    """Mean milliseconds of one YOLO pass on a sample image (None if unavailable)"""
+    try:
+        import cv2
+        from ultralytics.utils import ASSETS
+        from backend.person_detect import get_model
+    except Exception as e:
+        print(f"⚠️ Detector not available, skipping: {e}")
+        return None
+
+    image = cv2.imread(str(ASSETS / "bus.jpg"))
+    model = get_model()
+    model(image, conf=0.4, classes=[0], verbose=False)  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        model(image, conf=0.4, classes=[0], verbose=False)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    print("=" * 60)
+    print("Person Tracker Benchmark")
+    print("=" * 60)
+    print(f"{FRAMES} frames @ {FPS:.0f} fps, {PEOPLE} people, "
+          f"detection every {DETECT_EVERY} frames, {DROPOUT_RATE:.0%} dropouts")
+    print()
+
+    result = benchmark_tracker(simulate_people())
+    print(f"Tracker update:   {result['update_us']:8.1f} µs / detection pass")
+    print(f"Tracker predict:  {result['predict_us']:8.1f} µs / frame")
+    print(f"Box IoU between detections: tracked {result['tracked_iou']:.3f} "
+          f"vs stale {result['stale_iou']:.3f}")
+    print(f"Wrong counts: raw detections {result['raw_count_errors']} "
+          f"vs tracked {result['tracked_count_errors']} "
+          f"(of {result['detection_passes']} passes)")
+
+    detector_ms = None if "--no-detector" in sys.argv else benchmark_detector()
+    if detector_ms is not None:
+        tracker_ms = max(result["update_us"], result["predict_us"]) / 1000
+        print(f"YOLO pass:        {detector_ms * 1000:8.1f} µs / frame "
+              f"({detector_ms / tracker_ms:.0f}x the tracker)")
+
+    print()
+    print("=" * 60)
+    passed = (
+        result["tracked_iou"] > result["stale_iou"]
+        and result["tracked_count_errors"] <= result["raw_count_errors"]
+        and (detector_ms is None or result["update_us"] / 1000 < detector_ms / 10)
+    )
+    if passed:
+        print("✅ Tracker is cheaper than detection and beats stale boxes")
+        print("=" * 60)
+        return 0
+
+    print("❌ Tracker benchmark failed")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
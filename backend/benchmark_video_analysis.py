@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Parallel Video Analysis Benchmark
+Times uploaded-video analysis with 1, 2, 4, ... processes (up to the
+number of CPU cores) and checks every run finds the same occupancy events.
+Run: .venv/bin/python backend/benchmark_video_analysis.py [video.mp4] [frame_skip]
+Without a video, a 2-minute test video (people / empty room) is generated.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import video_analysis
+from backend.analysis_cache import get_analysis_cache
+from backend.video_analysis import analyze_video_file
+
+# Generated test video: alternating 10-second people / empty segments
+TEST_VIDEO_SECONDS = 120
+TEST_VIDEO_FPS = 25
+
+
+def make_test_video():
+    """Write a test video alternating a photo with people and an empty room"""
+    import cv2
+    import numpy as np
+    from ultralytics.utils import ASSETS
+
+    people = cv2.resize(cv2.imread(str(ASSETS / "bus.jpg")), (640, 480))
+    empty = np.full((480, 640, 3), 90, dtype=np.uint8)
+
+    path = Path(tempfile.gettempdir()) / "benchmark_video_analysis.mp4"
+    writer = cv2.VideoWriter(
+        str(path), cv2.VideoWriter_fourcc(*"mp4v"), TEST_VIDEO_FPS, (640, 480)
+    )
+    for index in range(TEST_VIDEO_SECONDS * TEST_VIDEO_FPS):
+        segment = index // (10 * TEST_VIDEO_FPS)
+        writer.write(people if segment % 2 == 0 else empty)
+    writer.release()
+
+    return path
+
+
+def process_counts():
+    """1, 2, 4, ... up to the number of CPU cores"""
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def run(video_path, frame_skip, processes):
+    """Analyze the video with a given number of processes, returns (seconds, result)"""
+    video_analysis.VIDEO_ANALYSIS_PROCESSES = processes
+    video_analysis.MIN_FRAMES_PER_PROCESS = 1
+
+    start = time.perf_counter()
+    result = analyze_video_file(video_path, "Benchmark", frame_skip, parallel=processes > 1)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print("=" * 60)
+    print("Parallel Video Analysis Benchmark")
+    print("=" * 60)
+
+    video_path = Path(sys.argv[1]) if len(sys.argv) > 1 else make_test_video()
+    frame_skip = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"Video: {video_path} (frame_skip={frame_skip}, {os.cpu_count()} cores)")
+    print()
+
+    # Every run analyzes the same video with the same settings - without
+    # this, all runs after the first would be cache hits
+    get_analysis_cache().max_bytes = 0
+
+    baseline_time, baseline = run(video_path, frame_skip, 1)
+    baseline_events = [(e["frame_index"], e["occupied"]) for e in baseline["events"]]
+    print(f"{'Processes':>10}{'Seconds':>10}{'Speedup':>10}{'Events':>10}")
+    print(f"{1:>10}{baseline_time:>10.1f}{1.0:>9.2f}x{len(baseline_events):>10}")
+
+    passed = True
+    for processes in process_counts()[1:]:
+        elapsed, result = run(video_path, frame_skip, processes)
+        events = [(e["frame_index"], e["occupied"]) for e in result["events"]]
+        match = events == baseline_events and result["frames_analyzed"] == baseline["frames_analyzed"]
+        mark = "" if match else "  ❌ results differ"
+        print(f"{processes:>10}{elapsed:>10.1f}{baseline_time / elapsed:>9.2f}x{len(events):>10}{mark}")
+        passed = passed and match
+
+    print()
+    print("=" * 60)
+    if passed:
+        print("✅ Parallel analysis matches the sequential result")
+        print("=" * 60)
+        return 0
+
+    print("❌ Parallel analysis results differ from sequential")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,22 +6,37 @@
 # Main features:
 #   - RTSPStreamProcessor class manages a single camera connection
 #   - Runs YOLO detection on each frame in a background thread
+#     (batched with all other cameras by the inference scheduler)
+#   - Skips YOLO on static scenes (motion gate) and re-uses the last result
+#   - Samples settled rooms rarely (adaptive detection rate)
+#   - Detects only inside the room's ROI polygon (frame cropped first)
+#   - Tracks people between detections (smooth boxes, stable counts,
+#     dwell time per person)
 #   - Draws bounding boxes around detected persons
-#   - Provides MJPEG-encoded frames for web streaming
+#   - Provides MJPEG-encoded frames for web streaming (each frame
+#     encoded once and shared by all viewers, see frame_broadcast.py)
 #   - Tracks occupancy changes and triggers energy control
 #
 # Used for production CCTV deployments with professional security cameras.
 # =============================================================================
 
-import cv2
-import numpy as np
 import threading
-from ultralytics import YOLO
-from pathlib import Path
 
-# Path to YOLO model file
-BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_PATH = BASE_DIR / "yolov8n.pt"
+from .detector_registry import MODEL_PATH, acquire_detector, release_detector
+from .inference_scheduler import get_scheduler, unregister_source
+from .motion_gate import create_motion_gate, remove_motion_gate
+from .detection_rate import create_rate_controller, remove_rate_controller
+from .frame_broadcast import FrameBroadcaster
+from .person_detect import result_boxes
+from .roi import RegionOfInterest, detect_in_roi
+from .tracker import PersonTracker
+
+# Detection confidence threshold for CCTV cameras
+DETECTION_CONF = 0.5
+
+# Seconds between detections while a room is changing. The tracker moves
+# the boxes in between, so there is no need to run YOLO on every frame.
+TRACKED_DETECTION_INTERVAL = 0.2
 
 
 class RTSPStreamProcessor:
@@ -38,7 +53,7 @@ class RTSPStreamProcessor:
     Attributes:
         rtsp_url: URL of the RTSP camera stream
         room_id: Identifier for the room being monitored
-        model: YOLO detection model
+        model: Shared YOLO detection model (from the detector registry)
         cap: OpenCV video capture object
         current_frame: Latest processed frame with annotations
         person_count: Number of people detected
@@ -49,20 +64,37 @@ class RTSPStreamProcessor:
         previous_occupancy: Last known occupancy state
     """
     
-    def __init__(self, rtsp_url, room_id):
+    def __init__(self, rtsp_url, room_id, backend=None, detection_policy=None,
+                 roi_polygon=None):
         """
         Initialize the RTSP stream processor.
         
         Parameters:
             rtsp_url: URL of the RTSP camera stream
             room_id: Identifier for the room being monitored
+            backend: Detector backend for this room (None = default,
+                     "int8" = cheap occupied/empty model)
+            detection_policy: Adaptive detection rate overrides for this
+                              room (see detection_rate.DEFAULT_POLICY)
+            roi_polygon: Room's region of interest as normalized [x, y]
+                         points (None/empty = whole frame)
         """
         # Store configuration
         self.rtsp_url = rtsp_url
         self.room_id = room_id
+        self.backend = backend or None
+        self.detection_policy = dict(detection_policy or {})
+        
+        # Region of interest (None = whole frame)
+        self.roi = RegionOfInterest.from_config(roi_polygon)
         
-        # Load YOLO model for person detection
-        self.model = YOLO(MODEL_PATH)
+        # Shared YOLO model for person detection
+        # (one copy for all rooms using the same backend)
+        self.model = acquire_detector(MODEL_PATH, self.backend)
+        
+        # Set when a stop timed out waiting for the processing thread:
+        # the thread releases the model itself when it exits
+        self._release_model_on_exit = False
         
         # Video capture object (None until connected)
         self.cap = None
@@ -70,6 +102,9 @@ class RTSPStreamProcessor:
         # Current processed frame (None until first frame)
         self.current_frame = None
         
+        # JPEG encoding of the current frame, shared by all viewers
+        self.frames = FrameBroadcaster()
+        
         # Detection results
         self.person_count = 0
         
@@ -84,6 +119,17 @@ class RTSPStreamProcessor:
         self.occupancy_callback = None
         self.previous_occupancy = None
         
+        # Identifier of this camera in the inference scheduler
+        self.scheduler_source = f"cctv:{room_id}"
+        
+        # Motion gate and person tracker (created when processing starts).
+        # Between detections the tracker's predicted boxes are used.
+        self.motion_gate = None
+        self.tracker = None
+        
+        # Adaptive detection rate (created when processing starts)
+        self.detection_rate = None
+        
     def connect(self):
         """
         Connect to the RTSP stream.
@@ -95,6 +141,8 @@ class RTSPStreamProcessor:
             True if connection is successful
             False if connection failed
         """
+        import cv2
+
         try:
             # Open video capture with RTSP URL
             self.cap = cv2.VideoCapture(self.rtsp_url)
@@ -132,6 +180,11 @@ class RTSPStreamProcessor:
             print(f"Stream already processing for {self.room_id}")
             return
         
+        # Re-acquire the shared model if it was released by a previous stop
+        self._release_model_on_exit = False
+        if self.model is None:
+            self.model = acquire_detector(MODEL_PATH, self.backend)
+        
         # Connect if not already connected
         if self.cap is None:
             if not self.connect():
@@ -143,9 +196,24 @@ class RTSPStreamProcessor:
         # Mark as running
         self.is_running = True
         
+        # Join the cross-camera inference batch
+        get_scheduler().register_source(self.scheduler_source)
+        
+        # Skip detection while the scene is static, and sample
+        # settled rooms less often. The tracker fills in between.
+        self.motion_gate = create_motion_gate(self.scheduler_source)
+        policy = {"fast_interval": TRACKED_DETECTION_INTERVAL}
+        policy.update(self.detection_policy)
+        self.detection_rate = create_rate_controller(
+            self.scheduler_source,
+            DETECTION_CONF,
+            **policy
+        )
+        self.tracker = PersonTracker()
+        
         # Create and start processing thread
         self.processing_thread = threading.Thread(
-            target=self._process_stream,
+            target=self._run_processing_thread,
             daemon=True
         )
         self.processing_thread.start()
@@ -157,7 +225,8 @@ class RTSPStreamProcessor:
         Stop processing the stream.
         
         Signals the processing thread to stop, waits for it to finish,
-        and releases the video capture.
+        releases the video capture and drops this room's reference to
+        the shared model.
         """
         # Signal thread to stop
         self.is_running = False
@@ -166,6 +235,13 @@ class RTSPStreamProcessor:
         if self.processing_thread:
             self.processing_thread.join(timeout=5)
         
+        # Leave the inference batch
+        unregister_source(self.scheduler_source)
+        
+        # Stop reporting motion and detection rate statistics
+        remove_motion_gate(self.motion_gate)
+        remove_rate_controller(self.detection_rate)
+        
         # Release video capture
         if self.cap:
             self.cap.release()
@@ -173,18 +249,44 @@ class RTSPStreamProcessor:
         
         # Clear current frame
         self.current_frame = None
+        self.frames.clear()
+        
+        # Release the shared model (unloaded when no room uses it), unless
+        # the thread is still finishing a frame with it
+        thread = self.processing_thread
+        if thread is not None and thread.is_alive():
+            self._release_model_on_exit = True
+        else:
+            self._release_model()
         
         print(f"Stopped stream processing for {self.room_id}")
     
+    def _release_model(self):
+        """Drop this processor's reference to the shared model."""
+        model, self.model = self.model, None
+        release_detector(model)
+    
+    def _run_processing_thread(self):
+        """Thread body: the processing loop, then a deferred model release."""
+        try:
+            self._process_stream()
+        finally:
+            if self._release_model_on_exit and not self.is_running:
+                self._release_model_on_exit = False
+                self._release_model()
+    
     def _process_stream(self):
         """
         Main loop for processing stream frames.
         
         This runs in a background thread and:
             1. Reads frames from the camera
-            2. Runs YOLO detection
-            3. Updates occupancy status
-            4. Annotates frames for streaming
+            2. Runs YOLO detection on the ROI crop (only when the
+               adaptive rate says a check is due and the motion gate
+               sees motion or a re-check is due)
+            3. Updates the tracker (or predicts boxes between detections)
+            4. Updates occupancy status from the tracked count
+            5. Annotates frames for streaming
         """
         while self.is_running:
             try:
@@ -199,23 +301,85 @@ class RTSPStreamProcessor:
                         break
                     continue
                 
-                # Run YOLO detection (class 0 = person, confidence 0.5)
-                results = self.model(frame, conf=0.5, classes=[0], verbose=False)
+                # Only motion inside the room's ROI matters
+                roi = self.roi
+                gate_frame = roi.crop(frame)[0] if roi else frame
                 
-                # Count detected persons
-                person_count = len(results[0].boxes) if results[0] else 0
+                if self.detection_rate.should_check() and self.motion_gate.should_detect(gate_frame):
+                    # Run YOLO detection on the ROI crop; boxes come back
+                    # in full-frame coordinates, outside-ROI ones dropped
+                    detections = detect_in_roi(frame, roi, self._detect)
+                    
+                    # Feed the raw result to the adaptive rate controller
+                    self.detection_rate.record(
+                        len(detections),
+                        [box[4] for box in detections]
+                    )
+                    
+                    # Match the detections to the tracked people
+                    boxes = self.tracker.update(detections)
+                else:
+                    # No detection this frame - move the tracked boxes
+                    boxes = self.tracker.predict()
+                
+                # Count tracked persons (ignores one-frame flickers)
+                person_count = self.tracker.count()
                 
                 # Update occupancy status
                 self._update_occupancy(person_count)
                 
                 # Annotate frame with detection boxes and overlay
+                annotated = self._annotate_frame(frame, boxes, person_count)
                 with self.lock:
-                    self.current_frame = self._annotate_frame(frame, results, person_count)
+                    self.current_frame = annotated
+                
+                # Hand it to the viewers (encoded once, on first request)
+                self.frames.publish(annotated)
             
             except Exception as e:
                 print(f" Error processing frame for {self.room_id}: {e}")
                 continue
 
+    def _detect(self, region):
+        """
+        Run person detection on a (cropped) frame.
+        
+        The scheduler batches this frame with other cameras.
+        
+        Parameters:
+            region: Frame or ROI crop to run detection on
+        
+        Returns:
+            List of (x1, y1, x2, y2, conf) boxes in region pixels
+        """
+        # Run YOLO detection (class 0 = person, confidence 0.5)
+        results = get_scheduler().detect(
+            region,
+            self.scheduler_source,
+            detector=self.model,
+            conf=DETECTION_CONF,
+            classes=[0]
+        )
+        return result_boxes(results)
+
+    def set_roi(self, roi_polygon):
+        """
+        Change the room's region of interest while running.
+        
+        Parameters:
+            roi_polygon: Normalized [x, y] points (None/empty = whole frame)
+        
+        Raises:
+            ValueError: If the polygon is invalid
+        """
+        self.roi = RegionOfInterest.from_config(roi_polygon)
+        
+        # Start over with a fresh background and an immediate detection
+        if self.motion_gate:
+            self.motion_gate.reset()
+        if self.tracker:
+            self.tracker.reset()
+
     def _update_occupancy(self, person_count):
         """
         Update occupancy status and trigger callback if it changed.
@@ -243,13 +407,13 @@ class RTSPStreamProcessor:
                     status = "Occupied" if is_occupied else "Empty"
                     print(f"📊 {self.room_id}: {status} ({self.person_count} people)")
 
-    def _annotate_frame(self, frame, results, person_count):
+    def _annotate_frame(self, frame, boxes, person_count):
         """
         Annotate frame with YOLO detection boxes and person count overlay.
         
         Parameters:
             frame: Original video frame
-            results: YOLO detection results
+            boxes: Detected (x1, y1, x2, y2, conf) boxes in full-frame pixels
             person_count: Number of detected persons
         
         Returns:
@@ -258,56 +422,66 @@ class RTSPStreamProcessor:
         # Create a copy to avoid modifying original
         annotated_frame = frame.copy()
         
+        # Outline the room's region of interest
+        if self.roi:
+            self.roi.draw(annotated_frame)
+        
         # Draw bounding boxes
-        self._draw_bounding_boxes(annotated_frame, results)
+        self._draw_bounding_boxes(annotated_frame, boxes)
         
         # Draw status overlay
         self._draw_overlay(annotated_frame, person_count)
         
         return annotated_frame
 
-    def _draw_bounding_boxes(self, frame, results):
+    def _draw_bounding_boxes(self, frame, boxes):
         """
         Draw bounding boxes for detected persons.
         
+        Boxes are already in full-frame coordinates (detections on the
+        ROI crop are mapped back by roi.detect_in_roi).
+        
         Parameters:
             frame: Frame to draw on
-            results: YOLO detection results
-        """
-        # Check if there are detection results
-        if results[0] and results[0].boxes:
-            # Draw box for each detected person
-            for box in results[0].boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                confidence = box.conf[0]
-                
-                # Draw rectangle around person
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                
-                # Draw confidence label
+            boxes: List of (x1, y1, x2, y2, conf[, track_id]) boxes
+        """
+        import cv2
+
+        # Draw box for each detected person
+        for box in boxes:
+            # Get box coordinates
+            x1, y1, x2, y2 = map(int, box[:4])
+            confidence = box[4]
+            
+            # Draw rectangle around person
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            
+            # Draw confidence label (with the track ID when tracked)
+            if len(box) > 5:
+                label = f"Person #{box[5]} {confidence:.2f}"
+            else:
                 label = f"Person {confidence:.2f}"
-                label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                
-                # Draw label background
-                cv2.rectangle(
-                    frame,
-                    (x1, y1 - label_size[1] - 4),
-                    (x1 + label_size[0], y1),
-                    (0, 255, 0),
-                    -1
-                )
-                
-                # Draw label text
-                cv2.putText(
-                    frame,
-                    label,
-                    (x1, y1 - 2),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (0, 0, 0),
-                    1
-                )
+            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            
+            # Draw label background
+            cv2.rectangle(
+                frame,
+                (x1, y1 - label_size[1] - 4),
+                (x1 + label_size[0], y1),
+                (0, 255, 0),
+                -1
+            )
+            
+            # Draw label text
+            cv2.putText(
+                frame,
+                label,
+                (x1, y1 - 2),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (0, 0, 0),
+                1
+            )
 
     def _draw_overlay(self, frame, person_count):
         """
@@ -317,6 +491,8 @@ class RTSPStreamProcessor:
             frame: Frame to draw on
             person_count: Number of people detected
         """
+        import cv2
+
         # Determine occupancy status
         occupancy_status = "OCCUPIED" if person_count > 0 else "EMPTY"
         count_text = f"{self.room_id} | People: {person_count}"
@@ -352,21 +528,54 @@ class RTSPStreamProcessor:
         """
         Get the latest annotated frame as JPEG bytes for streaming.
         
+        The frame is encoded once, by the first caller, and the same
+        bytes are returned to every other caller (see frame_broadcast.py).
+        
         Returns:
             JPEG-encoded frame bytes, or None if no frame available
         """
-        with self.lock:
-            # Check if we have a frame
-            if self.current_frame is None:
-                return None
-            
-            # Encode frame as JPEG
-            ret, buffer = cv2.imencode('.jpg', self.current_frame)
-            
-            if ret:
-                return buffer.tobytes()
-                
-        return None
+        encoded = self.frames.latest()
+        return encoded.jpeg if encoded else None
+    
+    def get_broadcast_stats(self):
+        """
+        Get JPEG encode sharing statistics.
+        
+        Returns:
+            Dictionary with frames published, encoded and served
+        """
+        return self.frames.stats()
+    
+    def get_motion_stats(self):
+        """
+        Get motion gate statistics (how much inference was skipped).
+        
+        Returns:
+            Dictionary of gate counters, or None if not processing
+        """
+        gate = self.motion_gate
+        return gate.stats() if gate else None
+    
+    def get_detection_rate(self):
+        """
+        Get adaptive detection rate statistics.
+        
+        Returns:
+            Dictionary with mode, interval and detections/sec,
+            or None if not processing
+        """
+        controller = self.detection_rate
+        return controller.stats() if controller else None
+    
+    def get_tracking_stats(self):
+        """
+        Get person tracker statistics (active tracks, dwell times).
+        
+        Returns:
+            Dictionary of tracker state, or None if not processing
+        """
+        tracker = self.tracker
+        return tracker.stats() if tracker else None
     
     def get_person_count(self):
         """
@@ -393,7 +602,8 @@ _stream_processors = {}
 _processors_lock = threading.Lock()
 
 
-def create_stream_processor(rtsp_url, room_id):
+def create_stream_processor(rtsp_url, room_id, backend=None, detection_policy=None,
+                            roi_polygon=None):
     """
     Create or retrieve a stream processor for a room.
     
@@ -402,6 +612,9 @@ def create_stream_processor(rtsp_url, room_id):
     Parameters:
         rtsp_url: RTSP camera URL
         room_id: Room identifier
+        backend: Detector backend for this room (None = default)
+        detection_policy: Adaptive detection rate overrides for this room
+        roi_polygon: Room's region of interest (normalized [x, y] points)
     
     Returns:
         RTSPStreamProcessor instance
@@ -412,7 +625,9 @@ def create_stream_processor(rtsp_url, room_id):
             _stream_processors[room_id].stop_processing()
         
         # Create new processor
-        processor = RTSPStreamProcessor(rtsp_url, room_id)
+        processor = RTSPStreamProcessor(
+            rtsp_url, room_id, backend, detection_policy, roi_polygon
+        )
         _stream_processors[room_id] = processor
         
         return processor
@@ -0,0 +1,260 @@
+# =============================================================================
+# Adaptive Detection Rate Module
+# =============================================================================
+# This file decides HOW OFTEN each room runs person detection.
+#
+# A room that has been empty (or occupied) for a while is unlikely to change
+# in the next few frames, so it is sampled rarely. A room that just changed
+# state, or whose detections are borderline, is sampled at full rate until
+# it settles.
+#
+# States:
+#   - Unsettled: Occupancy changed less than `settle_seconds` ago, or the
+#     last detection had borderline confidences -> check every
+#     `fast_interval` seconds
+#   - Settled: Stable and confident -> check every `slow_interval` seconds
+#
+# The policy can be overridden per room (room_config "detection_policy")
+# and each controller reports its effective detections/sec so the total
+# CPU spent across the building is visible at GET /api/detection/rates.
+# =============================================================================
+
+import threading
+import time
+from collections import deque
+
+# Default policy (each room can override any of these)
+DEFAULT_POLICY = {
+    "fast_interval": 0.0,       # Seconds between checks while unsettled (0 = every frame)
+    "slow_interval": 3.0,       # Seconds between checks once settled
+    "settle_seconds": 10.0,     # Stable time before slowing down
+    "borderline_margin": 0.1,   # Confidences below conf + margin are borderline
+}
+
+# Window (seconds) over which detections/sec is measured
+RATE_WINDOW_SECONDS = 30.0
+
+
+class AdaptiveDetectionRate:
+    """
+    Per-room controller for the detection sampling rate.
+
+    Attributes:
+        name: Room/stream this controller belongs to
+        conf_threshold: Detection confidence threshold used by the room
+        policy: Effective policy (DEFAULT_POLICY + overrides)
+    """
+
+    def __init__(self, name, conf_threshold=0.4, **policy):
+        """
+        Initialize the controller.
+
+        Parameters:
+            name: Room/stream identifier
+            conf_threshold: Confidence threshold the detector runs with
+            **policy: Overrides for DEFAULT_POLICY keys
+        """
+        self.name = name
+        self.conf_threshold = conf_threshold
+        self.policy = dict(DEFAULT_POLICY)
+        self.update_policy(**policy)
+
+        # Time of the last check (detection or motion-gate evaluation)
+        self._last_check = 0.0
+
+        # Occupancy state and when it last changed
+        self._occupied = None
+        self._state_since = time.time()
+        self._borderline = False
+
+        # Timestamps of recent detections (for detections/sec)
+        self._detections = deque()
+        self._total_detections = 0
+        self._started = time.time()
+
+        self._lock = threading.Lock()
+
+    def update_policy(self, **policy):
+        """
+        Change policy values (unknown keys are ignored).
+
+        Parameters:
+            **policy: New values for DEFAULT_POLICY keys
+        """
+        for key, value in policy.items():
+            if key in DEFAULT_POLICY and value is not None:
+                self.policy[key] = max(0.0, float(value))
+
+    def is_settled(self, now=None):
+        """
+        Check whether the room is stable enough to be sampled slowly.
+
+        Parameters:
+            now: Current time (default time.time())
+
+        Returns:
+            True if the state is stable and the last result was confident
+        """
+        now = now or time.time()
+        stable_for = now - self._state_since
+        return (
+            self._occupied is not None
+            and not self._borderline
+            and stable_for >= self.policy["settle_seconds"]
+        )
+
+    def interval(self, now=None):
+        """
+        Get the current time between checks.
+
+        Returns:
+            slow_interval when settled, fast_interval otherwise
+        """
+        if self.is_settled(now):
+            return self.policy["slow_interval"]
+        return self.policy["fast_interval"]
+
+    def time_until_due(self, now=None):
+        """
+        Get the number of seconds until the next check is due.
+
+        Returns:
+            Seconds to wait (0 if a check is already due)
+        """
+        now = now or time.time()
+        with self._lock:
+            return max(0.0, self._last_check + self.interval(now) - now)
+
+    def should_check(self):
+        """
+        Decide whether this frame should be checked (motion gate/detector).
+
+        Returns:
+            True if the current interval has elapsed since the last check
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._last_check >= self.interval(now):
+                self._last_check = now
+                return True
+            return False
+
+    def record(self, person_count, confidences=()):
+        """
+        Record the result of a detection.
+
+        Parameters:
+            person_count: Number of people detected
+            confidences: Confidences of the detected boxes
+        """
+        now = time.time()
+        occupied = person_count > 0
+        limit = self.conf_threshold + self.policy["borderline_margin"]
+
+        with self._lock:
+            # Occupancy changed - back to full rate until it settles
+            if occupied != self._occupied:
+                self._occupied = occupied
+                self._state_since = now
+
+            self._borderline = any(conf < limit for conf in confidences)
+
+            self._detections.append(now)
+            self._total_detections += 1
+            while self._detections and now - self._detections[0] > RATE_WINDOW_SECONDS:
+                self._detections.popleft()
+
+    def detections_per_second(self, now=None):
+        """
+        Get the effective detection rate over the last RATE_WINDOW_SECONDS.
+
+        Returns:
+            Detections per second
+        """
+        now = now or time.time()
+        with self._lock:
+            recent = [t for t in self._detections if now - t <= RATE_WINDOW_SECONDS]
+            window = min(RATE_WINDOW_SECONDS, max(1e-6, now - self._started))
+            return len(recent) / window
+
+    def stats(self):
+        """
+        Get the controller state.
+
+        Returns:
+            Dictionary with mode, interval, detections/sec and policy
+        """
+        now = time.time()
+        settled = self.is_settled(now)
+        return {
+            "mode": "settled" if settled else "unsettled",
+            "occupied": self._occupied,
+            "borderline": self._borderline,
+            "interval_seconds": self.interval(now),
+            "detections_per_second": round(self.detections_per_second(now), 3),
+            "total_detections": self._total_detections,
+            "policy": dict(self.policy)
+        }
+
+
+# =============================================================================
+# Global Controller Registry
+# =============================================================================
+# Every stream registers its controller here so the API can report the
+# detection rate of all rooms (and the building total) in one place.
+# =============================================================================
+
+# Dictionary of active controllers by name (room_id / stream id)
+_controllers = {}
+
+# Lock for thread-safe access to the controllers dictionary
+_controllers_lock = threading.Lock()
+
+
+def create_rate_controller(name, conf_threshold=0.4, **policy):
+    """
+    Create a detection rate controller and register it for statistics.
+
+    Replaces any existing controller with the same name.
+
+    Parameters:
+        name: Room/stream identifier
+        conf_threshold: Confidence threshold the detector runs with
+        **policy: Overrides for DEFAULT_POLICY keys
+
+    Returns:
+        AdaptiveDetectionRate instance
+    """
+    controller = AdaptiveDetectionRate(name, conf_threshold, **policy)
+    with _controllers_lock:
+        _controllers[name] = controller
+    return controller
+
+
+def remove_rate_controller(controller):
+    """
+    Unregister a controller when its stream stops.
+
+    Parameters:
+        controller: AdaptiveDetectionRate returned by create_rate_controller()
+    """
+    with _controllers_lock:
+        if controller is not None and _controllers.get(controller.name) is controller:
+            del _controllers[controller.name]
+
+
+def get_detection_rates():
+    """
+    Get the detection rate of every active stream.
+
+    Returns:
+        Dictionary with per-stream stats and the building-wide total
+        detections/sec
+    """
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+
+    streams = {controller.name: controller.stats() for controller in controllers}
+    total = sum(stats["detections_per_second"] for stats in streams.values())
+
+    return {"streams": streams, "total_detections_per_second": round(total, 3)}
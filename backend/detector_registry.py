@@ -0,0 +1,350 @@
+# =============================================================================
+# Shared Detector Registry Module
+# =============================================================================
+# This file keeps ONE copy of each YOLO detector for the whole process.
+#
+# Before this module existed, every stream processor loaded its own YOLO
+# model, so 30 cameras meant 30 copies of the weights in memory. Now all
+# callers (person_detect, cctv_stream, webcam_stream, webcam_energy and the
+# video upload paths) ask the registry for a detector instead.
+#
+# Key features:
+#   - Detectors are keyed by (model path, backend, options)
+#   - acquire()/release(): reference counting per detector
+#   - warm(): load a detector ahead of time and keep it resident
+#   - unload(): drop a detector that is no longer needed
+#   - Thread-safe: each detector serializes its own inference calls
+# =============================================================================
+
+import os
+import threading
+from pathlib import Path
+
+# Default YOLO model file at the project root
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_PATH = BASE_DIR / "yolov8n.pt"
+
+# Default inference backend: "pytorch" (plain ultralytics), "onnx" or
+# "openvino" - see person_detect.BACKENDS
+DEFAULT_BACKEND = os.environ.get("DETECTOR_BACKEND", "pytorch").lower()
+
+
+class SharedDetector:
+    """
+    Thread-safe wrapper around a loaded YOLO model.
+
+    Ultralytics predictors keep per-call state, so calling one model from
+    several threads at once is not safe. This wrapper serializes calls
+    with a lock while exposing the same call signature as the model.
+
+    Attributes:
+        key: Registry key (model path, backend, options)
+        model: The underlying YOLO model
+        lock: Lock held for the duration of each inference call
+    """
+
+    def __init__(self, key, model):
+        """
+        Initialize the shared detector.
+
+        Parameters:
+            key: Registry key this detector was loaded under
+            model: Loaded YOLO model
+        """
+        self.key = key
+        self.model = model
+        self.lock = threading.Lock()
+
+    def __call__(self, source, **kwargs):
+        """
+        Run inference, holding the detector lock.
+
+        Parameters:
+            source: Frame (or list of frames) to run detection on
+            **kwargs: Passed straight to the YOLO model call
+
+        Returns:
+            YOLO results list
+        """
+        with self.lock:
+            return self.model(source, **kwargs)
+
+    def __getattr__(self, name):
+        # Forward anything else (names, predictor, ...) to the model
+        return getattr(self.model, name)
+
+
+class DetectorRegistry:
+    """
+    Process-wide registry of loaded detectors.
+
+    Each entry tracks:
+        - detector: SharedDetector instance
+        - refcount: Number of active users (acquire() without release())
+        - pinned: Whether warm() asked to keep it loaded with no users
+
+    A detector is dropped from the registry when its refcount reaches
+    zero and it is not pinned, so memory follows the set of active rooms.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        # key -> {"detector", "refcount", "pinned"}
+        self._entries = {}
+
+        # Protects the entries dictionary
+        self._lock = threading.Lock()
+
+        # One load lock per key so two rooms starting at once
+        # do not both read the weights from disk
+        self._load_locks = {}
+
+    @staticmethod
+    def make_key(model_path=None, backend=None, **options):
+        """
+        Build the registry key for a detector configuration.
+
+        Parameters:
+            model_path: Path to the model file (default MODEL_PATH)
+            backend: Inference backend name (default DEFAULT_BACKEND)
+            **options: Extra configuration that changes the loaded model
+
+        Returns:
+            Hashable tuple (model_path, backend, sorted options)
+        """
+        path = str(Path(model_path or MODEL_PATH).resolve())
+        return (path, (backend or DEFAULT_BACKEND).lower(), tuple(sorted(options.items())))
+
+    def _load(self, key):
+        """
+        Load the model for a key from disk.
+
+        Parameters:
+            key: Registry key from make_key()
+
+        Returns:
+            SharedDetector instance
+
+        Raises:
+            FileNotFoundError: If the model file doesn't exist
+        """
+        model_path, backend, options = key
+
+        # Import here so importing the registry stays cheap
+        # (and to avoid a circular import with person_detect)
+        from ultralytics import YOLO
+        from .person_detect import export_model
+
+        # Exported backends (ONNX, OpenVINO) are converted once and
+        # cached next to the .pt file
+        load_path = export_model(backend, model_path)
+
+        if not Path(load_path).exists():
+            raise FileNotFoundError(f"YOLO model not found at {load_path}")
+
+        print(f"Loading detector {Path(load_path).name} ({backend})")
+        return SharedDetector(key, YOLO(str(load_path), task="detect"))
+
+    def _get_or_load(self, key):
+        """
+        Return the registry entry for a key, loading the model if needed.
+
+        Parameters:
+            key: Registry key from make_key()
+
+        Returns:
+            Entry dictionary (caller must hold self._lock to modify it)
+        """
+        # Fast path - already loaded
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Slow path - load outside the registry lock so other
+        # detectors stay available while this one reads from disk
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return entry
+
+            detector = self._load(key)
+
+            with self._lock:
+                entry = {"detector": detector, "refcount": 0, "pinned": False}
+                self._entries[key] = entry
+                return entry
+
+    def acquire(self, model_path=None, backend=None, **options):
+        """
+        Get a shared detector and take a reference to it.
+
+        Every acquire() must be paired with a release() when the
+        caller (e.g. a stream processor) stops.
+
+        Parameters:
+            model_path: Path to the model file (default MODEL_PATH)
+            backend: Inference backend name (default DEFAULT_BACKEND)
+            **options: Extra configuration for the detector
+
+        Returns:
+            SharedDetector instance
+        """
+        key = self.make_key(model_path, backend, **options)
+
+        while True:
+            entry = self._get_or_load(key)
+            with self._lock:
+                # The entry may have been unloaded between the load and
+                # taking the lock - if so, load it again
+                if self._entries.get(key) is entry:
+                    entry["refcount"] += 1
+                    return entry["detector"]
+
+    def release(self, detector):
+        """
+        Drop a reference taken with acquire().
+
+        When the last reference is released and the detector is not
+        pinned by warm(), it is removed from the registry.
+
+        Parameters:
+            detector: SharedDetector returned by acquire()
+        """
+        if detector is None:
+            return
+
+        with self._lock:
+            entry = self._entries.get(detector.key)
+            if entry is None or entry["detector"] is not detector:
+                return
+
+            entry["refcount"] = max(0, entry["refcount"] - 1)
+
+            if entry["refcount"] == 0 and not entry["pinned"]:
+                del self._entries[detector.key]
+                print(f"Unloaded detector {Path(detector.key[0]).name} (no users)")
+
+    def warm(self, model_path=None, backend=None, **options):
+        """
+        Load a detector ahead of time and keep it resident.
+
+        Pinned detectors stay loaded even when no room is using them,
+        so the next acquire() does not pay the load cost.
+
+        Parameters:
+            model_path: Path to the model file (default MODEL_PATH)
+            backend: Inference backend name (default DEFAULT_BACKEND)
+            **options: Extra configuration for the detector
+
+        Returns:
+            SharedDetector instance
+        """
+        key = self.make_key(model_path, backend, **options)
+
+        while True:
+            entry = self._get_or_load(key)
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    entry["pinned"] = True
+                    return entry["detector"]
+
+    def unload(self, model_path=None, backend=None, force=False, **options):
+        """
+        Unpin a detector and remove it if nobody is using it.
+
+        Parameters:
+            model_path: Path to the model file (default MODEL_PATH)
+            backend: Inference backend name (default DEFAULT_BACKEND)
+            force: Remove even if references are still held
+                   (holders keep their own copy until they release it)
+            **options: Extra configuration for the detector
+
+        Returns:
+            True if the detector was removed from the registry
+        """
+        key = self.make_key(model_path, backend, **options)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+
+            entry["pinned"] = False
+
+            if entry["refcount"] == 0 or force:
+                del self._entries[key]
+                return True
+
+        return False
+
+    def unload_all(self):
+        """
+        Remove every detector from the registry.
+
+        Called during application shutdown.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get a summary of the loaded detectors.
+
+        Returns:
+            List of dictionaries with model, backend, options,
+            refcount and pinned for each loaded detector
+        """
+        with self._lock:
+            return [
+                {
+                    "model": Path(key[0]).name,
+                    "backend": key[1],
+                    "options": dict(key[2]),
+                    "refcount": entry["refcount"],
+                    "pinned": entry["pinned"]
+                }
+                for key, entry in self._entries.items()
+            ]
+
+
+# =============================================================================
+# Global Registry
+# =============================================================================
+# One registry per process. The module-level helpers below are what the
+# rest of the backend uses.
+# =============================================================================
+
+_registry = DetectorRegistry()
+
+
+def get_registry():
+    """
+    Get the process-wide detector registry.
+
+    Returns:
+        DetectorRegistry instance
+    """
+    return _registry
+
+
+def acquire_detector(model_path=None, backend=None, **options):
+    """
+    Take a reference to a shared detector (see DetectorRegistry.acquire).
+
+    Returns:
+        SharedDetector instance
+    """
+    return _registry.acquire(model_path, backend, **options)
+
+
+def release_detector(detector):
+    """
+    Release a detector obtained with acquire_detector().
+
+    Parameters:
+        detector: SharedDetector to release (None is ignored)
+    """
+    _registry.release(detector)
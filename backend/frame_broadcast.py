@@ -0,0 +1,466 @@
+# =============================================================================
+# Frame Broadcast Module
+# =============================================================================
+# This file shares the JPEG encoding of a live stream between all of its
+# viewers.
+#
+# Before, every viewer of /api/stream/{room_id} or /api/webcam/stream
+# called cv2.imencode on the same frame, while holding the processor's
+# lock - N viewers meant N encodes per frame and a processing thread
+# waiting on them.
+#
+# How it works:
+#   - The processing thread publishes each annotated frame with
+#     publish(): that only stores a reference and bumps a sequence
+#     number (no encoding in the capture loop)
+#   - The first viewer that asks for a new sequence number encodes it;
+#     viewers asking meanwhile wait for that encode instead of starting
+#     their own
+#   - The result is an immutable EncodedFrame (sequence number, JPEG
+#     bytes and the ready-to-send multipart chunk) handed to every
+#     viewer as-is
+#   - Viewers block on a condition variable until a frame newer than the
+#     last one they sent is published (frames(): no sleep-polling, and
+#     each viewer gets each frame at most once - a slow viewer skips
+#     straight to the newest frame)
+#   - Async viewers (aframes(), used by the streaming endpoints) wait on
+#     one asyncio future per event loop instead: publish() resolves it
+#     with a single call_soon_threadsafe, however many viewers wait on
+#     it, and the encode runs once in the loop's default executor. An
+#     open stream then costs a coroutine, not a threadpool worker.
+#   - Viewers may ask for a variant (max width, JPEG quality): each
+#     distinct variant is encoded once per frame and shared by every
+#     viewer asking for it, so a grid of thumbnails costs one small
+#     encode per frame. A max fps per viewer only thins out what that
+#     viewer is sent. Widths at or above the frame width use the full
+#     size frame; at most MAX_VARIANTS variants are kept per stream
+#     (more fall back to the full frame), and variants nobody asked for
+#     in VARIANT_IDLE_SECONDS are dropped.
+#
+# Encode cost is O(frames) instead of O(frames x viewers), and frames
+# nobody watches are never encoded.
+# =============================================================================
+
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+# One encoded frame, shared by every viewer
+# (seq: publish sequence number, jpeg: JPEG bytes, chunk: multipart part)
+EncodedFrame = namedtuple("EncodedFrame", ["seq", "jpeg", "chunk", "timestamp"])
+
+# Longest a viewer waits for a frame before re-checking that the stream
+# is still running (and letting a disconnected client's generator exit)
+FRAME_WAIT_TIMEOUT = 1.0
+
+# Variant limits. Widths are rounded to VARIANT_WIDTH_STEP pixels so
+# near-identical requests share one encode.
+VARIANT_WIDTH_STEP = 16
+VARIANT_MIN_WIDTH = 64
+VARIANT_QUALITY_RANGE = (10, 95)
+
+# The original frame at the stream's own quality
+FULL_VARIANT = (None, None)
+
+# Variants kept per stream (a client cycling widths can't grow it), and
+# how long a variant nobody asks for keeps its encode, lock and counter
+MAX_VARIANTS = 8
+VARIANT_IDLE_SECONDS = 30.0
+
+
+def stream_variant(max_width=None, quality=None):
+    """
+    Normalize a viewer's size/quality request into a variant key.
+
+    Parameters:
+        max_width: Largest frame width in pixels (None/0 = original size;
+                   frames are never upscaled)
+        quality: JPEG quality (None/0 = the stream's default)
+
+    Returns:
+        (max_width, quality) tuple, FULL_VARIANT for the defaults
+    """
+    width = None
+    if max_width:
+        width = max(VARIANT_MIN_WIDTH, round(max_width / VARIANT_WIDTH_STEP) * VARIANT_WIDTH_STEP)
+
+    low, high = VARIANT_QUALITY_RANGE
+    return (width, min(max(int(quality), low), high) if quality else None)
+
+
+def multipart_chunk(jpeg):
+    """Wrap JPEG bytes as one part of a multipart/x-mixed-replace stream."""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n'
+            b'\r\n' + jpeg + b'\r\n')
+
+
+class FrameBroadcaster:
+    """
+    Latest frame of one stream, encoded at most once.
+
+    Attributes:
+        quality: JPEG quality 1-100 (None = OpenCV default)
+        seq: Sequence number of the latest published frame (0 = none yet)
+    """
+
+    def __init__(self, quality=None):
+        """
+        Initialize the broadcaster.
+
+        Parameters:
+            quality: JPEG quality 1-100 (None = OpenCV default)
+        """
+        self.quality = quality
+        self.seq = 0
+
+        # Latest published frame (never modified after publishing)
+        self._frame = None
+        self._published_at = None
+
+        # Latest encoding of each variant that was asked for
+        self._encoded = {}
+
+        # Counters: frames published, encoded (per variant, plus those
+        # of dropped variants) and handed to viewers
+        self._published = 0
+        self._encodes = {}
+        self._dropped_encodes = 0
+        self._served = 0
+
+        # Variant -> when a viewer last asked for it (time.monotonic)
+        self._variant_used = {}
+
+        # Viewers currently in frames() or aframes()
+        self._viewers = 0
+
+        # Async viewers: event loop -> future resolved on the next publish,
+        # and (loop, variant) -> (seq, future) of the encode being run
+        self._loop_waiters = {}
+        self._loop_encodes = {}
+
+        # _lock guards the fields above, _new_frame (on the same lock)
+        # wakes viewers on publish; one encode lock per variant makes
+        # concurrent viewers of a new frame share one encode
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._encode_locks = {}
+
+    @property
+    def viewers(self):
+        """Viewers currently streaming (in frames() or aframes())."""
+        return self._viewers
+
+    def publish(self, frame):
+        """
+        Make a frame the latest one (called by the processing thread).
+
+        Parameters:
+            frame: Annotated BGR frame - must not be modified afterwards
+        """
+        with self._new_frame:
+            self._frame = frame
+            self._published_at = time.time()
+            self.seq += 1
+            self._published += 1
+            self._prune_variants(time.monotonic())
+            self._new_frame.notify_all()
+            loops = list(self._loop_waiters)
+
+        self._wake_loops(loops)
+
+    def _resolve_variant(self, variant):
+        """
+        Map a requested variant to the one to encode (lock held).
+
+        Widths at or above the frame's are the full-size frame, and a
+        new variant past MAX_VARIANTS gets the full frame instead.
+        """
+        max_width, quality = variant
+        if max_width and self._frame is not None and max_width >= self._frame.shape[1]:
+            variant = (None, quality)
+
+        now = time.monotonic()
+        if variant not in self._variant_used and variant != FULL_VARIANT:
+            self._prune_variants(now)
+            if len(self._variant_used) >= MAX_VARIANTS:
+                variant = FULL_VARIANT
+
+        self._variant_used[variant] = now
+        return variant
+
+    def _prune_variants(self, now):
+        """Drop variants no viewer asked for lately (lock held)."""
+        for variant, used in list(self._variant_used.items()):
+            if now - used <= VARIANT_IDLE_SECONDS:
+                continue
+            del self._variant_used[variant]
+            self._encoded.pop(variant, None)
+            self._encode_locks.pop(variant, None)
+            self._dropped_encodes += self._encodes.pop(variant, 0)
+            for key in [key for key in self._loop_encodes if key[1] == variant]:
+                del self._loop_encodes[key]
+
+    def clear(self):
+        """Forget the latest frame (stream stopped)."""
+        with self._new_frame:
+            self._frame = None
+            self._encoded.clear()
+            self._new_frame.notify_all()
+            loops = list(self._loop_waiters)
+
+        self._wake_loops(loops)
+
+    def _wake_loops(self, loops):
+        """Resolve the next-frame future of every loop with async viewers."""
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._resolve_waiter, loop)
+            except RuntimeError:
+                # Event loop closed
+                with self._lock:
+                    self._loop_waiters.pop(loop, None)
+
+    def _resolve_waiter(self, loop):
+        """Wake the async viewers of one loop (runs in that loop)."""
+        with self._lock:
+            waiter = self._loop_waiters.pop(loop, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def wait(self, after_seq, timeout=FRAME_WAIT_TIMEOUT, variant=FULL_VARIANT):
+        """
+        Block until a frame newer than after_seq is published.
+
+        Parameters:
+            after_seq: Sequence number of the last frame the viewer sent
+            timeout: Longest wait in seconds
+            variant: Size/quality to encode (see stream_variant)
+
+        Returns:
+            EncodedFrame (the newest one), or None on timeout
+        """
+        with self._new_frame:
+            ready = self._new_frame.wait_for(
+                lambda: self.seq > after_seq and self._frame is not None, timeout
+            )
+        return self.latest(variant) if ready else None
+
+    def frames(self, is_running=None, timeout=FRAME_WAIT_TIMEOUT, variant=FULL_VARIANT,
+               max_fps=None):
+        """
+        Yield every new frame once, blocking in between.
+
+        Parameters:
+            is_running: function() -> False when the stream has stopped
+                        (checked after every wait)
+            timeout: Longest single wait in seconds
+            variant: Size/quality to encode (see stream_variant)
+            max_fps: Send at most this many frames per second (the
+                     newest one each time; None = every frame)
+
+        Yields:
+            EncodedFrame, each with a higher seq than the previous one
+        """
+        min_interval = 1.0 / max_fps if max_fps else 0.0
+
+        with self._lock:
+            self._viewers += 1
+
+        try:
+            seq = 0
+            while is_running is None or is_running():
+                frame = self.wait(seq, timeout, variant)
+                if frame is None or frame.seq <= seq:
+                    continue
+                seq = frame.seq
+                sent_at = time.monotonic()
+                yield frame
+
+                if min_interval:
+                    delay = sent_at + min_interval - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            # Client disconnected (generator closed) or stream stopped
+            with self._lock:
+                self._viewers -= 1
+
+    async def aframes(self, is_running=None, timeout=FRAME_WAIT_TIMEOUT, variant=FULL_VARIANT,
+                      max_fps=None):
+        """
+        Async version of frames(), for streaming endpoints.
+
+        Waiting takes no thread: viewers on the same event loop share one
+        future that the publishing thread resolves. Encoding a new frame
+        runs once per loop and variant in the default executor.
+
+        Parameters:
+            is_running: function() -> False when the stream has stopped
+            timeout: Longest single wait in seconds
+            variant: Size/quality to encode (see stream_variant)
+            max_fps: Send at most this many frames per second
+
+        Yields:
+            EncodedFrame, each with a higher seq than the previous one
+        """
+        loop = asyncio.get_running_loop()
+        min_interval = 1.0 / max_fps if max_fps else 0.0
+
+        with self._lock:
+            self._viewers += 1
+
+        try:
+            seq = 0
+            while is_running is None or is_running():
+                with self._lock:
+                    current = self.seq
+                    fresh = current > seq and self._frame is not None
+                    if not fresh:
+                        waiter = self._loop_waiters.get(loop)
+                        if waiter is None or waiter.done():
+                            waiter = self._loop_waiters[loop] = loop.create_future()
+
+                if not fresh:
+                    try:
+                        await asyncio.wait_for(asyncio.shield(waiter), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                frame = await self._aencoded(loop, variant)
+                if frame is None:
+                    # Encode failed or stream cleared - skip this frame
+                    seq = current
+                    continue
+                if frame.seq <= seq:
+                    continue
+                seq = frame.seq
+                sent_at = loop.time()
+                yield frame
+
+                if min_interval:
+                    delay = sent_at + min_interval - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                self._viewers -= 1
+
+    async def _aencoded(self, loop, variant):
+        """Get the latest EncodedFrame without blocking the event loop."""
+        with self._lock:
+            variant = self._resolve_variant(variant)
+            encoded = self._encoded.get(variant)
+            if encoded is not None and encoded.seq == self.seq:
+                self._served += 1
+                return encoded
+            seq = self.seq
+
+        # One encode per frame and variant for all viewers on this loop
+        key = (loop, variant)
+        with self._lock:
+            pending = self._loop_encodes.get(key)
+            if pending is None or pending[0] != seq:
+                pending = (seq, loop.run_in_executor(None, self._current, variant))
+                self._loop_encodes[key] = pending
+
+        encoded = await asyncio.shield(pending[1])
+        if encoded is not None:
+            with self._lock:
+                self._served += 1
+        return encoded
+
+    def latest(self, variant=FULL_VARIANT):
+        """
+        Get the latest frame, encoding it if no viewer has yet.
+
+        Parameters:
+            variant: Size/quality to encode (see stream_variant)
+
+        Returns:
+            EncodedFrame, or None if no frame was published
+        """
+        encoded = self._current(variant)
+        if encoded is not None:
+            with self._lock:
+                self._served += 1
+        return encoded
+
+    def _current(self, variant=FULL_VARIANT):
+        """Get the latest EncodedFrame of a variant, encoding it once (blocking)."""
+        with self._lock:
+            variant = self._resolve_variant(variant)
+            encoded = self._encoded.get(variant)
+            if encoded is not None and encoded.seq == self.seq:
+                return encoded
+            if self._frame is None:
+                return None
+            encode_lock = self._encode_locks.setdefault(variant, threading.Lock())
+
+        with encode_lock:
+            # Another viewer may have encoded it while we waited
+            with self._lock:
+                frame, seq, published_at = self._frame, self.seq, self._published_at
+                encoded = self._encoded.get(variant)
+            if frame is None:
+                return None
+            if encoded is None or encoded.seq != seq:
+                encoded = self._encode(frame, seq, published_at, variant)
+                if encoded is None:
+                    return None
+
+        with self._lock:
+            stored = self._encoded.get(variant)
+            if stored is None or stored.seq < encoded.seq:
+                self._encoded[variant] = encoded
+        return encoded
+
+    def _encode(self, frame, seq, published_at, variant):
+        """Resize and encode one frame (outside the state lock)."""
+        import cv2
+
+        max_width, quality = variant
+        quality = quality or self.quality
+
+        height, width = frame.shape[:2]
+        if max_width and width > max_width:
+            frame = cv2.resize(
+                frame, (max_width, max(1, round(height * max_width / width))),
+                interpolation=cv2.INTER_AREA
+            )
+
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality] if quality else []
+        ret, buffer = cv2.imencode('.jpg', frame, params)
+        if not ret:
+            return None
+
+        jpeg = buffer.tobytes()
+        with self._lock:
+            self._encodes[variant] = self._encodes.get(variant, 0) + 1
+        return EncodedFrame(seq, jpeg, multipart_chunk(jpeg), published_at)
+
+    def stats(self):
+        """
+        Get encode sharing statistics.
+
+        Returns:
+            Dictionary with viewers, frames published, encoded (in total
+            and per variant) and served, and served frames per encode
+        """
+        with self._lock:
+            encodes = sum(self._encodes.values()) + self._dropped_encodes
+            return {
+                "seq": self.seq,
+                "viewers": self._viewers,
+                "published": self._published,
+                "encoded": encodes,
+                "served": self._served,
+                "served_per_encode": round(self._served / encodes, 2) if encodes else 0.0,
+                "variants": [
+                    {"max_width": max_width, "quality": quality or self.quality, "encoded": count}
+                    for (max_width, quality), count in self._encodes.items()
+                ]
+            }
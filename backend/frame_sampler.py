@@ -0,0 +1,152 @@
+# =============================================================================
+# Frame Sampler Module
+# =============================================================================
+# This file reads only the frames of a video that will be analyzed.
+#
+# cap.read() = grab (demux + decode) + retrieve (convert to BGR). When only
+# every Nth frame is needed, the skipped frames don't need the BGR
+# conversion (and for large strides not even decoding):
+#   - "grab" strategy (small strides): skipped frames are only grab()bed,
+#     sampled frames are read in full
+#   - "seek" strategy (large strides): jump straight to each sampled frame
+#     with a position (timestamp) seek; the decoder only decodes from the
+#     nearest keyframe
+#
+# Sampling can be "every Nth frame" (frame_skip) or "every N seconds"
+# (converted to a frame stride with the video's fps). Sampled frames are
+# always multiples of the stride, so any frame range (see the parallel
+# mode of video_analysis.py) samples exactly the same frames.
+# =============================================================================
+
+# Strides of at least this many frames use seeking instead of grabbing
+SEEK_MIN_STRIDE = 50
+
+
+def sampling_stride(fps, frame_skip=1, every_seconds=None):
+    """
+    Get the frame stride for a sampling request.
+
+    Parameters:
+        fps: Video frame rate
+        frame_skip: Analyze every Nth frame (used if every_seconds is not set)
+        every_seconds: Analyze one frame every N seconds
+
+    Returns:
+        Stride in frames (>= 1)
+
+    Raises:
+        ValueError: If frame_skip or every_seconds is invalid
+    """
+    if every_seconds:
+        if every_seconds < 0:
+            raise ValueError("sample_seconds must be >= 0")
+        return max(1, round(every_seconds * (fps or 30.0)))
+
+    if frame_skip < 1:
+        raise ValueError("frame_skip must be >= 1")
+    return int(frame_skip)
+
+
+class FrameSampler:
+    """
+    Yields the sampled frames of an open video capture.
+
+    Attributes:
+        cap: OpenCV VideoCapture (owned by the caller)
+        stride: Sample every `stride` frames
+        strategy: "grab" or "seek"
+    """
+
+    def __init__(self, cap, stride, fps=None, seek_min_stride=SEEK_MIN_STRIDE):
+        """
+        Initialize the sampler.
+
+        Parameters:
+            cap: Open OpenCV VideoCapture
+            stride: Frame stride (see sampling_stride())
+            fps: Video frame rate (seeks by timestamp when known)
+            seek_min_stride: Strides from this size on seek instead of grab
+        """
+        self.cap = cap
+        self.stride = max(1, int(stride))
+        self.fps = fps
+        self.strategy = "seek" if self.stride >= seek_min_stride else "grab"
+
+    def frames(self, start_frame=0, end_frame=None):
+        """
+        Yield the sampled frames of a frame range.
+
+        Parameters:
+            start_frame: First frame of the range
+            end_frame: Frame after the last one (None = until the end)
+
+        Yields:
+            (frame_index, BGR frame) for every multiple of the stride
+            in the range
+        """
+        # First sampled frame in the range
+        frame_index = -(-start_frame // self.stride) * self.stride
+        if frame_index > 0:
+            self._seek(frame_index)
+
+        while end_frame is None or frame_index < end_frame:
+            ret, frame = self.cap.read()
+            if not ret or frame is None:
+                return
+
+            yield frame_index, frame
+
+            next_index = frame_index + self.stride
+            if self.strategy == "seek":
+                # Jump to the next sample (decoder restarts at a keyframe)
+                self._seek(next_index)
+            else:
+                # Decode the frames in between but skip their conversion
+                for _ in range(self.stride - 1):
+                    if end_frame is not None and frame_index + 1 >= end_frame:
+                        break
+                    if not self.cap.grab():
+                        return
+                    frame_index += 1
+
+            frame_index = next_index
+
+    def frame_at(self, frame_index):
+        """
+        Read a single frame (random access).
+
+        Parameters:
+            frame_index: Frame to read
+
+        Returns:
+            BGR frame, or None past the end of the video
+        """
+        self._seek(frame_index)
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _seek(self, frame_index):
+        """Position the capture on a frame (by timestamp if fps is known)."""
+        import cv2
+
+        if self.fps:
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, frame_index * 1000.0 / self.fps)
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+    def describe(self, every_seconds=None):
+        """
+        Describe the sampling for API responses.
+
+        Parameters:
+            every_seconds: The seconds-based request, if any
+
+        Returns:
+            Dictionary with mode, stride and strategy
+        """
+        return {
+            "mode": "seconds" if every_seconds else "frames",
+            "every_seconds": every_seconds or (round(self.stride / self.fps, 3) if self.fps else None),
+            "stride_frames": self.stride,
+            "strategy": self.strategy
+        }
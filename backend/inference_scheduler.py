@@ -0,0 +1,472 @@
+# =============================================================================
+# Batched Inference Scheduler Module
+# =============================================================================
+# This file runs person detection for ALL active streams in one place.
+#
+# Without it, every camera thread calls the detector on its own frame,
+# so N cameras mean N small forward passes fighting over the CPU. The
+# scheduler instead collects the latest frame from every active source
+# (CCTV rooms, webcam, uploaded-video streams) and runs them through the
+# detector as one batch.
+#
+# Batching policy:
+#   - max_batch: A batch is dispatched as soon as this many frames wait
+#   - max_wait: ...or when the oldest waiting frame is this old (the tick)
+#   - If every registered source already has a frame waiting, the batch
+#     is dispatched immediately (no point waiting for more)
+#
+# Each source keeps at most one frame in the queue - a newer frame from the
+# same source replaces the older one, and both callers get the result.
+#
+# Per-batch latency and size statistics are kept for sizing the server.
+# =============================================================================
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from .detector_registry import acquire_detector, release_detector
+
+# Default batching policy (overridable through environment variables)
+DEFAULT_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "8"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "20"))
+
+# How long a caller waits for its result before giving up
+RESULT_TIMEOUT_SECONDS = 10.0
+
+# Number of recent batches kept for latency statistics
+STATS_WINDOW = 200
+
+
+class _Request:
+    """A frame waiting for detection, plus everyone waiting for it."""
+
+    def __init__(self, source, frame, detector, options):
+        self.source = source
+        self.frame = frame
+        self.detector = detector
+        self.options = options
+        self.futures = [Future()]
+        self.submitted_at = time.perf_counter()
+
+    def group_key(self):
+        # Frames can only share a forward pass if they use the same
+        # detector and the same inference options
+        return (id(self.detector), tuple(sorted(self.options.items())))
+
+
+class InferenceScheduler:
+    """
+    Collects frames from many streams and runs them as batches.
+
+    Attributes:
+        max_batch: Maximum number of frames per forward pass
+        max_wait: Maximum time (seconds) a frame waits for a batch to fill
+        detector: Default shared detector (from the detector registry)
+        is_running: Whether the scheduler thread is active
+    """
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        """
+        Initialize the scheduler.
+
+        Parameters:
+            max_batch: Maximum frames per batch (default from INFERENCE_MAX_BATCH)
+            max_wait_ms: Maximum wait for a batch to fill in milliseconds
+                         (default from INFERENCE_MAX_WAIT_MS)
+        """
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self.detector = None
+        self.is_running = False
+        self._thread = None
+
+        # source -> _Request (insertion order = arrival order)
+        self._pending = {}
+
+        # Sources that are currently streaming (see register_source)
+        self._sources = set()
+
+        # Condition used to wake the scheduler thread
+        self._cond = threading.Condition()
+
+        # Statistics
+        self._batch_latencies = deque(maxlen=STATS_WINDOW)
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._queue_waits = deque(maxlen=STATS_WINDOW)
+        self._total_batches = 0
+        self._total_frames = 0
+        self._replaced_frames = 0
+        self._errors = 0
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start the scheduler thread (no-op if already running)."""
+        with self._cond:
+            if self.is_running:
+                return
+            needs_detector = self.detector is None
+
+        # Take a reference to the default shared detector outside the lock:
+        # loading the model is slow and submit()/stats() must not wait on it
+        detector = acquire_detector() if needs_detector else None
+
+        with self._cond:
+            started = not self.is_running
+            if started:
+                if self.detector is None:
+                    self.detector, detector = detector, None
+                self.is_running = True
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+        # Another caller won the race - drop the reference we took
+        if detector is not None:
+            release_detector(detector)
+        if not started:
+            return
+
+        print(f"🚀 Inference scheduler started (max_batch={self.max_batch}, "
+              f"max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def stop(self):
+        """
+        Stop the scheduler thread.
+
+        Frames still waiting are failed so no caller blocks forever.
+        """
+        with self._cond:
+            if not self.is_running:
+                return
+            self.is_running = False
+            self._cond.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=5)
+
+        # Fail anything left in the queue
+        with self._cond:
+            leftovers = list(self._pending.values())
+            self._pending.clear()
+        for request in leftovers:
+            for future in request.futures:
+                future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+        release_detector(self.detector)
+        self.detector = None
+
+        print("Inference scheduler stopped")
+
+    # -------------------------------------------------------------------------
+    # Sources
+    # -------------------------------------------------------------------------
+
+    def register_source(self, source):
+        """
+        Mark a source (room, webcam, video session) as actively streaming.
+
+        The scheduler uses the number of active sources to know when a
+        batch is "complete" and can be dispatched without waiting.
+
+        Parameters:
+            source: Unique identifier of the stream
+        """
+        with self._cond:
+            self._sources.add(source)
+
+    def unregister_source(self, source):
+        """
+        Mark a source as no longer streaming.
+
+        Parameters:
+            source: Identifier passed to register_source()
+        """
+        with self._cond:
+            self._sources.discard(source)
+            self._cond.notify_all()
+
+    # -------------------------------------------------------------------------
+    # Submitting frames
+    # -------------------------------------------------------------------------
+
+    def submit(self, frame, source, detector=None, **options):
+        """
+        Queue a frame for detection.
+
+        Parameters:
+            frame: Frame (numpy array) to run detection on
+            source: Identifier of the stream the frame came from
+            detector: SharedDetector to use (default: scheduler's detector)
+            **options: YOLO call options (conf, classes, imgsz, ...)
+
+        Returns:
+            Future resolving to the YOLO Results object for this frame
+        """
+        if not self.is_running:
+            self.start()
+
+        options.setdefault("verbose", False)
+
+        with self._cond:
+            request = _Request(source, frame, detector or self.detector, options)
+
+            previous = self._pending.pop(source, None)
+            if previous is not None:
+                # Only the newest frame of a source is worth detecting -
+                # whoever waited on the old one gets the new result
+                request.futures = previous.futures + request.futures
+                request.submitted_at = previous.submitted_at
+                self._replaced_frames += 1
+
+            self._pending[source] = request
+            self._cond.notify_all()
+
+            return request.futures[-1]
+
+    def detect(self, frame, source, detector=None, **options):
+        """
+        Run detection on a frame through the batch and wait for the result.
+
+        This is a drop-in replacement for calling the model directly:
+        the return value is a one-element list, like ``model(frame)``.
+
+        Parameters:
+            frame: Frame (numpy array) to run detection on
+            source: Identifier of the stream the frame came from
+            detector: SharedDetector to use (default: scheduler's detector)
+            **options: YOLO call options (conf, classes, imgsz, ...)
+
+        Returns:
+            List containing the YOLO Results object for this frame
+        """
+        future = self.submit(frame, source, detector, **options)
+        return [future.result(timeout=RESULT_TIMEOUT_SECONDS)]
+
+    # -------------------------------------------------------------------------
+    # Scheduler thread
+    # -------------------------------------------------------------------------
+
+    def _batch_ready(self, now):
+        """
+        Check whether the pending frames should be dispatched.
+
+        Must be called with self._cond held.
+        """
+        if not self._pending:
+            return False
+
+        # Batch is full
+        if len(self._pending) >= self.max_batch:
+            return True
+
+        # Every active source has a frame waiting
+        if self._sources and self._sources.issubset(self._pending.keys()):
+            return True
+
+        # Oldest frame has waited long enough (the tick)
+        oldest = next(iter(self._pending.values()))
+        return now - oldest.submitted_at >= self.max_wait
+
+    def _take_batch(self):
+        """
+        Remove up to max_batch requests that can share one forward pass.
+
+        Must be called with self._cond held.
+        """
+        first = next(iter(self._pending.values()))
+        key = first.group_key()
+
+        batch = []
+        for source, request in list(self._pending.items()):
+            if request.group_key() == key:
+                batch.append(request)
+                del self._pending[source]
+                if len(batch) >= self.max_batch:
+                    break
+
+        return batch
+
+    def _run(self):
+        """Main scheduler loop - wait for a batch, run it, fan out results."""
+        while True:
+            with self._cond:
+                while self.is_running:
+                    now = time.perf_counter()
+                    if self._batch_ready(now):
+                        break
+
+                    if self._pending:
+                        # Sleep until the oldest frame hits max_wait
+                        oldest = next(iter(self._pending.values()))
+                        timeout = max(0.0, oldest.submitted_at + self.max_wait - now)
+                        self._cond.wait(timeout)
+                    else:
+                        self._cond.wait()
+
+                if not self.is_running:
+                    return
+
+                batch = self._take_batch()
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        """
+        Run one batch through the detector and resolve the futures.
+
+        Parameters:
+            batch: List of _Request objects sharing detector and options
+        """
+        detector = batch[0].detector
+        options = batch[0].options
+        frames = [request.frame for request in batch]
+
+        started = time.perf_counter()
+
+        try:
+            results = detector(frames, **options)
+        except Exception as e:
+            self._errors += 1
+            print(f" Batched inference failed ({len(batch)} frames): {e}")
+            for request in batch:
+                for future in request.futures:
+                    future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+
+        # Fan results back to each source
+        for request, result in zip(batch, results):
+            for future in request.futures:
+                future.set_result(result)
+
+        # Record statistics
+        with self._cond:
+            self._total_batches += 1
+            self._total_frames += len(batch)
+            self._batch_latencies.append(finished - started)
+            self._batch_sizes.append(len(batch))
+            for request in batch:
+                self._queue_waits.append(started - request.submitted_at)
+
+    # -------------------------------------------------------------------------
+    # Statistics
+    # -------------------------------------------------------------------------
+
+    def stats(self):
+        """
+        Get batching and latency statistics.
+
+        Returns:
+            Dictionary with policy, totals and recent latency figures
+            (milliseconds, over the last STATS_WINDOW batches)
+        """
+        with self._cond:
+            latencies = sorted(self._batch_latencies)
+            sizes = list(self._batch_sizes)
+            waits = list(self._queue_waits)
+
+            stats = {
+                "running": self.is_running,
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "active_sources": len(self._sources),
+                "pending_frames": len(self._pending),
+                "total_batches": self._total_batches,
+                "total_frames": self._total_frames,
+                "replaced_frames": self._replaced_frames,
+                "errors": self._errors,
+            }
+
+        if latencies:
+            p95_index = min(len(latencies) - 1, int(len(latencies) * 0.95))
+            avg_latency = sum(latencies) / len(latencies)
+            avg_size = sum(sizes) / len(sizes)
+            stats.update({
+                "avg_batch_size": round(avg_size, 2),
+                "avg_batch_latency_ms": round(avg_latency * 1000, 2),
+                "p95_batch_latency_ms": round(latencies[p95_index] * 1000, 2),
+                "max_batch_latency_ms": round(latencies[-1] * 1000, 2),
+                "avg_frame_latency_ms": round(avg_latency / avg_size * 1000, 2),
+                "avg_queue_wait_ms": round(sum(waits) / len(waits) * 1000, 2),
+            })
+
+        return stats
+
+
+# =============================================================================
+# Global Scheduler
+# =============================================================================
+# One scheduler per process, shared by every stream processor.
+# =============================================================================
+
+_scheduler = None
+
+# Lock for thread-safe creation of the scheduler
+_scheduler_lock = threading.Lock()
+
+# Set by shutdown_scheduler() so late callers cannot bring it back up
+_shut_down = False
+
+
+def get_scheduler():
+    """
+    Get the process-wide inference scheduler, starting it if needed.
+
+    Returns:
+        InferenceScheduler instance
+
+    Raises:
+        RuntimeError: If the scheduler was shut down
+    """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _shut_down:
+            raise RuntimeError("Inference scheduler is shut down")
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        scheduler = _scheduler
+
+    scheduler.start()
+    return scheduler
+
+
+def unregister_source(source):
+    """
+    Mark a source as no longer streaming, without starting the scheduler.
+
+    Used by stopping streams: if the scheduler is not running (or was
+    shut down) there is nothing to unregister from.
+
+    Parameters:
+        source: Identifier passed to register_source()
+    """
+    with _scheduler_lock:
+        scheduler = _scheduler
+
+    if scheduler is not None:
+        scheduler.unregister_source(source)
+
+
+def shutdown_scheduler():
+    """
+    Stop the inference scheduler.
+
+    Called during application shutdown.
+    """
+    global _scheduler, _shut_down
+
+    with _scheduler_lock:
+        scheduler = _scheduler
+        _scheduler = None
+        _shut_down = True
+
+    if scheduler is not None:
+        scheduler.stop()
@@ -0,0 +1,288 @@
+# =============================================================================
+# Mosaic Stream Module
+# =============================================================================
+# This file tiles the latest annotated frames of several CCTV rooms into
+# one MJPEG stream (/api/stream/mosaic), so a security desk needs one
+# connection and one decode for the whole building instead of one per
+# room.
+#
+# How it works:
+#   - A MosaicComposer is created per (rooms, columns, tile width, fps)
+#     and shared by every viewer asking for that layout
+#   - A background thread composes at most `fps` times per second, and
+#     only when one of the rooms published a new frame: each room's
+#     frame is resized into its preallocated tile buffer, labelled and
+#     copied into a preallocated canvas (two canvases, used in turn, so
+#     the one being sent is never drawn on)
+#   - The canvas is published to a FrameBroadcaster and encoded once
+#     right away; every mosaic viewer gets the same JPEG bytes
+#   - Rooms without a camera show a "No signal" tile
+#   - With no viewers for MOSAIC_IDLE_SECONDS the thread stops and the
+#     composer is dropped
+# =============================================================================
+
+import math
+import os
+import threading
+import time
+
+from .cctv_stream import get_stream_processor
+from .frame_broadcast import FrameBroadcaster
+
+# Default layout (a viewer may ask for another one)
+MOSAIC_TILE_WIDTH = int(os.environ.get("MOSAIC_TILE_WIDTH", "320"))
+MOSAIC_FPS = float(os.environ.get("MOSAIC_FPS", "5"))
+
+# Seconds a mosaic keeps composing without viewers
+MOSAIC_IDLE_SECONDS = float(os.environ.get("MOSAIC_IDLE_SECONDS", "10"))
+
+# Limits on what a viewer may ask for
+MOSAIC_MAX_ROOMS = 64
+MOSAIC_MAX_FPS = 30.0
+MOSAIC_TILE_WIDTH_RANGE = (64, 1280)
+
+
+class MosaicComposer:
+    """
+    One tiled multi-room stream.
+
+    Attributes:
+        room_ids: Rooms in tile order (row by row)
+        cols, rows: Grid size
+        tile_width, tile_height: Tile size in pixels (16:9)
+        fps: Most mosaics composed per second
+        frames: FrameBroadcaster of the composed mosaic
+    """
+
+    def __init__(self, room_ids, cols=0, tile_width=MOSAIC_TILE_WIDTH, fps=MOSAIC_FPS):
+        """
+        Initialize the composer and allocate its buffers.
+
+        Parameters:
+            room_ids: Rooms to show
+            cols: Grid columns (0 = as square as possible)
+            tile_width: Tile width in pixels (default MOSAIC_TILE_WIDTH)
+            fps: Most mosaics composed per second (default MOSAIC_FPS)
+        """
+        import numpy as np
+
+        self.room_ids = list(room_ids)
+        self.cols = cols or math.ceil(math.sqrt(len(self.room_ids)))
+        self.rows = math.ceil(len(self.room_ids) / self.cols)
+        self.tile_width = tile_width
+        self.tile_height = tile_width * 9 // 16
+        self.fps = fps
+
+        height = self.rows * self.tile_height
+        width = self.cols * self.tile_width
+
+        # Two canvases in turn: one being sent, one being drawn
+        self._canvases = [np.zeros((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        self._next_canvas = 0
+
+        # One resize buffer per tile, plus the "No signal" tile
+        self._tiles = [
+            np.empty((self.tile_height, self.tile_width, 3), dtype=np.uint8)
+            for _ in self.room_ids
+        ]
+        self._no_signal = self._placeholder_tile()
+
+        # Sequence number of each room's frame in the last mosaic
+        # (None = no signal, -1 = not composed yet)
+        self._tile_seqs = [-1] * len(self.room_ids)
+
+        self.frames = FrameBroadcaster()
+        self.running = False
+        self._composed = 0
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _placeholder_tile(self):
+        """Draw the tile shown for rooms without a camera."""
+        import cv2
+        import numpy as np
+
+        tile = np.full((self.tile_height, self.tile_width, 3), 40, dtype=np.uint8)
+        cv2.putText(tile, "No signal", (10, self.tile_height // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1)
+        return tile
+
+    def start(self):
+        """Start composing in a background thread (once)."""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="mosaic", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop composing."""
+        self._stop.set()
+        self.running = False
+        self.frames.clear()
+
+    def _run(self):
+        """Compose at most fps times per second while anyone watches."""
+        interval = 1.0 / self.fps
+        idle_since = None
+
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+
+                # Stop once nobody has watched for a while
+                if self.frames.viewers:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = started
+                elif started - idle_since > MOSAIC_IDLE_SECONDS:
+                    break
+
+                if self._compose():
+                    canvas = self._canvases[self._next_canvas]
+                    self._next_canvas = 1 - self._next_canvas
+                    self.frames.publish(canvas)
+
+                    # Encode now, once for all viewers, before this
+                    # canvas is drawn on again
+                    self.frames.latest()
+                    self._composed += 1
+
+                self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+        except Exception as e:
+            print(f"❌ Mosaic error: {e}")
+        finally:
+            self.running = False
+            _forget_mosaic(self)
+
+    def _compose(self):
+        """
+        Draw the rooms' latest frames into the next canvas.
+
+        Returns:
+            True if a new mosaic was drawn (some room has a new frame)
+        """
+        import cv2
+
+        latest = []
+        for room_id in self.room_ids:
+            processor = get_stream_processor(room_id)
+            frame = None
+            seq = None
+            if processor is not None:
+                with processor.lock:
+                    frame = processor.current_frame
+                seq = processor.frames.seq if frame is not None else None
+            latest.append((frame, seq, processor))
+
+        seqs = [seq for _, seq, _ in latest]
+        if seqs == self._tile_seqs:
+            return False
+
+        canvas = self._canvases[self._next_canvas]
+        for index, (frame, seq, processor) in enumerate(latest):
+            row, col = divmod(index, self.cols)
+            y, x = row * self.tile_height, col * self.tile_width
+            slot = canvas[y:y + self.tile_height, x:x + self.tile_width]
+
+            if frame is None:
+                slot[:] = self._no_signal
+                label = self.room_ids[index]
+            else:
+                tile = self._tiles[index]
+                cv2.resize(frame, (self.tile_width, self.tile_height), dst=tile,
+                           interpolation=cv2.INTER_AREA)
+                slot[:] = tile
+                label = f"{self.room_ids[index]}: {processor.get_person_count()}"
+
+            cv2.putText(slot, label, (6, self.tile_height - 8),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+        self._tile_seqs = seqs
+        return True
+
+    def stats(self):
+        """
+        Get the mosaic layout and encode sharing.
+
+        Returns:
+            Dictionary with rooms, grid, size, fps, mosaics composed and
+            the broadcaster statistics
+        """
+        return {
+            "rooms": self.room_ids,
+            "cols": self.cols,
+            "rows": self.rows,
+            "width": self.cols * self.tile_width,
+            "height": self.rows * self.tile_height,
+            "fps": self.fps,
+            "running": self.running,
+            "composed": self._composed,
+            "broadcast": self.frames.stats()
+        }
+
+
+# =============================================================================
+# Global Mosaic Registry
+# =============================================================================
+# One composer per layout, shared by every viewer of that layout.
+# =============================================================================
+
+# Composers by (rooms, cols, tile_width, fps)
+_mosaics = {}
+
+# Lock for the registry
+_mosaics_lock = threading.Lock()
+
+
+def get_mosaic(room_ids, cols=0, tile_width=MOSAIC_TILE_WIDTH, fps=MOSAIC_FPS):
+    """
+    Get the running composer of a layout, starting it if needed.
+
+    Parameters:
+        room_ids: Rooms to show, in tile order
+        cols: Grid columns (0 = as square as possible)
+        tile_width: Tile width in pixels
+        fps: Most mosaics composed per second
+
+    Returns:
+        MosaicComposer instance (running)
+    """
+    key = (tuple(room_ids), cols, tile_width, fps)
+    with _mosaics_lock:
+        mosaic = _mosaics.get(key)
+        if mosaic is None or not mosaic.running:
+            mosaic = MosaicComposer(room_ids, cols, tile_width, fps)
+            _mosaics[key] = mosaic
+            mosaic.start()
+        return mosaic
+
+
+def _forget_mosaic(mosaic):
+    """Drop a composer whose thread has stopped."""
+    with _mosaics_lock:
+        for key, registered in list(_mosaics.items()):
+            if registered is mosaic:
+                del _mosaics[key]
+
+
+def get_mosaic_stats():
+    """
+    Get every running mosaic.
+
+    Returns:
+        List of MosaicComposer.stats() dictionaries
+    """
+    with _mosaics_lock:
+        mosaics = list(_mosaics.values())
+    return [mosaic.stats() for mosaic in mosaics]
+
+
+def stop_all_mosaics():
+    """Stop every composer (called when the API stops)."""
+    with _mosaics_lock:
+        mosaics = list(_mosaics.values())
+        _mosaics.clear()
+    for mosaic in mosaics:
+        mosaic.stop()
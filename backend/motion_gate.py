@@ -0,0 +1,246 @@
+# =============================================================================
+# Motion Gate Module
+# =============================================================================
+# This file decides whether a frame is worth running YOLO on.
+#
+# Most rooms are empty and static for hours. Running a full detector pass on
+# every frame of a static scene produces the same answer over and over.
+# The motion gate compares each frame with a cheap background model and
+# only lets the frame through to the detector when something moved.
+#
+# How it works:
+#   1. Downscale the frame (default 160px wide) and convert to grayscale
+#   2. Compare it with a running-average background model
+#   3. If enough pixels changed -> motion -> run the detector
+#   4. Otherwise re-use the last detection result
+#
+# Forced re-check:
+#   A person sitting still blends into the background after a while. To
+#   avoid marking them absent, the detector is always run again after
+#   `recheck_seconds` without a detection, motion or not.
+#
+# Every gate keeps counters so the CPU saved (skip ratio) can be shown
+# per room at GET /api/motion/stats.
+# =============================================================================
+
+import os
+import threading
+import time
+
+# Default settings (overridable through environment variables)
+MOTION_GATE_ENABLED = os.environ.get("MOTION_GATE_ENABLED", "1") not in ("0", "false", "False")
+DEFAULT_RECHECK_SECONDS = float(os.environ.get("MOTION_RECHECK_SECONDS", "5"))
+
+
+class MotionGate:
+    """
+    Cheap frame-differencing gate in front of the detector.
+
+    Attributes:
+        name: Room/stream this gate belongs to
+        width: Width frames are downscaled to before comparison
+        pixel_threshold: Gray-level change for a pixel to count as moved
+        motion_ratio: Fraction of moved pixels that counts as motion
+        recheck_seconds: Maximum time between detector runs
+        learning_rate: How fast the background adapts (0-1)
+        enabled: When False every frame goes to the detector
+    """
+
+    def __init__(self, name, width=160, pixel_threshold=25, motion_ratio=0.005,
+                 recheck_seconds=DEFAULT_RECHECK_SECONDS, learning_rate=0.05,
+                 enabled=MOTION_GATE_ENABLED):
+        """
+        Initialize the motion gate.
+
+        Parameters:
+            name: Room/stream this gate belongs to
+            width: Width frames are downscaled to (default 160)
+            pixel_threshold: Gray-level change per pixel (default 25)
+            motion_ratio: Fraction of changed pixels for motion (default 0.5%)
+            recheck_seconds: Forced detector interval (default 5s,
+                             MOTION_RECHECK_SECONDS)
+            learning_rate: Background adaptation rate (default 0.05)
+            enabled: Whether gating is active (MOTION_GATE_ENABLED)
+        """
+        self.name = name
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.recheck_seconds = recheck_seconds
+        self.learning_rate = learning_rate
+        self.enabled = enabled
+
+        # Running-average background (float32, downscaled gray)
+        self._background = None
+
+        # Time of the last frame let through to the detector
+        self._last_detection_time = 0.0
+
+        # Counters
+        self.frames_seen = 0
+        self.frames_detected = 0
+        self.frames_skipped = 0
+        self.motion_triggers = 0
+        self.recheck_triggers = 0
+
+        self._lock = threading.Lock()
+
+    def _prepare(self, frame):
+        """Downscale, convert to gray and blur a frame."""
+        import cv2
+
+        h, w = frame.shape[:2]
+        if w > self.width:
+            height = max(1, int(h * self.width / w))
+            frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        return cv2.GaussianBlur(frame, (5, 5), 0)
+
+    def has_motion(self, frame):
+        """
+        Compare a frame with the background model and update it.
+
+        Parameters:
+            frame: BGR frame (numpy array)
+
+        Returns:
+            True if the fraction of changed pixels exceeds motion_ratio
+        """
+        import cv2
+        import numpy as np
+
+        gray = self._prepare(frame)
+
+        # First frame (or the resolution changed) - start a new background
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        changed = np.count_nonzero(diff > self.pixel_threshold)
+
+        # Slowly absorb lighting changes (and still objects) into the background
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+
+        return changed > self.motion_ratio * diff.size
+
+    def should_detect(self, frame):
+        """
+        Decide whether the detector should run on this frame.
+
+        Parameters:
+            frame: BGR frame (numpy array)
+
+        Returns:
+            True  - run the detector (motion, forced re-check, or gate disabled)
+            False - re-use the last detection result
+        """
+        with self._lock:
+            self.frames_seen += 1
+
+            if not self.enabled:
+                self.frames_detected += 1
+                return True
+
+            now = time.time()
+            motion = self.has_motion(frame)
+            recheck_due = now - self._last_detection_time >= self.recheck_seconds
+
+            if motion or recheck_due:
+                if motion:
+                    self.motion_triggers += 1
+                else:
+                    self.recheck_triggers += 1
+
+                self.frames_detected += 1
+                self._last_detection_time = now
+                return True
+
+            self.frames_skipped += 1
+            return False
+
+    def reset(self):
+        """Forget the background so the next frame is always detected."""
+        with self._lock:
+            self._background = None
+            self._last_detection_time = 0.0
+
+    def stats(self):
+        """
+        Get the gate counters.
+
+        Returns:
+            Dictionary with frames seen/detected/skipped and skip_ratio
+        """
+        with self._lock:
+            skip_ratio = self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
+            return {
+                "enabled": self.enabled,
+                "frames_seen": self.frames_seen,
+                "frames_detected": self.frames_detected,
+                "frames_skipped": self.frames_skipped,
+                "skip_ratio": round(skip_ratio, 3),
+                "motion_triggers": self.motion_triggers,
+                "recheck_triggers": self.recheck_triggers,
+                "recheck_seconds": self.recheck_seconds
+            }
+
+
+# =============================================================================
+# Global Gate Registry
+# =============================================================================
+# Every stream creates its gate here so the API can report the skip ratio
+# of all rooms in one place.
+# =============================================================================
+
+# Dictionary of active gates by name (room_id / stream id)
+_gates = {}
+
+# Lock for thread-safe access to the gates dictionary
+_gates_lock = threading.Lock()
+
+
+def create_motion_gate(name, **settings):
+    """
+    Create a motion gate and register it for statistics.
+
+    Replaces any existing gate with the same name.
+
+    Parameters:
+        name: Room/stream identifier
+        **settings: MotionGate settings (width, recheck_seconds, ...)
+
+    Returns:
+        MotionGate instance
+    """
+    gate = MotionGate(name, **settings)
+    with _gates_lock:
+        _gates[name] = gate
+    return gate
+
+
+def remove_motion_gate(gate):
+    """
+    Unregister a motion gate when its stream stops.
+
+    Parameters:
+        gate: MotionGate returned by create_motion_gate()
+    """
+    with _gates_lock:
+        if gate is not None and _gates.get(gate.name) is gate:
+            del _gates[gate.name]
+
+
+def get_motion_stats():
+    """
+    Get statistics for every active motion gate.
+
+    Returns:
+        Dictionary of name -> gate statistics
+    """
+    with _gates_lock:
+        gates = list(_gates.values())
+    return {gate.name: gate.stats() for gate in gates}
@@ -15,8 +15,6 @@
 # Acts as the control layer between the API server and AI workers.
 # =============================================================================
 
-import cv2
-import requests
 import time
 import sys
 from pathlib import Path
@@ -28,27 +26,47 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 # Import person detection module
 try:
     from .person_detect import count_people
+    from .motion_gate import create_motion_gate, remove_motion_gate
+    from .detection_rate import create_rate_controller, remove_rate_controller
+    from .roi import RegionOfInterest
 except Exception:
     from backend.person_detect import count_people
+    from backend.motion_gate import create_motion_gate, remove_motion_gate
+    from backend.detection_rate import create_rate_controller, remove_rate_controller
+    from backend.roi import RegionOfInterest
 
 # API endpoint for sending occupancy updates
 API_URL = "http://127.0.0.1:8002/api/occupancy"
 
+# Default detection rate for background RTSP monitoring:
+# twice a second while the room is changing, every 5 seconds once settled
+RTSP_DETECTION_POLICY = {"fast_interval": 0.5, "slow_interval": 5.0}
 
-def run_rtsp_energy_ai(room_id, rtsp_url, stop_event):
+
+def run_rtsp_energy_ai(room_id, rtsp_url, stop_event, backend=None, detection_policy=None,
+                       roi_polygon=None):
     """
     Runs AI detection on an RTSP camera stream.
     
     This function runs in a loop until stop_event is set:
-        1. Captures frames from RTSP stream
-        2. Runs person detection on each frame
-        3. Sends occupancy status to API
+        1. Grabs frames from RTSP stream (without decoding) so the
+           camera buffer never falls behind
+        2. When the adaptive detection rate says a check is due,
+           decodes the frame and runs person detection on the room's
+           ROI if the motion gate sees motion there (or a re-check is due)
+        3. Sends occupancy status to API after each check
     
     Parameters:
         room_id: Name/ID of the room being monitored
         rtsp_url: Full RTSP URL of the camera
         stop_event: Threading Event to signal when to stop
+        backend: Detector backend for this room (None = default)
+        detection_policy: Adaptive detection rate overrides for this room
+        roi_polygon: Room's region of interest (normalized [x, y] points)
     """
+    import cv2
+    import requests
+
     print(f"Connecting to RTSP stream for '{room_id}': {rtsp_url}")
     
     # Open video capture from RTSP URL
@@ -61,11 +79,23 @@ def run_rtsp_energy_ai(room_id, rtsp_url, stop_event):
 
     print(f"Connected to RTSP stream for '{room_id}'.")
     
+    # Skip detection while the scene is static, and check settled
+    # rooms less often
+    name = f"rtsp-ai:{room_id}"
+    motion_gate = create_motion_gate(name)
+    policy = dict(RTSP_DETECTION_POLICY)
+    policy.update(detection_policy or {})
+    detection_rate = create_rate_controller(name, **policy)
+    people_count = 0
+    
+    # Only people inside the room's region of interest count
+    roi = RegionOfInterest.from_config(roi_polygon)
+    
     try:
         # Main detection loop - runs until stop_event is set
         while not stop_event.is_set():
-            # Read a frame from the camera
-            ret, frame = cap.read()
+            # Grab the next frame from the camera (no decoding yet)
+            ret = cap.grab()
             
             # Handle connection loss
             if not ret:
@@ -74,9 +104,23 @@ def run_rtsp_energy_ai(room_id, rtsp_url, stop_event):
                 time.sleep(5)  # Wait before reconnecting
                 cap = cv2.VideoCapture(rtsp_url)
                 continue
+            
+            # Not time to check yet - drop the frame undecoded
+            if not detection_rate.should_check():
+                continue
+            
+            # Decode the grabbed frame
+            ret, frame = cap.retrieve()
+            if not ret or frame is None:
+                continue
 
             # Count people in the frame using YOLO
-            people_count = count_people(frame)
+            # (static scene -> keep the previous count)
+            gate_frame = roi.crop(frame)[0] if roi else frame
+            if motion_gate.should_detect(gate_frame):
+                # Only occupied/empty matters here - use the cheap cascade
+                people_count = count_people(frame, backend=backend, roi=roi, cascade=True)
+                detection_rate.record(people_count)
             
             # Determine if room is occupied (at least 1 person)
             occupied = people_count > 0
@@ -91,12 +135,11 @@ def run_rtsp_energy_ai(room_id, rtsp_url, stop_event):
             except requests.exceptions.RequestException:
                 print(f"Could not reach API for '{room_id}'.")
             
-            # Small delay between frames
-            time.sleep(0.5)
-            
     finally:
         # Clean up when stopping
         print(f"Stopping AI for '{room_id}'")
+        remove_motion_gate(motion_gate)
+        remove_rate_controller(detection_rate)
         cap.release()
 
 
@@ -157,7 +200,14 @@ def start_ai_process(rooms_state, room_id, camera_index=0):
     if rtsp_url:
         # Use RTSP camera detection
         target_func = run_rtsp_energy_ai
-        args = (room_id, rtsp_url, stop_event)
+        args = (
+            room_id,
+            rtsp_url,
+            stop_event,
+            room.get("detector_backend") or None,
+            room.get("detection_policy") or None,
+            room.get("roi_polygon") or None
+        )
     else:
         # Use webcam detection
         target_func = run_webcam_energy_ai
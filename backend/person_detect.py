@@ -5,92 +5,383 @@
 #
 # Key features:
 #   - Lazy loading: Model is loaded only once when first needed
+#   - Shared model: The model comes from the process-wide detector
+#     registry, so every module uses the same copy of the weights
+#   - Inference backends: PyTorch (default), ONNX Runtime, OpenVINO,
+#     or a calibrated INT8 ONNX model (see quantize.py)
 #   - get_model(): Returns the YOLO model (loads if not already loaded)
 #   - count_people(): Detects and counts people in a video frame
+#   - result_boxes(): Converts YOLO results to plain (x1, y1, x2, y2, conf)
+#     tuples that can be cropped, filtered and drawn without ultralytics
+#   - Cascade mode: For "is anyone here?" callers - a cheap low-resolution
+#     pass first, full resolution only when it is empty or borderline
 #
 # The YOLO model is stored at the project root (yolov8n.pt)
 # Class 0 in YOLO is "person" - we only detect this class
+#
+# Backend selection:
+#   Set DETECTOR_BACKEND=onnx (or openvino) to run on a CPU-optimized
+#   runtime. The first time a backend is used, yolov8n.pt is exported
+#   once and the result is cached next to it (yolov8n.onnx or
+#   yolov8n_openvino_model/). Later runs load the cached export.
+#
+#   The "int8" backend cannot be exported automatically - it needs
+#   calibration frames from our own videos. Build it with
+#   `python -m backend.quantize video.mp4 ...` (or the calibrate endpoint).
 # =============================================================================
 
-import numpy as np
-from ultralytics import YOLO
 from pathlib import Path
 import sys
+import threading
+
+from .detector_registry import (
+    MODEL_PATH,
+    DEFAULT_BACKEND,
+    acquire_detector,
+    release_detector,
+    get_registry
+)
+
+# Supported backends: name -> (ultralytics export format, artifact suffix)
+# The artifact suffix is appended to the model stem, e.g. yolov8n.onnx
+# "calibrated" artifacts are built by quantize.py instead of exported
+BACKENDS = {
+    "pytorch": (None, ".pt"),
+    "onnx": ("onnx", ".onnx"),
+    "openvino": ("openvino", "_openvino_model"),
+    "int8": ("calibrated", "_int8.onnx"),
+}
+
+# Input size the exported models are built for
+EXPORT_IMGSZ = 640
+
+# Cascade settings: first pass size, and how far above the confidence
+# threshold a low-resolution detection must be to skip the full pass
+CASCADE_IMGSZ = 320
+CASCADE_MARGIN = 0.2
+
+# Global variable to store the loaded models (one per backend)
+# Empty initially - models are loaded on first use (lazy loading)
+_models = {}
+
+# Only one export may write next to the model at a time
+_export_lock = threading.Lock()
+
+# Cascade counters: frames answered by the cheap pass vs escalated
+_cascade_stats = {"early_exits": 0, "escalations": 0}
+_cascade_lock = threading.Lock()
+
+
+def get_backend(backend=None):
+    """
+    Resolve and validate the inference backend name.
+
+    Parameters:
+        backend: Backend name, or None to use DETECTOR_BACKEND
+                 (environment variable, default "pytorch")
+
+    Returns:
+        Lower-case backend name
+
+    Raises:
+        ValueError: If the backend is not supported
+    """
+    name = (backend or DEFAULT_BACKEND).lower()
+
+    if name not in BACKENDS:
+        supported = ", ".join(BACKENDS)
+        raise ValueError(f"Unknown detector backend '{name}' (supported: {supported})")
+
+    return name
+
+
+def exported_model_path(backend, model_path=MODEL_PATH):
+    """
+    Get the path of the cached export for a backend.
+
+    Parameters:
+        backend: Backend name (see BACKENDS)
+        model_path: Path to the PyTorch .pt model
+
+    Returns:
+        Path to the exported model file or directory
+    """
+    model_path = Path(model_path)
+    _, suffix = BACKENDS[get_backend(backend)]
+
+    if suffix == model_path.suffix:
+        return model_path
 
-# Calculate the path to the YOLO model file
-# BASE_DIR is the project root directory (parent of backend folder)
-BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_PATH = BASE_DIR / "yolov8n.pt"
+    return model_path.with_name(model_path.stem + suffix)
 
-# Global variable to store the loaded model
-# Using None initially - model is loaded on first use (lazy loading)
-_model = None
 
+def export_model(backend, model_path=MODEL_PATH):
+    """
+    Export the PyTorch model to another backend (only once).
+
+    The export is cached next to the .pt file. It is rebuilt only if
+    it is missing or older than the .pt file.
+
+    Parameters:
+        backend: Backend name (see BACKENDS)
+        model_path: Path to the PyTorch .pt model
+
+    Returns:
+        Path to the model to load for this backend
+
+    Raises:
+        FileNotFoundError: If the YOLO model file doesn't exist, or the
+                           INT8 model has not been calibrated yet
+    """
+    backend = get_backend(backend)
+    model_path = Path(model_path)
+    export_format, _ = BACKENDS[backend]
+
+    # PyTorch needs no export
+    if export_format is None:
+        return model_path
+
+    target = exported_model_path(backend, model_path)
+
+    # Calibrated models need our own frames - they are built by quantize.py
+    if export_format == "calibrated":
+        if not target.exists():
+            raise FileNotFoundError(
+                f"{backend} model not built yet at {target} - "
+                f"run: python -m backend.quantize <video files>"
+            )
+        return target
+
+    with _export_lock:
+        # Re-use the cached export if it is up to date
+        if target.exists() and (
+            not model_path.exists()
+            or target.stat().st_mtime >= model_path.stat().st_mtime
+        ):
+            return target
+
+        if not model_path.exists():
+            raise FileNotFoundError(f"YOLO model not found at {model_path}")
+
+        # Import here - exporting is rare and ultralytics is heavy
+        from ultralytics import YOLO
 
-def get_model():
+        print(f"Exporting {model_path.name} to {backend} (one-time)...")
+
+        # dynamic=True keeps the batch dimension free so the
+        # inference scheduler can run several cameras at once
+        exported = YOLO(model_path).export(
+            format=export_format,
+            imgsz=EXPORT_IMGSZ,
+            dynamic=True,
+            verbose=False
+        )
+
+        print(f"✅ Exported {backend} model to {exported}")
+        return Path(exported)
+
+
+def get_model(backend=None):
     """
     Returns the YOLO model, loading it if necessary.
-    
+
     This uses a lazy loading pattern:
         - First call: loads model from disk and caches it
         - Subsequent calls: returns the cached model
-    
+
     This saves memory and startup time when detection isn't needed.
-    
+    The model is acquired from the shared detector registry and held
+    for the lifetime of the process.
+
+    Parameters:
+        backend: Inference backend (default DETECTOR_BACKEND / "pytorch")
+
     Raises:
         FileNotFoundError: If the YOLO model file doesn't exist
+        ValueError: If the backend is not supported
     """
-    global _model
-    
+    backend = get_backend(backend)
+
     # Check if model is already loaded
-    if _model is None:
+    if backend not in _models:
         # Model not loaded yet - need to load it
-        
-        # First check if the model file exists
-        if not MODEL_PATH.exists():
-            raise FileNotFoundError(f"YOLO model not found at {MODEL_PATH}")
-        
-        # Load the YOLO model from file
-        _model = YOLO(MODEL_PATH)
-    
-    return _model
+
+        # Take a reference to the shared model
+        # (raises FileNotFoundError if the model file is missing)
+        _models[backend] = acquire_detector(MODEL_PATH, backend)
+
+    return _models[backend]
 
 
-def count_people(frame, conf=0.4):
+def unload_model(backend=None):
+    """
+    Drop a backend's model so the next use loads it from disk again.
+
+    Used after the model file changes (e.g. the INT8 model is
+    re-calibrated). Rooms already using the old model keep it until
+    they stop.
+
+    Parameters:
+        backend: Inference backend (default DETECTOR_BACKEND / "pytorch")
+    """
+    backend = get_backend(backend)
+
+    release_detector(_models.pop(backend, None))
+    get_registry().unload(MODEL_PATH, backend, force=True)
+
+
+def result_boxes(results):
+    """
+    Convert YOLO results to plain box tuples.
+
+    Parameters:
+        results: YOLO results list (one frame)
+
+    Returns:
+        List of (x1, y1, x2, y2, conf) floats in the detection frame's
+        pixels (empty if nothing detected)
+    """
+    if not results or not results[0] or results[0].boxes is None:
+        return []
+
+    boxes = results[0].boxes
+    return [
+        (x1, y1, x2, y2, conf)
+        for (x1, y1, x2, y2), conf in zip(boxes.xyxy.tolist(), boxes.conf.tolist())
+    ]
+
+
+def _cascade_detect(model, frame, conf, keep=None):
+    """
+    Coarse-to-fine person detection.
+
+    Runs a CASCADE_IMGSZ pass first. If it finds a confident person
+    (conf + CASCADE_MARGIN or more) those boxes are returned straight
+    away - enough to know the room is occupied. Empty or borderline
+    results are re-checked at full resolution, so small or distant
+    people are not missed.
+
+    Parameters:
+        model: YOLO model
+        frame: Frame to run detection on
+        conf: Confidence threshold
+        keep: Function(boxes) -> the boxes that count (e.g. those inside
+              the ROI polygon); only these can end the cascade early
+
+    Returns:
+        List of (x1, y1, x2, y2, conf) boxes in frame pixels
+    """
+    boxes = result_boxes(
+        model(frame, conf=conf, classes=[0], imgsz=CASCADE_IMGSZ, verbose=False)
+    )
+    if keep is not None:
+        boxes = keep(boxes)
+
+    if any(box[4] >= conf + CASCADE_MARGIN for box in boxes):
+        with _cascade_lock:
+            _cascade_stats["early_exits"] += 1
+        return boxes
+
+    with _cascade_lock:
+        _cascade_stats["escalations"] += 1
+    return result_boxes(model(frame, conf=conf, classes=[0], verbose=False))
+
+
+def get_cascade_stats():
+    """
+    Get how often the cascade's low-resolution pass was enough.
+
+    Returns:
+        Dictionary with early_exits, escalations and early_exit_ratio
+    """
+    with _cascade_lock:
+        stats = dict(_cascade_stats)
+
+    total = stats["early_exits"] + stats["escalations"]
+    stats["early_exit_ratio"] = round(stats["early_exits"] / total, 3) if total else 0.0
+    return stats
+
+
+def detect_people(frame, conf=0.4, backend=None, roi=None, cascade=False):
+    """
+    Detects people in a video frame.
+
+    Parameters:
+        frame: numpy array containing the image/video frame
+        conf: Confidence threshold (0.0 to 1.0), default 0.4
+        backend: Inference backend (default DETECTOR_BACKEND / "pytorch")
+        roi: Room's RegionOfInterest (see roi.py) - only people inside
+             it are returned, and only the ROI crop is run through YOLO
+        cascade: Use the coarse-to-fine cascade. Good enough to decide
+                 occupied/empty, but when the cheap pass is confident
+                 distant people may be left out of the boxes.
+
+    Returns:
+        List of (x1, y1, x2, y2, conf) boxes in full-frame pixels
+        (empty if frame is None or no people detected)
+    """
+    # Handle None frame
+    if frame is None:
+        return []
+
+    # Get the YOLO model (loads if not already loaded)
+    model = get_model(backend)
+
+    # The detector sees the ROI bounding-box crop; a person in the crop
+    # but outside the polygon must not end the cascade early
+    keep = None
+    if roi is not None and cascade:
+        offset_x, offset_y = roi.bounding_box(frame.shape)[:2]
+
+        def inside_roi(boxes):
+            return [
+                box for box in boxes
+                if roi.contains((box[0] + box[2]) / 2 + offset_x,
+                                (box[1] + box[3]) / 2 + offset_y, frame.shape)
+            ]
+        keep = inside_roi
+
+    def detect(region):
+        if cascade:
+            return _cascade_detect(model, region, conf, keep)
+
+        # Run detection
+        # - conf: minimum confidence threshold
+        # - classes=[0]: only detect class 0 (person)
+        # - verbose=False: don't print detection details
+        return result_boxes(model(region, conf=conf, classes=[0], verbose=False))
+
+    # Restrict detection to the room's region of interest
+    if roi is not None:
+        from .roi import detect_in_roi
+        return detect_in_roi(frame, roi, detect)
+
+    return detect(frame)
+
+
+def count_people(frame, conf=0.4, backend=None, roi=None, cascade=False):
     """
     Counts the number of people detected in a video frame.
-    
+
     Parameters:
         frame: numpy array containing the image/video frame
         conf: Confidence threshold (0.0 to 1.0), default 0.4
               Only detections above this confidence are counted
-    
+        backend: Inference backend (default DETECTOR_BACKEND / "pytorch")
+        roi: Room's RegionOfInterest (see roi.py) - only people inside
+             it are counted, and only the ROI crop is run through YOLO
+        cascade: Use the coarse-to-fine cascade (occupancy-only callers).
+                 The count is exact when people are hard to see, and a
+                 lower bound when the low-resolution pass was confident.
+
     Returns:
         Integer count of people detected in the frame
         Returns 0 if frame is None or no people detected
-    
+
     How it works:
         1. Gets the YOLO model
-        2. Runs detection on the frame
+        2. Runs detection on the frame (or ROI crop, or cascade)
         3. Filters for class 0 (person) only
         4. Returns the count of detection boxes
     """
-    # Handle None frame
-    if frame is None:
-        return 0
-
-    # Get the YOLO model (loads if not already loaded)
-    model = get_model()
-    
-    # Run detection
-    # - conf: minimum confidence threshold
-    # - classes=[0]: only detect class 0 (person)
-    # - verbose=False: don't print detection details
-    results = model(frame, conf=conf, classes=[0], verbose=False)
-
-    # Count the number of detection boxes
-    if results and results[0]:
-        # Each box represents one detected person
-        return len(results[0].boxes)
-    
-    return 0
+    return len(detect_people(frame, conf, backend, roi, cascade))
@@ -0,0 +1,340 @@
+# =============================================================================
+# INT8 Detector Quantization Module
+# =============================================================================
+# This file builds a cheaper INT8 version of the person detector.
+#
+# Many rooms only need a yes/no "is anyone here?" signal, so they can run a
+# quantized model that is faster on CPU at a small cost in accuracy.
+#
+# Steps:
+#   1. collect_calibration_frames(): Sample frames from our own videos
+#      (e.g. the temp files created by /api/video/upload)
+#   2. build_int8_model(): Static INT8 quantization of the FP32 ONNX export
+#      with ONNX Runtime, calibrated on those frames
+#   3. compare_models(): Report person-count agreement, occupied/empty
+#      agreement and per-frame latency against the FP32 model(s)
+#
+# The result is saved next to the model as yolov8n_int8.onnx and can be
+# selected per room with the "int8" detector backend.
+#
+# Run standalone:
+#   python -m backend.quantize video1.mp4 [video2.mp4 ...]
+# =============================================================================
+
+import json
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+from .detector_registry import MODEL_PATH
+from .person_detect import (
+    EXPORT_IMGSZ,
+    export_model,
+    exported_model_path,
+    get_model,
+    unload_model
+)
+
+# Number of calibration frames used by default
+DEFAULT_CALIBRATION_FRAMES = 200
+
+# Where the comparison report is written (next to the model)
+REPORT_PATH = MODEL_PATH.with_name(MODEL_PATH.stem + "_int8_report.json")
+
+# Node name prefix of the YOLOv8 Detect head. Box decoding in the head
+# loses too much precision in INT8, so it stays in FP32.
+DETECT_HEAD_PREFIX = "/model.22/"
+
+
+def _sample_video_frames(video_path, count):
+    """
+    Read `count` frames spread evenly across a video.
+
+    Parameters:
+        video_path: Path to the video file
+        count: Number of frames to return
+
+    Returns:
+        List of BGR frames (may be shorter if the video is short)
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        print(f"⚠️ Skipping unreadable video: {video_path}")
+        return []
+
+    frames = []
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+        if total <= 0:
+            return frames
+
+        step = max(1, total // max(1, count))
+        for index in range(0, total, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = cap.read()
+            if ret and frame is not None:
+                frames.append(frame)
+            if len(frames) >= count:
+                break
+    finally:
+        cap.release()
+
+    return frames
+
+
+def collect_calibration_frames(video_paths, max_frames=DEFAULT_CALIBRATION_FRAMES):
+    """
+    Collect calibration frames from a set of videos.
+
+    Frames are spread evenly across all videos so every camera view
+    contributes to the calibration.
+
+    Parameters:
+        video_paths: List of video file paths
+        max_frames: Total number of frames to collect
+
+    Returns:
+        List of BGR frames
+    """
+    video_paths = [Path(p) for p in video_paths if Path(p).exists()]
+    if not video_paths:
+        return []
+
+    per_video = max(1, max_frames // len(video_paths))
+
+    frames = []
+    for video_path in video_paths:
+        frames.extend(_sample_video_frames(video_path, per_video))
+
+    return frames[:max_frames]
+
+
+def preprocess_frame(frame, imgsz=EXPORT_IMGSZ):
+    """
+    Convert a BGR frame to the detector's input tensor.
+
+    Matches the ultralytics letterbox preprocessing: resize keeping the
+    aspect ratio, pad with gray (114) to a square, BGR -> RGB, scale to 0-1.
+
+    Parameters:
+        frame: BGR frame (numpy array)
+        imgsz: Square input size of the model
+
+    Returns:
+        float32 array of shape (1, 3, imgsz, imgsz)
+    """
+    import cv2
+
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - new_h) // 2
+    left = (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)
+    tensor = np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+    return tensor[np.newaxis]
+
+
+def build_int8_model(video_paths, max_frames=DEFAULT_CALIBRATION_FRAMES, model_path=MODEL_PATH):
+    """
+    Build the INT8 detector, calibrated on frames from our own videos.
+
+    Parameters:
+        video_paths: Videos to take calibration frames from
+        max_frames: Number of calibration frames
+        model_path: PyTorch .pt model to start from
+
+    Returns:
+        Path to the quantized model (yolov8n_int8.onnx)
+
+    Raises:
+        ValueError: If no calibration frames could be read
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static
+    )
+
+    frames = collect_calibration_frames(video_paths, max_frames)
+    if not frames:
+        raise ValueError("No calibration frames could be read from the given videos")
+
+    print(f"Calibrating INT8 model on {len(frames)} frames from {len(video_paths)} video(s)...")
+
+    # Start from the FP32 ONNX export (built once and cached)
+    fp32_path = export_model("onnx", model_path)
+    int8_path = exported_model_path("int8", model_path)
+
+    fp32_model = onnx.load(str(fp32_path))
+    input_name = fp32_model.graph.input[0].name
+
+    # Keep the Detect head in FP32
+    excluded = [
+        node.name for node in fp32_model.graph.node
+        if node.name.startswith(DETECT_HEAD_PREFIX)
+    ]
+
+    class FrameReader(CalibrationDataReader):
+        """Feeds calibration frames to ONNX Runtime one at a time."""
+
+        def __init__(self):
+            self._frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            if frame is None:
+                return None
+            return {input_name: preprocess_frame(frame)}
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        nodes_to_exclude=excluded
+    )
+
+    # Copy the ultralytics metadata (class names, stride, imgsz)
+    # so the INT8 model loads exactly like the FP32 export
+    int8_model = onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+
+    # Make sure the next use loads the new file, not a stale copy
+    unload_model("int8")
+
+    print(f"✅ INT8 model saved to {int8_path}")
+    return int8_path
+
+
+def compare_models(video_paths, reference_backends=("pytorch", "onnx"),
+                   candidate_backend="int8", max_frames=DEFAULT_CALIBRATION_FRAMES,
+                   conf=0.4):
+    """
+    Compare the INT8 model against FP32 models on our own videos.
+
+    Parameters:
+        video_paths: Videos to take evaluation frames from
+        reference_backends: FP32 backends to compare against
+        candidate_backend: Backend under test (default "int8")
+        max_frames: Number of frames to evaluate
+        conf: Detection confidence threshold
+
+    Returns:
+        Report dictionary with, for each reference backend:
+            - count_agreement: Fraction of frames with identical person counts
+            - occupancy_agreement: Fraction of frames with the same
+              occupied/empty decision
+            - reference_ms / candidate_ms: Mean per-frame latency
+            - speedup: reference_ms / candidate_ms
+    """
+    frames = collect_calibration_frames(video_paths, max_frames)
+    if not frames:
+        raise ValueError("No evaluation frames could be read from the given videos")
+
+    def run(backend):
+        model = get_model(backend)
+
+        # Warm-up so the first-call overhead is not measured
+        model(frames[0], conf=conf, classes=[0], verbose=False)
+
+        counts = []
+        start = time.perf_counter()
+        for frame in frames:
+            results = model(frame, conf=conf, classes=[0], verbose=False)
+            counts.append(len(results[0].boxes) if results and results[0] else 0)
+        elapsed = time.perf_counter() - start
+
+        return counts, elapsed / len(frames) * 1000
+
+    candidate_counts, candidate_ms = run(candidate_backend)
+
+    report = {
+        "candidate": candidate_backend,
+        "frames": len(frames),
+        "videos": [str(p) for p in video_paths],
+        "candidate_ms": round(candidate_ms, 2),
+        "references": {}
+    }
+
+    for backend in reference_backends:
+        counts, reference_ms = run(backend)
+
+        same_count = sum(1 for a, b in zip(counts, candidate_counts) if a == b)
+        same_occupancy = sum(
+            1 for a, b in zip(counts, candidate_counts) if (a > 0) == (b > 0)
+        )
+
+        report["references"][backend] = {
+            "count_agreement": round(same_count / len(frames), 4),
+            "occupancy_agreement": round(same_occupancy / len(frames), 4),
+            "reference_ms": round(reference_ms, 2),
+            "candidate_ms": round(candidate_ms, 2),
+            "speedup": round(reference_ms / candidate_ms, 2) if candidate_ms else 0.0
+        }
+
+    return report
+
+
+def print_report(report):
+    """Print a comparison report as a small table."""
+    print("=" * 60)
+    print(f"INT8 report - {report['frames']} frames")
+    print("=" * 60)
+    print(f"{'Reference':<12}{'Count agr.':>12}{'Occ. agr.':>12}{'FP32 ms':>10}{'INT8 ms':>10}{'Speedup':>10}")
+    for backend, row in report["references"].items():
+        print(
+            f"{backend:<12}"
+            f"{row['count_agreement'] * 100:>11.1f}%"
+            f"{row['occupancy_agreement'] * 100:>11.1f}%"
+            f"{row['reference_ms']:>10.1f}"
+            f"{row['candidate_ms']:>10.1f}"
+            f"{row['speedup']:>9.2f}x"
+        )
+    print("=" * 60)
+
+
+def calibrate_and_report(video_paths, max_frames=DEFAULT_CALIBRATION_FRAMES):
+    """
+    Build the INT8 model and write the comparison report.
+
+    Parameters:
+        video_paths: Videos to calibrate and evaluate on
+        max_frames: Number of frames for calibration and evaluation
+
+    Returns:
+        Report dictionary (also saved to REPORT_PATH)
+    """
+    build_int8_model(video_paths, max_frames)
+
+    report = compare_models(video_paths, max_frames=max_frames)
+    REPORT_PATH.write_text(json.dumps(report, indent=2))
+
+    print_report(report)
+    print(f"Report saved to {REPORT_PATH}")
+    return report
+
+
+# =============================================================================
+# Standalone Mode - Runs when file is executed directly
+# =============================================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m backend.quantize video1.mp4 [video2.mp4 ...]")
+        sys.exit(1)
+
+    calibrate_and_report(sys.argv[1:])
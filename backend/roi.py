@@ -0,0 +1,217 @@
+# =============================================================================
+# Region of Interest (ROI) Module
+# =============================================================================
+# This file limits person detection to the part of a camera view that
+# actually belongs to the room.
+#
+# Many CCTV views include corridors or windows. People walking past should
+# not make the room "occupied", and the detector should not waste time on
+# those pixels.
+#
+# How it works:
+#   1. Each room can store an ROI polygon in its config ("roi_polygon")
+#      as a list of [x, y] points, normalized to 0-1 of the frame size
+#   2. Before inference, the frame is cropped to the polygon's bounding box
+#      (fewer pixels for the model)
+#   3. After inference, boxes are mapped back to full-frame coordinates
+#      and detections whose center is outside the polygon are discarded
+#
+# Boxes are plain (x1, y1, x2, y2, confidence) tuples in full-frame pixels,
+# as returned by person_detect.result_boxes().
+# =============================================================================
+
+
+class RegionOfInterest:
+    """
+    A room's region of interest inside a camera frame.
+
+    Attributes:
+        polygon: List of (x, y) points, normalized to 0-1
+    """
+
+    def __init__(self, polygon):
+        """
+        Initialize the ROI.
+
+        Parameters:
+            polygon: List of [x, y] points (0-1), at least 3
+
+        Raises:
+            ValueError: If the polygon is invalid
+        """
+        points = [(float(x), float(y)) for x, y in polygon]
+
+        if len(points) < 3:
+            raise ValueError("ROI polygon needs at least 3 points")
+
+        if any(not (0.0 <= v <= 1.0) for point in points for v in point):
+            raise ValueError("ROI polygon points must be normalized to 0-1")
+
+        self.polygon = points
+
+        # Pixel polygon cache, per frame size
+        self._shape = None
+        self._pixels = None
+
+    @classmethod
+    def from_config(cls, polygon):
+        """
+        Build an ROI from a room config value.
+
+        Parameters:
+            polygon: Value of the room's "roi_polygon" (may be empty)
+
+        Returns:
+            RegionOfInterest, or None if no ROI is configured
+        """
+        if not polygon:
+            return None
+        return cls(polygon)
+
+    def pixel_polygon(self, frame_shape):
+        """
+        Get the polygon in pixel coordinates for a frame size.
+
+        Parameters:
+            frame_shape: Frame shape (height, width, ...)
+
+        Returns:
+            int32 array of shape (N, 2)
+        """
+        import numpy as np
+
+        h, w = frame_shape[:2]
+        if self._shape != (h, w):
+            self._shape = (h, w)
+            self._pixels = np.array(
+                [(round(x * (w - 1)), round(y * (h - 1))) for x, y in self.polygon],
+                dtype=np.int32
+            )
+        return self._pixels
+
+    def bounding_box(self, frame_shape):
+        """
+        Get the pixel bounding box of the polygon.
+
+        Parameters:
+            frame_shape: Frame shape (height, width, ...)
+
+        Returns:
+            (x1, y1, x2, y2) integer pixel box (x2/y2 exclusive)
+        """
+        h, w = frame_shape[:2]
+        pixels = self.pixel_polygon(frame_shape)
+        x1, y1 = pixels.min(axis=0)
+        x2, y2 = pixels.max(axis=0) + 1
+        return int(max(0, x1)), int(max(0, y1)), int(min(w, x2)), int(min(h, y2))
+
+    def crop(self, frame):
+        """
+        Crop a frame to the ROI bounding box.
+
+        Parameters:
+            frame: Full video frame
+
+        Returns:
+            (cropped frame, (x offset, y offset))
+        """
+        x1, y1, x2, y2 = self.bounding_box(frame.shape)
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def contains(self, x, y, frame_shape):
+        """
+        Check whether a pixel point is inside the polygon.
+
+        Parameters:
+            x, y: Point in full-frame pixels
+            frame_shape: Frame shape (height, width, ...)
+
+        Returns:
+            True if the point is inside (or on the edge of) the polygon
+        """
+        import cv2
+
+        pixels = self.pixel_polygon(frame_shape)
+        return cv2.pointPolygonTest(pixels, (float(x), float(y)), False) >= 0
+
+    def filter_boxes(self, boxes, frame_shape):
+        """
+        Keep only boxes whose center lies inside the polygon.
+
+        Parameters:
+            boxes: List of (x1, y1, x2, y2, conf) in full-frame pixels
+            frame_shape: Frame shape (height, width, ...)
+
+        Returns:
+            Filtered list of boxes
+        """
+        return [
+            box for box in boxes
+            if self.contains((box[0] + box[2]) / 2, (box[1] + box[3]) / 2, frame_shape)
+        ]
+
+    def draw(self, frame, color=(255, 200, 0)):
+        """
+        Draw the ROI outline on a frame.
+
+        Parameters:
+            frame: Frame to draw on (modified in place)
+            color: BGR outline color
+        """
+        import cv2
+
+        cv2.polylines(frame, [self.pixel_polygon(frame.shape)], True, color, 2)
+
+
+def boxes_to_frame(boxes, offset=(0, 0), scale=1.0):
+    """
+    Map boxes from a cropped/resized detection frame back to the full frame.
+
+    Parameters:
+        boxes: List of (x1, y1, x2, y2, conf) in detection-frame pixels
+        offset: (x, y) of the crop inside the full frame
+        scale: Factor the crop was resized by before detection
+
+    Returns:
+        List of (x1, y1, x2, y2, conf) in full-frame pixels
+    """
+    ox, oy = offset
+    return [
+        (x1 / scale + ox, y1 / scale + oy, x2 / scale + ox, y2 / scale + oy, conf)
+        for x1, y1, x2, y2, conf in boxes
+    ]
+
+
+def detect_in_roi(frame, roi, detect, scale=1.0):
+    """
+    Run a detector on the ROI crop of a frame.
+
+    Parameters:
+        frame: Full video frame
+        roi: RegionOfInterest, or None for the whole frame
+        detect: Function(detection_frame) -> list of boxes in
+                detection-frame pixels
+        scale: Resize factor applied to the crop before detection
+               (1.0 = no resize)
+
+    Returns:
+        List of (x1, y1, x2, y2, conf) boxes in full-frame pixels,
+        restricted to the ROI polygon
+    """
+    import cv2
+
+    if roi is not None:
+        region, offset = roi.crop(frame)
+    else:
+        region, offset = frame, (0, 0)
+
+    if scale < 1.0:
+        h, w = region.shape[:2]
+        region = cv2.resize(region, (max(1, int(w * scale)), max(1, int(h * scale))))
+
+    boxes = boxes_to_frame(detect(region), offset, scale)
+
+    if roi is not None:
+        boxes = roi.filter_boxes(boxes, frame.shape)
+
+    return boxes
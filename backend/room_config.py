@@ -13,6 +13,9 @@
 #   - light: Whether lights are on/off
 #   - ac: Whether AC is on/off
 #   - ai_mode: Detection mode (webcam or cctv)
+#   - detector_backend: Inference backend for this room's camera
+#   - detection_policy: Adaptive detection rate overrides for this room
+#   - roi_polygon: Part of the camera view that belongs to the room
 #   - CCTV connection details (IP, username, password, channel)
 #   - process: Thread running AI detection
 #   - stop_event: Event to signal thread termination
@@ -40,6 +43,12 @@ DEFAULT_ROOM_STATE = {
     "cctv_password": "",     # CCTV login password
     "cctv_channel": "0",     # CCTV channel number
     "rtsp_url": "",          # Full RTSP stream URL
+    "detector_backend": "",  # Detector backend ("" = default, "int8" = cheap
+                             # occupied/empty model, see person_detect.BACKENDS)
+    "detection_policy": {},  # Adaptive detection rate overrides, e.g.
+                             # {"slow_interval": 5} (see detection_rate.py)
+    "roi_polygon": [],       # Region of interest as normalized [x, y] points
+                             # ([] = whole frame, see roi.py)
     "process": None,         # Thread running AI detection
     "stop_event": None       # Event to stop the thread
 }
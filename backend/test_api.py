@@ -82,6 +82,58 @@ def main():
                      expected_status=404):
         tests_passed += 1
     
+    # Test 8: Uploaded-video sessions
+    tests_total += 1
+    if test_endpoint("GET", "/api/video/sessions"):
+        tests_passed += 1
+    
+    # Test 9: Oversized resumable upload (should fail with 413 at once)
+    tests_total += 1
+    if test_endpoint("POST", "/api/video/uploads",
+                     data={"filename": "huge.mp4", "size": 1 << 50},
+                     expected_status=413):
+        tests_passed += 1
+    
+    # Test 10: Invalid stream quality (should fail with 400)
+    tests_total += 1
+    if test_endpoint("GET", "/api/stream/Classroom?quality=200", expected_status=400):
+        tests_passed += 1
+    
+    # Test 11: Mosaic of an unknown room (should fail with 404)
+    tests_total += 1
+    if test_endpoint("GET", "/api/stream/mosaic?rooms=InvalidRoom", expected_status=404):
+        tests_passed += 1
+    
+    # Test 12: Mosaic stats
+    tests_total += 1
+    if test_endpoint("GET", "/api/stream/mosaic/stats"):
+        tests_passed += 1
+    
+    # Tests 13-16: A camera that can't be reached (should fail with 502)
+    # leaves a processor that never started - status, policy changes
+    # and disconnect (which stops it) must still work
+    cctv = {
+        "room_id": "Classroom",
+        "cctv_ip": "127.0.0.1",
+        "cctv_username": "test",
+        "cctv_password": "test"
+    }
+    tests_total += 1
+    if test_endpoint("POST", "/api/cctv/connect", cctv, expected_status=502):
+        tests_passed += 1
+    
+    tests_total += 1
+    if test_endpoint("GET", "/api/cctv/status/Classroom"):
+        tests_passed += 1
+    
+    tests_total += 1
+    if test_endpoint("POST", "/api/detection/policy", {"room_id": "Classroom", "slow_interval": 3.0}):
+        tests_passed += 1
+    
+    tests_total += 1
+    if test_endpoint("POST", "/api/cctv/disconnect", {"room_id": "Classroom"}):
+        tests_passed += 1
+    
     print()
     print("=" * 60)
     print(f"Test Results: {tests_passed}/{tests_total} passed")
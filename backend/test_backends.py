@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Detector Backend Parity Test
+Checks that the ONNX / OpenVINO backends give the same person counts
+(and nearly the same boxes) as the PyTorch model.
+Run: .venv/bin/python backend/test_backends.py [onnx] [openvino]
+"""
+
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.person_detect import count_people, get_model, export_model
+
+# Minimum IoU for a box to count as "the same" detection
+MIN_BOX_IOU = 0.9
+
+
+def load_test_images():
+    """Load the sample images shipped with ultralytics (contain people)"""
+    import cv2
+    from ultralytics.utils import ASSETS
+
+    images = []
+    for name in ["bus.jpg", "zidane.jpg"]:
+        image = cv2.imread(str(ASSETS / name))
+        if image is not None:
+            images.append((name, image))
+
+    # Empty frame - every backend must find nobody
+    images.append(("black.png", np.zeros((480, 640, 3), dtype=np.uint8)))
+    return images
+
+
+def box_iou(a, b):
+    """IoU of two [x1, y1, x2, y2] boxes"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def get_boxes(backend, image):
+    """Run a backend on an image and return its sorted person boxes"""
+    results = get_model(backend)(image, conf=0.4, classes=[0], verbose=False)
+    if not results or not results[0]:
+        return []
+    boxes = results[0].boxes.xyxy.cpu().numpy().tolist()
+    return sorted(boxes)
+
+
+def check_backend(backend, images):
+    """Compare one backend against PyTorch, returns True on parity"""
+    print(f"Backend: {backend}")
+
+    try:
+        path = export_model(backend)
+        print(f"   Export: {path}")
+    except Exception as e:
+        print(f"❌ Could not export to {backend}: {e}")
+        return False
+
+    passed = True
+    for name, image in images:
+        expected = count_people(image, backend="pytorch")
+
+        start = time.perf_counter()
+        actual = count_people(image, backend=backend)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if actual != expected:
+            print(f"❌ {name}: pytorch={expected} {backend}={actual}")
+            passed = False
+            continue
+
+        # Every PyTorch box should have a matching backend box
+        reference = get_boxes("pytorch", image)
+        candidate = get_boxes(backend, image)
+        worst_iou = 1.0
+        for box in reference:
+            best = max((box_iou(box, other) for other in candidate), default=0.0)
+            worst_iou = min(worst_iou, best)
+
+        if worst_iou < MIN_BOX_IOU:
+            print(f"❌ {name}: {actual} people but boxes differ (min IoU {worst_iou:.2f})")
+            passed = False
+        else:
+            print(f"✅ {name}: {actual} people, min IoU {worst_iou:.2f}, {elapsed_ms:.1f} ms")
+
+    return passed
+
+
+def main():
+    print("=" * 60)
+    print("Detector Backend Parity Test")
+    print("=" * 60)
+    print()
+
+    backends = sys.argv[1:] or ["onnx"]
+    images = load_test_images()
+
+    results = []
+    for backend in backends:
+        results.append(check_backend(backend, images))
+        print()
+
+    print("=" * 60)
+    if all(results):
+        print("✅ All backends match PyTorch person counts!")
+        print("=" * 60)
+        return 0
+
+    print("❌ Backend parity test failed")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+API Import-Time Budget Test
+Checks that importing the API does not pull in the vision stack
+(cv2, numpy, ultralytics, torch) and stays under a time budget.
+Run: .venv/bin/python backend/test_import_time.py [budget_ms]
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported when a detection path is used
+HEAVY_MODULES = ["cv2", "numpy", "torch", "ultralytics", "onnxruntime", "openvino"]
+
+# Maximum cumulative import time of backend.api (milliseconds)
+DEFAULT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1500"))
+
+
+def measure_import(module="backend.api"):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        (cumulative milliseconds of the module, set of imported top-level modules)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "DETECTOR_WARMUP": "0"}
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    imported = set()
+    cumulative_ms = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue  # header line
+        name = parts[2]
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_ms = int(parts[1]) / 1000
+
+    return cumulative_ms, imported
+
+
+def main():
+    print("=" * 60)
+    print("API Import-Time Budget Test")
+    print("=" * 60)
+    print()
+
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+
+    try:
+        import_ms, imported = measure_import()
+    except Exception as e:
+        print(f"❌ Could not import backend.api: {e}")
+        return 1
+
+    passed = True
+
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        passed = False
+    else:
+        print("✅ No vision modules imported at startup")
+
+    if import_ms is None:
+        print("❌ backend.api not found in -X importtime output")
+        passed = False
+    elif import_ms > budget_ms:
+        print(f"❌ backend.api import took {import_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+        passed = False
+    else:
+        print(f"✅ backend.api import took {import_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+
+    print()
+    print("=" * 60)
+    if passed:
+        print("✅ API import is within budget!")
+        print("=" * 60)
+        return 0
+
+    print("❌ API import-time test failed")
+    print("=" * 60)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
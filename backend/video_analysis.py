@@ -0,0 +1,619 @@
+# =============================================================================
+# Video Analysis Module
+# =============================================================================
+# This file analyzes uploaded video files for room occupancy.
+#
+# For a video it reports:
+#   - How many frames were analyzed and how many were occupied
+#   - The occupancy ratio
+#   - Every occupancy change event, with the light/AC state the energy
+#     logic would switch to
+#
+# Only sampled frames are decoded in full (see frame_sampler.py) - every
+# Nth frame or one frame every N seconds.
+#
+# Analysis is slow (decode + YOLO for every sampled frame), so it runs as
+# a background job (see video_jobs.py). A progress callback lets the job
+# report frames analyzed and an ETA while it runs.
+#
+# Parallel mode (long recordings):
+#   1. The video is split into frame ranges (chunks)
+#   2. Each chunk is analyzed in a separate process that seeks to its
+#      first frame, so all CPU cores decode and detect at once
+#   3. Each chunk returns a small occupancy timeline (its first sample
+#      plus its own changes); the timelines are merged in order and a
+#      change is only kept if it differs from the state at the end of
+#      the previous chunk, so chunk boundaries never create fake events
+#
+# Progressive mode (mode="progressive"):
+#   1. A coarse pass samples one frame every PROGRESSIVE_COARSE_SECONDS
+#      (sequential or parallel, as above)
+#   2. Between two coarse samples whose occupancy differs, a bisection
+#      search (one random-access frame per step) narrows the change down
+#      to the requested stride (frame_skip / sample_seconds)
+#   The events match a dense scan at that stride to within one stride,
+#   while the detector runs on a small fraction of the frames. Changes
+#   that come and go between two coarse samples are not seen.
+#
+# Detections are cached per video content (see analysis_cache.py): the
+# same video with the same settings returns the stored result, other
+# settings only run YOLO on frames that were never analyzed.
+# =============================================================================
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .energy_logic import auto_control
+from .frame_sampler import FrameSampler, sampling_stride
+from .analysis_cache import detector_fingerprint, file_digest, get_analysis_cache
+from .person_detect import detect_people
+
+# How often (in analyzed frames) progress is reported
+PROGRESS_EVERY = 10
+
+# Worker processes for parallel analysis (default: one per CPU core)
+VIDEO_ANALYSIS_PROCESSES = int(os.environ.get("VIDEO_ANALYSIS_PROCESSES", "0")) or os.cpu_count() or 1
+
+# Chunks per worker process (more chunks = finer progress and better
+# load balancing, at the cost of one seek per chunk)
+CHUNKS_PER_PROCESS = 4
+
+# Videos shorter than this (in frames per process) are analyzed in-process
+MIN_FRAMES_PER_PROCESS = 300
+
+# Analysis modes
+ANALYSIS_MODES = ("dense", "progressive")
+
+# Coarse-pass sampling interval of progressive mode (seconds)
+PROGRESSIVE_COARSE_SECONDS = 2.0
+
+# Detection confidence threshold (part of the cache fingerprint)
+ANALYSIS_CONF = 0.4
+
+
+def _summarize_samples(samples, start_frame, progress=None):
+    """
+    Turn a stream of analyzed samples into a chunk result.
+
+    Parameters:
+        samples: Iterable of (frame_index, boxes) in frame order
+        start_frame: First frame of the range
+        progress: Optional function(frames_done) - frames covered so far
+
+    Returns:
+        Dictionary with end_frame (after the last sample),
+        frames_analyzed, occupied_frames and timeline
+    """
+    timeline = []
+    frames_analyzed = 0
+    occupied_frames = 0
+    previous_occupied = None
+    end_index = start_frame
+
+    for frame_index, boxes in samples:
+        people_count = len(boxes)
+        occupied = people_count > 0
+
+        if occupied:
+            occupied_frames += 1
+
+        # Keep the first sample and every change
+        if previous_occupied is None or occupied != previous_occupied:
+            timeline.append((frame_index, occupied, people_count))
+            previous_occupied = occupied
+
+        frames_analyzed += 1
+        end_index = frame_index + 1
+
+        # Report progress
+        if progress and frames_analyzed % PROGRESS_EVERY == 0:
+            progress(end_index - start_frame)
+
+    return {
+        "end_frame": end_index,
+        "frames_analyzed": frames_analyzed,
+        "occupied_frames": occupied_frames,
+        "timeline": timeline
+    }
+
+
+def _analyze_range(video_path, start_frame, end_frame, stride, progress=None, fps=None,
+                   cached=None):
+    """
+    Analyze the frames of one range of a video.
+
+    Only frames whose index is a multiple of stride are analyzed, so
+    chunks sample exactly the same frames as a single sequential pass.
+
+    Parameters:
+        video_path: Path to the video file
+        start_frame: First frame of the range
+        end_frame: Frame after the last one (None = until the end)
+        stride: Analyze every Nth frame of the video
+        progress: Optional function(frames_done) - frames read so far
+        fps: Video frame rate (lets the sampler seek by timestamp)
+        cached: {frame_index: boxes} already known (see analysis_cache.py)
+                - these frames are decoded but not run through YOLO
+
+    Returns:
+        Dictionary with:
+        - start_frame / end_frame: The range actually read
+        - frames_analyzed / occupied_frames: Counters for the range
+        - timeline: [(frame_index, occupied, person_count), ...] with the
+          first analyzed frame and every occupancy change in the range
+        - detections: {frame_index: boxes} of the frames run through YOLO
+        - strategy: How skipped frames were handled ("grab" or "seek")
+
+    Raises:
+        ValueError: If the video can't be read
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError("Could not read uploaded video")
+
+    sampler = FrameSampler(cap, stride, fps)
+    cached = cached or {}
+    detections = {}
+
+    def samples():
+        for frame_index, frame in sampler.frames(start_frame, end_frame):
+            boxes = cached.get(frame_index)
+            if boxes is None:
+                # Run person detection (occupancy only - cheap cascade
+                # first, full resolution only for empty/borderline frames)
+                boxes = detect_people(frame, ANALYSIS_CONF, cascade=True)
+                detections[frame_index] = boxes
+            yield frame_index, boxes
+
+    try:
+        chunk = _summarize_samples(samples(), start_frame, progress)
+    finally:
+        cap.release()
+
+    # A range that ends on skipped frames still covers them
+    if end_frame is not None and chunk["frames_analyzed"]:
+        chunk["end_frame"] = max(chunk["end_frame"], end_frame)
+
+    return {
+        "start_frame": start_frame,
+        **chunk,
+        "detections": detections,
+        "strategy": sampler.strategy
+    }
+
+
+def _init_worker(threads):
+    """Worker process setup - share the CPU cores between processes."""
+    import cv2
+
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def split_ranges(total_frames, chunks, frame_skip=1):
+    """
+    Split a video into contiguous frame ranges.
+
+    Range boundaries are aligned to frame_skip so every range starts on
+    a sampled frame.
+
+    Parameters:
+        total_frames: Number of frames in the video
+        chunks: Number of ranges wanted
+        frame_skip: Sampling stride
+
+    Returns:
+        List of (start_frame, end_frame) tuples covering the video
+    """
+    samples = -(-total_frames // frame_skip)
+    chunks = max(1, min(chunks, samples))
+
+    bounds = [round(samples * i / chunks) * frame_skip for i in range(chunks + 1)]
+    bounds[-1] = total_frames
+
+    return [(bounds[i], bounds[i + 1]) for i in range(chunks) if bounds[i] < bounds[i + 1]]
+
+
+def _analyze_parallel(video_path, total_frames, stride, processes, progress=None, fps=None,
+                      cached=None):
+    """
+    Analyze a video in chunks, one chunk per process at a time.
+
+    Parameters:
+        video_path: Path to the video file
+        total_frames: Number of frames in the video
+        stride: Analyze every Nth frame
+        processes: Number of worker processes
+        progress: Optional function(frames_done, frames_total)
+        fps: Video frame rate (passed to the frame sampler)
+        cached: {frame_index: boxes} already known - each worker only
+                gets the frames of its own range
+
+    Returns:
+        List of chunk results (see _analyze_range), in video order
+    """
+    import multiprocessing
+
+    ranges = split_ranges(total_frames, processes * CHUNKS_PER_PROCESS, stride)
+    cached = cached or {}
+    threads = max(1, (os.cpu_count() or 1) // processes)
+
+    # "spawn" - the API process has threads (streams, scheduler) that
+    # must not be forked
+    context = multiprocessing.get_context("spawn")
+
+    chunks = []
+    frames_done = 0
+
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(threads,)
+    ) as pool:
+        futures = [
+            # The last chunk reads to the real end (frame counts are estimates)
+            pool.submit(
+                _analyze_range,
+                str(video_path),
+                start,
+                end if end < total_frames else None,
+                stride,
+                None,
+                fps,
+                {
+                    index: boxes for index, boxes in cached.items()
+                    if index >= start and (end >= total_frames or index < end)
+                }
+            )
+            for start, end in ranges
+        ]
+
+        for future in as_completed(futures):
+            chunk = future.result()
+            chunks.append(chunk)
+
+            frames_done = min(total_frames, frames_done + chunk["end_frame"] - chunk["start_frame"])
+            if progress:
+                progress(frames_done, total_frames)
+
+    return sorted(chunks, key=lambda chunk: chunk["start_frame"])
+
+
+def stitch_timelines(chunks):
+    """
+    Stitch chunk timelines into one video timeline.
+
+    A chunk's first sample is only kept if it differs from the state at
+    the end of the previous chunk.
+
+    Parameters:
+        chunks: Chunk results in video order
+
+    Returns:
+        [(frame_index, occupied, person_count), ...] - the first sample
+        and every occupancy change
+    """
+    timeline = []
+    previous_occupied = None
+
+    for chunk in chunks:
+        for sample in chunk["timeline"]:
+            if previous_occupied is not None and sample[1] == previous_occupied:
+                continue
+            timeline.append(sample)
+            previous_occupied = sample[1]
+
+    return timeline
+
+
+def merge_timelines(chunks, room_id, fps):
+    """
+    Merge chunk timelines into occupancy change events.
+
+    Parameters:
+        chunks: Chunk results in video order
+        room_id: ID of the room for simulation
+        fps: Video frame rate (for event times)
+
+    Returns:
+        List of event dictionaries
+    """
+    sim_state = {room_id: {"occupied": False, "light": False, "ac": False}}
+    events = []
+
+    for frame_index, occupied, people_count in stitch_timelines(chunks):
+        # Update simulation state and record the change
+        sim_state[room_id]["occupied"] = occupied
+        auto_control(sim_state, room_id)
+        events.append({
+            "frame_index": frame_index,
+            "time_seconds": round(frame_index / fps, 2) if fps else 0.0,
+            "occupied": occupied,
+            "light": sim_state[room_id]["light"],
+            "ac": sim_state[room_id]["ac"],
+            "person_count": people_count
+        })
+
+    return events
+
+
+def _refine_transitions(video_path, timeline, coarse_stride, tolerance, fps=None, known=None):
+    """
+    Locate each occupancy change of a coarse timeline by bisection.
+
+    A change at coarse sample f means the state changed somewhere in
+    (f - coarse_stride, f]. Multiples of `tolerance` in between are
+    probed until the window is one tolerance wide, so a single change
+    lands on the same frame a dense scan at that stride would report.
+
+    Parameters:
+        video_path: Path to the video file
+        timeline: Stitched coarse timeline (see stitch_timelines)
+        coarse_stride: Stride of the coarse pass
+        tolerance: Precision in frames (the dense stride; coarse_stride
+                   must be a multiple of it)
+        fps: Video frame rate (lets the sampler seek by timestamp)
+        known: {frame_index: boxes} already known - probes of these
+               frames need no decode or YOLO
+
+    Returns:
+        (refined timeline, number of frames probed,
+         {frame_index: boxes} of the probes run through YOLO)
+
+    Raises:
+        ValueError: If the video can't be read
+    """
+    import cv2
+
+    known = known or {}
+    detections = {}
+
+    if len(timeline) < 2:
+        return list(timeline), 0, detections
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError("Could not read uploaded video")
+
+    sampler = FrameSampler(cap, 1, fps)
+    refined = [timeline[0]]
+    probes = 0
+
+    try:
+        for frame_index, occupied, people_count in timeline[1:]:
+            # lo has the old state, hi the new one
+            lo = max(refined[-1][0], frame_index - coarse_stride)
+            hi = frame_index
+
+            while hi - lo > tolerance:
+                mid = (lo + hi) // 2 // tolerance * tolerance
+                if mid <= lo:
+                    mid += tolerance
+                boxes = known.get(mid)
+                if boxes is None:
+                    frame = sampler.frame_at(mid)
+                    if frame is None:
+                        break
+                    boxes = detect_people(frame, ANALYSIS_CONF, cascade=True)
+                    detections[mid] = boxes
+                probes += 1
+
+                count = len(boxes)
+                if (count > 0) == occupied:
+                    hi, people_count = mid, count
+                else:
+                    lo = mid
+
+            refined.append((hi, occupied, people_count))
+    finally:
+        cap.release()
+
+    return refined, probes, detections
+
+
+def occupied_frame_count(timeline, total_frames):
+    """
+    Count the video frames inside occupied stretches of a timeline.
+
+    Parameters:
+        timeline: [(frame_index, occupied, person_count), ...]
+        total_frames: Number of frames in the video
+
+    Returns:
+        Number of occupied frames
+    """
+    occupied_frames = 0
+    for i, (frame_index, occupied, _) in enumerate(timeline):
+        if occupied:
+            end = timeline[i + 1][0] if i + 1 < len(timeline) else total_frames
+            occupied_frames += max(0, end - frame_index)
+    return occupied_frames
+
+
+def analyze_video_file(video_path, room_id, frame_skip=5, progress=None, parallel=False,
+                       sample_seconds=None, mode="dense", digest=None):
+    """
+    Analyzes a video file for person detection.
+
+    Parameters:
+        video_path: Path to the video file
+        room_id: ID of the room for simulation
+        frame_skip: Process every Nth frame (default 5)
+        sample_seconds: Process one frame every N seconds instead
+                        (overrides frame_skip)
+        mode: "dense" - analyze every sampled frame, or "progressive" -
+              coarse pass plus bisection of the changes down to the
+              sampling stride
+        progress: Optional function(frames_done, frames_total) called
+                  while the video is analyzed (frames in video frames,
+                  so it reaches frames_total at the end)
+        parallel: Split the video into chunks analyzed by
+                  VIDEO_ANALYSIS_PROCESSES processes (long videos)
+        digest: Content hash of the video, if already known (computed
+                while uploading, see video_ingest.py)
+
+    Returns:
+        Dictionary with analysis results including:
+        - frames_total: Total frames in video
+        - frames_analyzed: Number of frames analyzed
+        - fps: Frames per second
+        - duration_seconds: Video duration
+        - occupied_frames: Frames with people detected
+        - occupancy_ratio: Ratio of occupied frames
+        - events: List of occupancy change events (person_count is
+          a lower bound - detection uses the occupancy cascade)
+        - processes: Number of processes used
+        - sampling: Sampling mode, stride and strategy (see frame_sampler.py)
+        - mode: Analysis mode used
+        - progressive: Coarse stride, transitions and probes (progressive
+          mode only; occupied_frames then counts the video frames between
+          the located changes)
+        - cache: Whether the result came from the cache, and how many
+          frames were reused vs run through YOLO
+
+    Raises:
+        ValueError: If the sampling or mode is invalid or the video
+                    can't be read
+    """
+    import cv2
+
+    # Validate the request before opening the video
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"mode must be one of: {', '.join(ANALYSIS_MODES)}")
+    sampling_stride(30.0, frame_skip, sample_seconds)
+
+    # Read the video properties
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError("Could not read uploaded video")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+    cap.release()
+
+    duration_seconds = total_frames / fps if fps else 0.0
+    stride = sampling_stride(fps, frame_skip, sample_seconds)
+
+    # Progressive mode: the coarse pass samples sparsely, the requested
+    # stride becomes the precision of the located changes (the coarse
+    # stride is a multiple of it, so bisection probes the frames a
+    # dense scan would sample)
+    pass_stride = stride
+    if mode == "progressive":
+        pass_stride = stride * max(1, round(PROGRESSIVE_COARSE_SECONDS * fps / stride))
+
+    # Look the video up in the analysis cache
+    cache = get_analysis_cache()
+    fingerprint = None
+    known = {}
+    results = {}
+    # A frame_skip and a sample_seconds request with the same stride
+    # report their sampling differently, so they are cached apart
+    sampling = f"seconds={sample_seconds:g}" if sample_seconds else "frames"
+    settings = f"{mode}:{stride}:{sampling}"
+    if cache.enabled:
+        digest = digest or file_digest(video_path)
+        fingerprint = detector_fingerprint(ANALYSIS_CONF)
+        entry = cache.load(digest, fingerprint)
+        if entry:
+            known = entry["frames"]
+            results = entry["results"]
+
+    # Same video, same settings - nothing to compute
+    if settings in results:
+        if progress:
+            progress(total_frames, total_frames)
+        return {
+            **results[settings],
+            "room_id": room_id,
+            "cache": {
+                "hit": True,
+                "reused_frames": results[settings]["frames_analyzed"],
+                "detected_frames": 0
+            }
+        }
+
+    # Use as many processes as the video is long enough for
+    processes = 1
+    if parallel and total_frames:
+        processes = max(1, min(VIDEO_ANALYSIS_PROCESSES, total_frames // MIN_FRAMES_PER_PROCESS))
+
+    if processes > 1:
+        chunks = _analyze_parallel(
+            video_path, total_frames, pass_stride, processes, progress, fps, known
+        )
+    else:
+        report = (lambda done: progress(done, total_frames)) if progress else None
+        chunks = [_analyze_range(video_path, 0, None, pass_stride, report, fps, known)]
+
+    detections = {}
+    for chunk in chunks:
+        detections.update(chunk["detections"])
+
+    video_frames = total_frames or chunks[-1]["end_frame"]
+    frames_analyzed = sum(chunk["frames_analyzed"] for chunk in chunks)
+    occupied_frames = sum(chunk["occupied_frames"] for chunk in chunks)
+
+    # Calculate occupancy ratio
+    occupancy_ratio = (occupied_frames / frames_analyzed) if frames_analyzed else 0.0
+
+    progressive = None
+    if mode == "progressive":
+        timeline, probes, probed = _refine_transitions(
+            video_path, stitch_timelines(chunks), pass_stride, stride, fps,
+            {**known, **detections}
+        )
+        chunks = [{"timeline": timeline}]
+        frames_analyzed += probes
+        detections.update(probed)
+
+        # Occupancy from the located changes instead of the coarse samples
+        occupied_frames = occupied_frame_count(timeline, video_frames)
+        occupancy_ratio = (occupied_frames / video_frames) if video_frames else 0.0
+
+        progressive = {
+            "coarse_stride_frames": pass_stride,
+            "tolerance_frames": stride,
+            "transitions": max(0, len(timeline) - 1),
+            "probes": probes
+        }
+
+    if progress:
+        progress(video_frames, video_frames)
+
+    result = {
+        "room_id": room_id,
+        "frames_total": total_frames,
+        "frames_analyzed": frames_analyzed,
+        "fps": round(float(fps), 2),
+        "duration_seconds": round(duration_seconds, 2),
+        "occupied_frames": occupied_frames,
+        "occupancy_ratio": round(occupancy_ratio, 3),
+        "events": merge_timelines(chunks, room_id, fps),
+        "processes": processes,
+        "sampling": FrameSampler(None, pass_stride, fps).describe(
+            sample_seconds if pass_stride == stride else None
+        ),
+        "mode": mode,
+        "progressive": progressive
+    }
+
+    # Keep the new detections and the result for the next upload
+    if cache.enabled:
+        results[settings] = result
+        cache.store(digest, fingerprint, {**known, **detections}, results)
+
+    return {
+        **result,
+        "cache": {
+            "hit": False,
+            "reused_frames": frames_analyzed - len(detections),
+            "detected_frames": len(detections)
+        }
+    }
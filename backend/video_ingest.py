@@ -0,0 +1,379 @@
+# =============================================================================
+# Video Ingest Module
+# =============================================================================
+# This file writes uploaded videos straight to their final temp file as
+# the request body arrives, instead of letting the multipart parser spool
+# the whole file first and copying it again afterwards.
+#
+# How it works:
+#   - An IngestUpload owns one temp file. Every chunk is appended to it
+#     and fed to a running SHA-256, so the content hash (the analysis
+#     cache key, see analysis_cache.py) is known the moment the last
+#     byte lands - the video is never read back to hash it
+#   - Uploads larger than VIDEO_UPLOAD_MAX_MB (or the session disk quota
+#     VIDEO_SESSION_MAX_MB, if smaller - a bigger video could never be
+#     kept) are refused as soon as the declared size (or the bytes
+#     received) go past the limit
+#   - Resumable uploads: the client creates an upload, then sends the
+#     file in chunks, each tagged with its offset. If a chunk is cut off,
+#     the bytes that did arrive are kept; the client asks for the current
+#     offset and resends from there. Uploads idle for VIDEO_UPLOAD_TTL
+#     are deleted.
+#
+# Memory use is one chunk buffer per upload, whatever the file size.
+# =============================================================================
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from .video_sessions import VIDEO_SESSION_MAX_MB
+
+# Upload limits (overridable through environment variables). An upload
+# must also fit in the session disk quota, so the smaller limit applies.
+VIDEO_UPLOAD_MAX_MB = min(
+    float(os.environ.get("VIDEO_UPLOAD_MAX_MB", "2048")), VIDEO_SESSION_MAX_MB
+)
+VIDEO_UPLOAD_TTL = float(os.environ.get("VIDEO_UPLOAD_TTL", "3600"))
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload goes past the size limit."""
+
+
+class UploadOffsetError(ValueError):
+    """
+    Raised when a chunk does not start where the upload stopped.
+
+    Attributes:
+        offset: Bytes received so far (where the next chunk must start)
+    """
+
+    def __init__(self, offset):
+        super().__init__(f"Upload is at byte {offset}, resend from there")
+        self.offset = offset
+
+
+class IngestUpload:
+    """
+    One upload being written to disk.
+
+    Attributes:
+        upload_id: Unique upload identifier
+        filename: Original file name
+        path: Path to the temp file being written
+        size: Declared total size in bytes (None if unknown)
+        received: Bytes written so far
+        max_bytes: Size limit
+        status: "receiving", "complete" or "aborted"
+    """
+
+    def __init__(self, filename="upload", size=None, max_bytes=None):
+        """
+        Create the temp file for an upload.
+
+        Parameters:
+            filename: Original file name (its extension is kept)
+            size: Declared total size in bytes, if known
+            max_bytes: Size limit (default VIDEO_UPLOAD_MAX_MB)
+
+        Raises:
+            UploadTooLargeError: If the declared size is over the limit
+        """
+        self.max_bytes = int(VIDEO_UPLOAD_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        if size is not None and size > self.max_bytes:
+            raise UploadTooLargeError(self._too_large())
+
+        self.upload_id = str(uuid.uuid4())
+        self.filename = filename or "upload"
+        self.size = size
+        self.received = 0
+        self.status = "receiving"
+        self.last_access = time.time()
+
+        suffix = Path(self.filename).suffix or ".mp4"
+        tmp_file = NamedTemporaryFile(delete=False, suffix=suffix)
+        self.path = tmp_file.name
+        self._file = tmp_file
+
+        self._hash = hashlib.sha256()
+
+        # Set while a request is sending a chunk (one at a time)
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def _too_large(self):
+        return f"Video is larger than the upload limit ({self.max_bytes // (1024 * 1024)} MB)"
+
+    def begin(self, offset=None, length=0):
+        """
+        Claim the upload for one request, before receiving its chunk.
+
+        Parameters:
+            offset: Where the chunk starts (None = wherever the upload is)
+            length: Chunk size, if known (e.g. from Content-Length)
+
+        Raises:
+            UploadOffsetError: If offset is not the bytes received so far
+            UploadTooLargeError: If the chunk would go past the limit
+            ValueError: If another request is sending a chunk
+        """
+        with self._lock:
+            if self._busy:
+                raise ValueError("Another chunk of this upload is being received")
+            if offset is not None and offset != self.received:
+                raise UploadOffsetError(self.received)
+            if self.received + length > self.max_bytes:
+                raise UploadTooLargeError(self._too_large())
+            self._busy = True
+            self.last_access = time.time()
+
+    def end(self):
+        """Release the upload after a request (whether or not it completed)."""
+        with self._lock:
+            self._busy = False
+            self.last_access = time.time()
+
+    def write(self, chunk):
+        """
+        Append a chunk to the file and the hash (blocking - run in a
+        worker thread).
+
+        Raises:
+            UploadTooLargeError: If the upload goes past the limit
+            ValueError: If the upload is no longer receiving
+        """
+        with self._lock:
+            if self.status != "receiving":
+                raise ValueError(f"Upload is {self.status}")
+            if self.received + len(chunk) > self.max_bytes:
+                raise UploadTooLargeError(self._too_large())
+            if self.size is not None and self.received + len(chunk) > self.size:
+                raise UploadTooLargeError(f"Upload is larger than its declared size ({self.size} bytes)")
+            self._file.write(chunk)
+            self._hash.update(chunk)
+            self.received += len(chunk)
+            self.last_access = time.time()
+
+    def finish(self):
+        """
+        Close the file once every byte has arrived.
+
+        Returns:
+            (path, digest) - the video file and its hex SHA-256
+
+        Raises:
+            ValueError: If a chunk is still arriving, or fewer bytes than
+                        declared were received
+        """
+        with self._lock:
+            if self._busy:
+                raise ValueError("A chunk of this upload is still being received")
+            if self.size is not None and self.received != self.size:
+                raise ValueError(f"Upload is incomplete ({self.received} of {self.size} bytes)")
+            self._file.close()
+            self.status = "complete"
+            return self.path, self._hash.hexdigest()
+
+    def abort(self):
+        """Close and delete the temp file."""
+        with self._lock:
+            self.status = "aborted"
+            self._file.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def expired(self, ttl, now=None):
+        now = time.time() if now is None else now
+        return not self._busy and now - self.last_access > ttl
+
+    def to_dict(self):
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "status": self.status,
+            "offset": self.received,
+            "size": self.size,
+            "max_bytes": self.max_bytes
+        }
+
+
+class UploadManager:
+    """
+    Registry of resumable uploads still receiving chunks.
+
+    Attributes:
+        ttl: Idle seconds before an unfinished upload is deleted
+        max_bytes: Size limit of one upload
+    """
+
+    def __init__(self, ttl=VIDEO_UPLOAD_TTL, max_mb=VIDEO_UPLOAD_MAX_MB):
+        """
+        Initialize the upload manager.
+
+        Parameters:
+            ttl: Idle TTL in seconds (default VIDEO_UPLOAD_TTL)
+            max_mb: Size limit in megabytes (default VIDEO_UPLOAD_MAX_MB)
+        """
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        # Unfinished uploads by ID
+        self._uploads = {}
+
+        self._lock = threading.Lock()
+
+    def create(self, filename="upload", size=None):
+        """
+        Start a resumable upload.
+
+        Parameters:
+            filename: Original file name
+            size: Declared total size in bytes, if known
+
+        Returns:
+            IngestUpload instance
+
+        Raises:
+            UploadTooLargeError: If the declared size is over the limit
+        """
+        self.reap()
+        upload = IngestUpload(filename, size, self.max_bytes)
+        with self._lock:
+            self._uploads[upload.upload_id] = upload
+        return upload
+
+    def get(self, upload_id):
+        """
+        Get an unfinished upload.
+
+        Returns:
+            IngestUpload instance, or None if unknown or expired
+        """
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is None or not upload.expired(self.ttl):
+                return upload
+            del self._uploads[upload_id]
+
+        upload.abort()
+        return None
+
+    def finish(self, upload_id):
+        """
+        Complete an upload and hand its file over to the caller.
+
+        Returns:
+            (path, digest), or None if the upload is unknown
+
+        Raises:
+            ValueError: If fewer bytes than declared were received
+        """
+        upload = self.get(upload_id)
+        if upload is None:
+            return None
+
+        result = upload.finish()
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+        return result
+
+    def abort(self, upload_id):
+        """
+        Cancel an upload and delete its file.
+
+        Returns:
+            True if the upload existed
+        """
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            return False
+        upload.abort()
+        return True
+
+    def reap(self, now=None):
+        """
+        Delete uploads idle for longer than the TTL.
+
+        Returns:
+            Number of uploads deleted
+        """
+        with self._lock:
+            expired = [u for u in self._uploads.values() if u.expired(self.ttl, now)]
+            for upload in expired:
+                del self._uploads[upload.upload_id]
+
+        for upload in expired:
+            upload.abort()
+
+        return len(expired)
+
+    def shutdown(self):
+        """Delete every unfinished upload."""
+        with self._lock:
+            uploads = list(self._uploads.values())
+            self._uploads.clear()
+        for upload in uploads:
+            upload.abort()
+
+    def stats(self):
+        """
+        Get unfinished uploads.
+
+        Returns:
+            Dictionary with the limits and each upload's progress
+        """
+        with self._lock:
+            uploads = [upload.to_dict() for upload in self._uploads.values()]
+        return {
+            "uploads": len(uploads),
+            "bytes": sum(upload["offset"] for upload in uploads),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "active": uploads
+        }
+
+
+# =============================================================================
+# Global Upload Manager
+# =============================================================================
+# One manager for the whole API process, created on first use.
+# =============================================================================
+
+# The shared upload manager (None until first use)
+_upload_manager = None
+
+# Lock for creating/replacing the upload manager
+_upload_manager_lock = threading.Lock()
+
+
+def get_upload_manager():
+    """
+    Get the process-wide upload manager, creating it on first use.
+
+    Returns:
+        UploadManager instance
+    """
+    global _upload_manager
+
+    with _upload_manager_lock:
+        if _upload_manager is None:
+            _upload_manager = UploadManager()
+        return _upload_manager
+
+
+def shutdown_upload_manager():
+    """Delete every unfinished upload (called when the API stops)."""
+    global _upload_manager
+
+    with _upload_manager_lock:
+        if _upload_manager is not None:
+            _upload_manager.shutdown()
+            _upload_manager = None
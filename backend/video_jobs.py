@@ -0,0 +1,298 @@
+# =============================================================================
+# Background Job Module
+# =============================================================================
+# This file runs slow work (uploaded-video analysis) off the API's event
+# loop, on a small bounded pool of worker threads.
+#
+# How it works:
+#   1. submit() registers a job and queues it on the pool, returning the
+#      job at once (status "queued")
+#   2. A worker runs it ("running"); the job reports progress through a
+#      callback, from which an ETA is estimated
+#   3. The result (or error) is kept on the job ("done" / "failed") so the
+#      client can fetch it with GET /api/video/jobs/{job_id}
+#
+# Limits (overridable through environment variables):
+#   - VIDEO_JOB_WORKERS: Jobs running at the same time (default 1 - each
+#     job already keeps the detector busy)
+#   - VIDEO_JOB_QUEUE: Jobs waiting for a worker (default 4). When the
+#     queue is full submit() raises JobQueueFullError.
+# =============================================================================
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Default limits
+VIDEO_JOB_WORKERS = int(os.environ.get("VIDEO_JOB_WORKERS", "1"))
+VIDEO_JOB_QUEUE = int(os.environ.get("VIDEO_JOB_QUEUE", "4"))
+
+# Finished jobs kept for clients to collect results
+JOB_HISTORY = 100
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when every worker is busy and the queue is full."""
+
+
+class Job:
+    """
+    One background job and its progress.
+
+    Attributes:
+        job_id: Unique job identifier
+        status: "queued", "running", "done" or "failed"
+        metadata: Extra fields reported with the job (e.g. session_id)
+        result: Return value of the job function (when done)
+        error: Error message (when failed)
+    """
+
+    def __init__(self, metadata=None):
+        self.job_id = str(uuid.uuid4())
+        self.status = "queued"
+        self.metadata = dict(metadata or {})
+        self.result = None
+        self.error = None
+
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        # Progress in job units (e.g. video frames)
+        self.done = 0
+        self.total = 0
+
+        self._lock = threading.Lock()
+
+    def report(self, done, total):
+        """
+        Progress callback passed to the job function.
+
+        Parameters:
+            done: Units finished so far
+            total: Total units (0 if unknown)
+        """
+        with self._lock:
+            self.done = done
+            self.total = total
+
+    def eta_seconds(self, now=None):
+        """
+        Estimate the remaining run time from the progress so far.
+
+        Returns:
+            Seconds, or None if not running or no progress yet
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.status != "running" or not self.total or not self.done:
+                return None
+            elapsed = now - self.started_at
+            fraction = min(1.0, self.done / self.total)
+            return round(elapsed / fraction * (1.0 - fraction), 1)
+
+    def to_dict(self):
+        """
+        Get the job state for the API.
+
+        Returns:
+            Dictionary with status, progress, ETA, result and error
+        """
+        eta = self.eta_seconds()
+        with self._lock:
+            fraction = min(1.0, self.done / self.total) if self.total else 0.0
+            if self.status == "done":
+                fraction = 1.0
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                **self.metadata,
+                "progress": {
+                    "done": self.done,
+                    "total": self.total,
+                    "fraction": round(fraction, 3)
+                },
+                "eta_seconds": eta,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "result": self.result,
+                "error": self.error
+            }
+
+
+class JobManager:
+    """
+    Bounded pool of workers for background jobs.
+
+    Attributes:
+        max_workers: Jobs running at the same time
+        max_queue: Jobs allowed to wait for a worker
+    """
+
+    def __init__(self, max_workers=VIDEO_JOB_WORKERS, max_queue=VIDEO_JOB_QUEUE):
+        """
+        Initialize the job manager.
+
+        Parameters:
+            max_workers: Concurrent jobs (default VIDEO_JOB_WORKERS)
+            max_queue: Waiting jobs (default VIDEO_JOB_QUEUE)
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="video-job"
+        )
+
+        # Jobs by ID, oldest first
+        self._jobs = OrderedDict()
+
+        # Number of queued + running jobs
+        self._active = 0
+
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, metadata=None, **kwargs):
+        """
+        Queue a job.
+
+        The job function is called as func(*args, progress=job.report,
+        **kwargs).
+
+        Parameters:
+            func: Function to run
+            *args, **kwargs: Arguments for func
+            metadata: Extra fields reported with the job
+
+        Returns:
+            Job instance (status "queued")
+
+        Raises:
+            JobQueueFullError: If all workers are busy and the queue is full
+        """
+        job = Job(metadata)
+
+        with self._lock:
+            if self._active >= self.max_workers + self.max_queue:
+                raise JobQueueFullError(
+                    f"Too many jobs ({self._active} queued or running), try again later"
+                )
+            self._active += 1
+            self._jobs[job.job_id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        """Worker body - runs one job and stores its outcome."""
+        with job._lock:
+            job.status = "running"
+            job.started_at = time.time()
+
+        try:
+            result = func(*args, progress=job.report, **kwargs)
+            with job._lock:
+                job.result = result
+                job.status = "done"
+        except Exception as e:
+            print(f"❌ Job {job.job_id} failed: {e}")
+            with job._lock:
+                job.error = str(e)
+                job.status = "failed"
+        finally:
+            with job._lock:
+                job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond JOB_HISTORY (lock held)."""
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in ("done", "failed")
+        ]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        Get a job by ID.
+
+        Returns:
+            Job instance, or None if unknown (or pruned)
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """
+        Get all known jobs, oldest first.
+
+        Returns:
+            List of Job instances
+        """
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stats(self):
+        """
+        Get pool usage.
+
+        Returns:
+            Dictionary with limits and number of queued/running jobs
+        """
+        jobs = self.jobs()
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": sum(1 for job in jobs if job.status == "queued"),
+            "running": sum(1 for job in jobs if job.status == "running")
+        }
+
+    def shutdown(self):
+        """Stop accepting jobs and drop the queued ones."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# =============================================================================
+# Global Job Manager
+# =============================================================================
+# One pool for the whole API process, created on first use.
+# =============================================================================
+
+# The shared job manager (None until first use)
+_job_manager = None
+
+# Lock for creating/replacing the job manager
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Get the process-wide job manager, creating it on first use.
+
+    Returns:
+        JobManager instance
+    """
+    global _job_manager
+
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
+
+
+def shutdown_job_manager():
+    """Shut down the job manager (called when the API stops)."""
+    global _job_manager
+
+    with _job_manager_lock:
+        if _job_manager is not None:
+            _job_manager.shutdown()
+            _job_manager = None
@@ -0,0 +1,309 @@
+# =============================================================================
+# Video Proxy Module
+# =============================================================================
+# This file pre-renders an uploaded video as an annotated, downscaled
+# MJPEG "proxy", so viewers of /api/video/stream/{session_id} are served
+# bytes instead of each one decoding, drawing and encoding the original.
+#
+# How it works:
+#   1. An upload with proxy=true registers a pending proxy. Once the
+#      upload's analysis job has finished (so its detections are in the
+#      replay store, see video_replay.py), the proxy is rendered on a
+#      bounded pool of VIDEO_PROXY_WORKERS threads: the video is read
+#      once, each frame downscaled to VIDEO_PROXY_MAX_WIDTH, annotated
+#      and JPEG-encoded at VIDEO_PROXY_JPEG_QUALITY
+#   2. Each frame is appended to a segment file already framed as a
+#      multipart chunk; an in-memory index keeps the offset and person
+#      count of every frame
+#   3. When rendering is done the segment file is memory-mapped. Serving
+#      a frame is a slice of the mapping, so N viewers cost about as much
+#      as one (the OS page cache holds the file once)
+#
+# Until the proxy is ready, the stream falls back to live rendering.
+# =============================================================================
+
+import mmap
+import os
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+
+from .person_detect import detect_people
+from .video_replay import annotate_frame, get_replay
+
+# Proxy size and quality (overridable through environment variables)
+VIDEO_PROXY_MAX_WIDTH = int(os.environ.get("VIDEO_PROXY_MAX_WIDTH", "640"))
+VIDEO_PROXY_JPEG_QUALITY = int(os.environ.get("VIDEO_PROXY_JPEG_QUALITY", "70"))
+
+# Proxies rendered at the same time (the rest wait their turn)
+VIDEO_PROXY_WORKERS = int(os.environ.get("VIDEO_PROXY_WORKERS", "1"))
+
+# Multipart header written before every JPEG in the segment file
+FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+class VideoProxy:
+    """
+    Pre-rendered MJPEG frames of one uploaded video.
+
+    Attributes:
+        video_path: Path to the original upload
+        path: Path to the segment file
+        status: "pending", "rendering", "ready", "failed" or "closed"
+        fps: Frame rate of the original video
+    """
+
+    def __init__(self, video_path, max_width=VIDEO_PROXY_MAX_WIDTH,
+                 quality=VIDEO_PROXY_JPEG_QUALITY):
+        """
+        Initialize the proxy (nothing is rendered yet).
+
+        Parameters:
+            video_path: Path to the original upload
+            max_width: Proxy frame width limit (default VIDEO_PROXY_MAX_WIDTH)
+            quality: JPEG quality 1-100 (default VIDEO_PROXY_JPEG_QUALITY)
+        """
+        self.video_path = str(video_path)
+        self.max_width = max_width
+        self.quality = quality
+
+        with NamedTemporaryFile(delete=False, suffix=".mjpg") as segment:
+            self.path = segment.name
+
+        self.status = "pending"
+        self.error = None
+        self.fps = None
+
+        # Frame i is bytes _offsets[i]:_offsets[i + 1] of the segment file
+        self._offsets = array("Q", [0])
+        self._person_counts = array("H")
+
+        self._file = None
+        self._mmap = None
+
+        # Guards status changes against close() from the session cleanup
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    @property
+    def frame_count(self):
+        return len(self._person_counts)
+
+    def render(self):
+        """
+        Render the proxy (blocking - run in a background thread).
+
+        Raises:
+            ValueError: If the video can't be read
+        """
+        import cv2
+
+        with self._lock:
+            if self.status != "pending":
+                return
+            self.status = "rendering"
+
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            self._fail("Could not read uploaded video")
+            raise ValueError(self.error)
+
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+
+        replay = get_replay(self.video_path)
+        replay.seed_from_analysis()
+        held = None
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        frame_index = 0
+
+        try:
+            with open(self.path, "wb") as segment:
+                while self.status == "rendering":
+                    ret, frame = cap.read()
+                    if not ret or frame is None:
+                        break
+
+                    boxes, held = replay.boxes_for(frame_index, frame, detect_people, held)
+
+                    # Downscale, then draw (boxes are in original pixels)
+                    height, width = frame.shape[:2]
+                    scale = min(1.0, self.max_width / width)
+                    if scale < 1.0:
+                        frame = cv2.resize(
+                            frame, (int(width * scale), int(height * scale)),
+                            interpolation=cv2.INTER_AREA
+                        )
+                    annotate_frame(frame, boxes, len(boxes) > 0, scale)
+
+                    ok, jpeg = cv2.imencode(".jpg", frame, encode_params)
+                    if ok:
+                        chunk = FRAME_HEADER + jpeg.tobytes() + b'\r\n'
+                        segment.write(chunk)
+                        self._offsets.append(self._offsets[-1] + len(chunk))
+                        self._person_counts.append(min(len(boxes), 0xFFFF))
+
+                    frame_index += 1
+        except Exception as e:
+            self._fail(str(e))
+            raise
+        finally:
+            cap.release()
+
+        if not self.frame_count:
+            self._fail("Video has no frames")
+            return
+
+        with self._lock:
+            # Session cleaned up while rendering
+            if self.status == "closed":
+                return
+
+            # Serve from a read-only mapping of the finished file
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.status = "ready"
+
+    def _fail(self, error):
+        """Mark the render as failed (unless the proxy was closed)."""
+        with self._lock:
+            if self.status != "closed":
+                self.status = "failed"
+                self.error = error
+
+    def frame(self, index):
+        """
+        Get a frame as a ready-to-send multipart chunk.
+
+        Raises:
+            ValueError: If the proxy was closed meanwhile
+        """
+        return self._mmap[self._offsets[index]:self._offsets[index + 1]]
+
+    def person_count(self, index):
+        """Get the number of people shown in a frame."""
+        return self._person_counts[index]
+
+    def stats(self):
+        """
+        Get the proxy state.
+
+        Returns:
+            Dictionary with status, frames, size on disk and settings
+        """
+        return {
+            "status": self.status,
+            "frames": self.frame_count,
+            "bytes": self._offsets[-1],
+            "fps": self.fps,
+            "max_width": self.max_width,
+            "quality": self.quality,
+            "error": self.error
+        }
+
+    def close(self):
+        """Unmap and delete the segment file."""
+        with self._lock:
+            self.status = "closed"
+            if self._mmap is not None:
+                self._mmap.close()
+                self._file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+# =============================================================================
+# Global Proxy Registry
+# =============================================================================
+# One proxy per upload session, rendered once on the bounded render pool.
+# =============================================================================
+
+# Proxies by session ID
+_proxies = {}
+
+# Lock for the registry
+_proxies_lock = threading.Lock()
+
+# Render pool (created on first render)
+_render_pool = None
+
+
+def create_proxy(session_id, video_path):
+    """
+    Register a pending proxy for an uploaded video (not rendered yet).
+
+    Parameters:
+        session_id: Upload session ID
+        video_path: Path to the uploaded video
+
+    Returns:
+        VideoProxy instance (status "pending" until start_proxy_render)
+    """
+    proxy = VideoProxy(video_path)
+    with _proxies_lock:
+        _proxies[session_id] = proxy
+    return proxy
+
+
+def start_proxy_render(session_id, on_done=None):
+    """
+    Queue the render of a session's pending proxy on the render pool.
+
+    Call it once the upload's analysis has finished, so the render
+    reuses the stored detections.
+
+    Parameters:
+        session_id: Upload session ID
+        on_done: function() called when the render ends, however it ends
+                 (also called right away if there is nothing to render)
+    """
+    global _render_pool
+
+    proxy = get_proxy(session_id)
+    if proxy is None:
+        if on_done:
+            on_done()
+        return
+
+    def run():
+        try:
+            proxy.render()
+            if proxy.ready:
+                print(f"✅ Video proxy ready for {session_id}: {proxy.frame_count} frames")
+        except Exception as e:
+            print(f"❌ Video proxy failed for {session_id}: {e}")
+        finally:
+            if on_done:
+                on_done()
+
+    with _proxies_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(
+                max_workers=max(1, VIDEO_PROXY_WORKERS), thread_name_prefix="video-proxy"
+            )
+        _render_pool.submit(run)
+
+
+def get_proxy(session_id):
+    """
+    Get the proxy of a session.
+
+    Returns:
+        VideoProxy instance, or None if no proxy was requested
+    """
+    with _proxies_lock:
+        return _proxies.get(session_id)
+
+
+def drop_proxy(session_id):
+    """Close a session's proxy and delete its segment file."""
+    with _proxies_lock:
+        proxy = _proxies.pop(session_id, None)
+    if proxy is not None:
+        proxy.close()
+
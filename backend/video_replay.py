@@ -0,0 +1,253 @@
+# =============================================================================
+# Video Replay Module
+# =============================================================================
+# This file keeps the detections of an uploaded video by frame index, so
+# the looping MJPEG stream of /api/video/stream/{session_id} only runs
+# YOLO the first time it plays a frame.
+#
+# How it works:
+#   - Each uploaded video has one ReplayDetections store, shared by all
+#     viewers of that session
+#   - The store is seeded from the upload analysis (see analysis_cache.py)
+#     as soon as the analysis has been cached - only with the frames the
+#     analysis found empty. The analysis uses the occupancy cascade,
+#     whose boxes are a lower bound when its low-resolution pass was
+#     confident, but whose empty results were always confirmed at full
+#     resolution. Frames with people are detected once by the stream at
+#     full resolution, so boxes and person counts don't depend on
+#     whether the analysis finished first.
+#   - A frame with no stored boxes reuses the last known boxes if they
+#     are at most REPLAY_HOLD_FRAMES frames older; otherwise the stream
+#     runs detection once and stores the result
+#   - From the second loop on, every frame is answered from the store:
+#     the stream only decodes, draws and encodes
+#
+# annotate_frame() draws the boxes and status overlay, for the live
+# stream and the pre-rendered proxy (see video_proxy.py) alike.
+# =============================================================================
+
+import threading
+
+from .analysis_cache import detector_fingerprint, file_digest, get_analysis_cache
+from .video_analysis import ANALYSIS_CONF
+
+# Frames a detection may be reused for before the stream detects again
+# (the upload analysis default samples every 5th frame)
+REPLAY_HOLD_FRAMES = 5
+
+
+def _compact_boxes(boxes):
+    """Store boxes as integer pixels plus a 2-decimal confidence."""
+    return tuple(
+        (int(x1), int(y1), int(x2), int(y2), round(float(conf), 2))
+        for x1, y1, x2, y2, conf in boxes
+    )
+
+
+class ReplayDetections:
+    """
+    Per-frame boxes of one uploaded video.
+
+    Attributes:
+        video_path: Path to the uploaded video
+        hold_frames: How long known boxes may be reused (frames)
+    """
+
+    def __init__(self, video_path, hold_frames=REPLAY_HOLD_FRAMES, digest=None):
+        """
+        Initialize the store.
+
+        Parameters:
+            video_path: Path to the uploaded video
+            hold_frames: Reuse window for boxes (default REPLAY_HOLD_FRAMES)
+            digest: Content hash of the video, if already known
+        """
+        self.video_path = str(video_path)
+        self.hold_frames = max(1, hold_frames)
+
+        # frame_index -> tuple of (x1, y1, x2, y2, conf)
+        self._frames = {}
+
+        self._digest = digest
+        self._seeded = False
+
+        # Where the boxes came from
+        self._from_analysis = 0
+        self._detected = 0
+
+        self._lock = threading.Lock()
+
+    def seed_from_analysis(self):
+        """
+        Load the empty frames of the upload analysis, once it is cached.
+
+        Frames where the analysis found people are left out: their
+        cascade boxes may miss people the full-resolution detection of
+        the stream would show.
+
+        Safe to call repeatedly - does nothing after the first success.
+
+        Returns:
+            True if the store is seeded
+        """
+        if self._seeded:
+            return True
+
+        cache = get_analysis_cache()
+        if not cache.enabled:
+            return False
+
+        if self._digest is None:
+            self._digest = file_digest(self.video_path)
+
+        entry = cache.load(self._digest, detector_fingerprint(ANALYSIS_CONF))
+        if entry is None:
+            return False
+
+        with self._lock:
+            for index, boxes in entry["frames"].items():
+                if not boxes and index not in self._frames:
+                    self._frames[index] = ()
+                    self._from_analysis += 1
+            self._seeded = True
+
+        return True
+
+    def get(self, frame_index):
+        """
+        Get the stored boxes of a frame.
+
+        Returns:
+            Tuple of boxes, or None if the frame was never detected
+        """
+        with self._lock:
+            return self._frames.get(frame_index)
+
+    def put(self, frame_index, boxes):
+        """
+        Store the boxes the stream detected for a frame.
+
+        Returns:
+            The stored (compact) boxes
+        """
+        boxes = _compact_boxes(boxes)
+        with self._lock:
+            if frame_index not in self._frames:
+                self._detected += 1
+            self._frames[frame_index] = boxes
+        return boxes
+
+    def boxes_for(self, frame_index, frame, detect, held=None):
+        """
+        Get the boxes to show for a frame, detecting only if needed.
+
+        Parameters:
+            frame_index: Index of the frame in the video
+            frame: The decoded frame (passed to detect if needed)
+            detect: function(frame) -> [(x1, y1, x2, y2, conf), ...]
+            held: (frame_index, boxes) returned for the previous frame
+
+        Returns:
+            (boxes, held) - pass held back in for the next frame
+        """
+        stored = self.get(frame_index)
+        if stored is not None:
+            return stored, (frame_index, stored)
+
+        # Recent boxes are still good enough
+        if held is not None and 0 <= frame_index - held[0] < self.hold_frames:
+            return held[1], held
+
+        boxes = self.put(frame_index, detect(frame))
+        return boxes, (frame_index, boxes)
+
+    def stats(self):
+        """
+        Get the store size.
+
+        Returns:
+            Dictionary with frames stored, from the analysis and detected
+            by the stream
+        """
+        with self._lock:
+            return {
+                "frames": len(self._frames),
+                "from_analysis": self._from_analysis,
+                "detected": self._detected,
+                "seeded": self._seeded
+            }
+
+
+def annotate_frame(frame, boxes, light, scale=1.0):
+    """
+    Draw person boxes and the occupancy/power overlay on a frame.
+
+    Parameters:
+        frame: BGR frame (drawn on in place)
+        boxes: (x1, y1, x2, y2, conf) boxes in original video pixels
+        light: Whether the simulated light is on
+        scale: Size of frame relative to the original video
+    """
+    import cv2
+
+    # Draw bounding boxes for each detected person
+    for x1, y1, x2, y2, confidence in boxes:
+        x1, y1, x2, y2 = (int(value * scale) for value in (x1, y1, x2, y2))
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        label = f"Person {confidence:.2f}"
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+    people_count = len(boxes)
+
+    # Draw overlay with status information
+    cv2.rectangle(frame, (0, 0), (400, 90), (0, 0, 0), -1)
+    cv2.putText(frame, f"People: {people_count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+
+    # Draw occupancy status
+    status_color = (0, 0, 255) if people_count > 0 else (0, 255, 0)
+    occupancy_text = "OCCUPIED" if people_count > 0 else "EMPTY"
+    cv2.putText(frame, occupancy_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, status_color, 2)
+
+    # Draw power status
+    light_color = (0, 255, 0) if light else (0, 0, 255)
+    light_text = "💡 ON" if light else "💡 OFF"
+    cv2.putText(frame, light_text, (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, light_color, 2)
+
+
+# =============================================================================
+# Global Replay Registry
+# =============================================================================
+# One store per uploaded video, shared by every stream of that video.
+# =============================================================================
+
+# Stores by video path
+_replays = {}
+
+# Lock for the registry
+_replays_lock = threading.Lock()
+
+
+def get_replay(video_path, digest=None):
+    """
+    Get the detection store of a video, creating it on first use.
+
+    Parameters:
+        video_path: Path to the uploaded video
+        digest: Content hash of the video, if already known (spares
+                hashing the file again to look up the analysis cache)
+
+    Returns:
+        ReplayDetections instance
+    """
+    with _replays_lock:
+        replay = _replays.get(str(video_path))
+        if replay is None:
+            replay = ReplayDetections(video_path, digest=digest)
+            _replays[str(video_path)] = replay
+        return replay
+
+
+def drop_replay(video_path):
+    """Forget the detections of a video (when its session is cleaned up)."""
+    with _replays_lock:
+        _replays.pop(str(video_path), None)
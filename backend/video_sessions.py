@@ -0,0 +1,403 @@
+# =============================================================================
+# Video Session Module
+# =============================================================================
+# This file tracks uploaded-video sessions and cleans up the ones that
+# clients abandon.
+#
+# A session owns the uploaded temp file, the occupancy state shown by
+# /api/video/status, the replay detections (video_replay.py) and the
+# pre-rendered proxy (video_proxy.py). Removing a session deletes all of
+# them.
+#
+# Lifecycle:
+#   - Every access (stream frame, status poll, job poll) refreshes the
+#     session's last-access time
+#   - A session idle for longer than its TTL is removed by a background
+#     reaper thread (every VIDEO_SESSION_REAP_SECONDS)
+#   - Creating a session past the quotas (VIDEO_SESSION_MAX sessions,
+#     VIDEO_SESSION_MAX_MB on disk) first evicts the least recently used
+#     idle sessions; a single upload larger than the disk quota is
+#     refused with SessionQuotaError
+#   - A session is busy while a stream is open or one of its jobs
+#     (analysis, proxy render) is queued or running: busy sessions are
+#     never evicted or expired. If only busy sessions could make room,
+#     the new upload is refused with SessionBusyError instead.
+# =============================================================================
+
+import os
+import threading
+import time
+import uuid
+
+from .video_proxy import drop_proxy, get_proxy
+from .video_replay import drop_replay
+
+# Default limits (overridable through environment variables)
+VIDEO_SESSION_TTL = float(os.environ.get("VIDEO_SESSION_TTL", "3600"))
+VIDEO_SESSION_MAX = int(os.environ.get("VIDEO_SESSION_MAX", "20"))
+VIDEO_SESSION_MAX_MB = float(os.environ.get("VIDEO_SESSION_MAX_MB", "2048"))
+VIDEO_SESSION_REAP_SECONDS = float(os.environ.get("VIDEO_SESSION_REAP_SECONDS", "60"))
+
+
+class SessionQuotaError(RuntimeError):
+    """Raised when an upload can't fit in the session disk quota."""
+
+
+class SessionBusyError(SessionQuotaError):
+    """Raised when the quotas are full and every session is in use."""
+
+
+class VideoSession:
+    """
+    One uploaded video and its stream state.
+
+    Attributes:
+        session_id: Unique session identifier
+        video_path: Path to the uploaded temp file
+        room_id: Room ID used for the energy simulation
+        ttl: Idle seconds before the session expires
+        occupancy: Occupancy state of the stream (see /api/video/status)
+        viewers: Streams currently open
+        jobs: Background jobs on the video that are queued or running
+        digest: Content hash of the video (None if not hashed on upload)
+    """
+
+    def __init__(self, video_path, room_id="UploadedVideo", ttl=VIDEO_SESSION_TTL, session_id=None,
+                 digest=None):
+        self.session_id = session_id or str(uuid.uuid4())
+        self.video_path = str(video_path)
+        self.room_id = room_id
+        self.ttl = ttl
+        self.digest = digest
+
+        self.created_at = time.time()
+        self.last_access = self.created_at
+
+        self.occupancy = {
+            "occupied": False,
+            "person_count": 0,
+            "light": False,
+            "ac": False,
+            "room_id": room_id
+        }
+        self.viewers = 0
+        self.jobs = 0
+        self._viewers_lock = threading.Lock()
+
+        self.file_bytes = os.path.getsize(self.video_path) if os.path.exists(self.video_path) else 0
+
+    def touch(self, now=None):
+        """Mark the session as used."""
+        self.last_access = time.time() if now is None else now
+
+    def add_viewer(self, delta=1):
+        """Count a stream opening (+1) or closing (-1)."""
+        with self._viewers_lock:
+            self.viewers = max(0, self.viewers + delta)
+        self.touch()
+
+    def add_job(self, delta=1):
+        """Count a job on the video being queued (+1) or finishing (-1)."""
+        with self._viewers_lock:
+            self.jobs = max(0, self.jobs + delta)
+        self.touch()
+
+    @property
+    def busy(self):
+        """Whether a stream is open or a job still needs the video."""
+        return self.viewers > 0 or self.jobs > 0
+
+    def expired(self, now=None):
+        """Whether the session has been idle for longer than its TTL."""
+        now = time.time() if now is None else now
+        return not self.busy and now - self.last_access > self.ttl
+
+    def disk_bytes(self):
+        """Bytes on disk: the upload plus its proxy segment file."""
+        proxy = get_proxy(self.session_id)
+        return self.file_bytes + (proxy.stats()["bytes"] if proxy else 0)
+
+    def to_dict(self, now=None):
+        now = time.time() if now is None else now
+        return {
+            "session_id": self.session_id,
+            "room_id": self.room_id,
+            "digest": self.digest,
+            "bytes": self.disk_bytes(),
+            "viewers": self.viewers,
+            "jobs": self.jobs,
+            "age_seconds": round(now - self.created_at, 1),
+            "idle_seconds": round(now - self.last_access, 1),
+            "ttl_seconds": self.ttl
+        }
+
+
+class SessionManager:
+    """
+    Registry of uploaded-video sessions with TTLs, quotas and LRU eviction.
+
+    Attributes:
+        ttl: Default session TTL (seconds)
+        max_sessions: Session count quota
+        max_bytes: Disk quota for uploads and proxies
+    """
+
+    def __init__(self, ttl=VIDEO_SESSION_TTL, max_sessions=VIDEO_SESSION_MAX,
+                 max_mb=VIDEO_SESSION_MAX_MB, reap_seconds=VIDEO_SESSION_REAP_SECONDS):
+        """
+        Initialize the session manager.
+
+        Parameters:
+            ttl: Default idle TTL in seconds (default VIDEO_SESSION_TTL)
+            max_sessions: Maximum sessions (default VIDEO_SESSION_MAX)
+            max_mb: Disk quota in megabytes (default VIDEO_SESSION_MAX_MB)
+            reap_seconds: Reaper interval (default VIDEO_SESSION_REAP_SECONDS)
+        """
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.reap_seconds = reap_seconds
+
+        # Sessions by ID, in creation order
+        self._sessions = {}
+
+        # Removed sessions by reason
+        self._removed = {"cleanup": 0, "expired": 0, "evicted": 0}
+
+        self._lock = threading.Lock()
+
+        self._reaper = None
+        self._stop = threading.Event()
+
+    def create(self, video_path, room_id="UploadedVideo", ttl=None, digest=None, jobs=0):
+        """
+        Register an uploaded video, evicting idle sessions if over quota.
+
+        Parameters:
+            video_path: Path to the uploaded temp file
+            room_id: Room ID for the energy simulation
+            ttl: Idle TTL in seconds (default: the manager's ttl)
+            digest: Content hash of the video, if known
+            jobs: Jobs about to be queued on the video (the session is
+                  busy from the start; each job calls add_job(-1) when
+                  it finishes)
+
+        Returns:
+            VideoSession instance
+
+        Raises:
+            SessionQuotaError: If the upload alone exceeds the disk quota
+            SessionBusyError: If evicting every idle session isn't enough
+        """
+        session = VideoSession(video_path, room_id, self.ttl if ttl is None else ttl, digest=digest)
+        session.jobs = jobs
+
+        if session.file_bytes > self.max_bytes:
+            raise SessionQuotaError(
+                f"Video is larger than the upload quota ({self.max_bytes // (1024 * 1024)} MB)"
+            )
+
+        with self._lock:
+            evicted = self._make_room(session.file_bytes)
+            self._sessions[session.session_id] = session
+
+        for old in evicted:
+            self._release(old)
+
+        return session
+
+    def _make_room(self, incoming_bytes):
+        """
+        Pick LRU idle sessions to evict so a new one fits (lock held).
+
+        Raises:
+            SessionBusyError: If the new session doesn't fit even with
+                              every idle session evicted (nothing is
+                              evicted then)
+        """
+        sizes = {s.session_id: s.disk_bytes() for s in self._sessions.values()}
+        count = len(self._sessions)
+        total = sum(sizes.values())
+
+        # Busy sessions are never evicted; idle ones go least recently
+        # used first
+        idle = sorted((s for s in self._sessions.values() if not s.busy),
+                      key=lambda s: s.last_access)
+
+        evicted = []
+        for session in idle:
+            if count < self.max_sessions and total + incoming_bytes <= self.max_bytes:
+                break
+            evicted.append(session)
+            count -= 1
+            total -= sizes[session.session_id]
+
+        if count >= self.max_sessions or total + incoming_bytes > self.max_bytes:
+            raise SessionBusyError(
+                "All video sessions are in use (streaming or being analyzed), try again later"
+            )
+
+        for session in evicted:
+            del self._sessions[session.session_id]
+            self._removed["evicted"] += 1
+
+        return evicted
+
+    def get(self, session_id, touch=True):
+        """
+        Get a live session.
+
+        Parameters:
+            session_id: Session ID
+            touch: Refresh the last-access time
+
+        Returns:
+            VideoSession instance, or None if unknown or expired
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+
+            if not session.expired():
+                if touch:
+                    session.touch()
+                return session
+
+            # Expired but not reaped yet
+            del self._sessions[session_id]
+            self._removed["expired"] += 1
+
+        self._release(session)
+        return None
+
+    def sessions(self):
+        """List live sessions, oldest first."""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def remove(self, session_id, reason="cleanup"):
+        """
+        Remove a session and delete its files.
+
+        Returns:
+            True if the session existed
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._removed[reason] = self._removed.get(reason, 0) + 1
+
+        self._release(session)
+        return True
+
+    def _release(self, session):
+        """Delete everything a removed session owns."""
+        try:
+            if os.path.exists(session.video_path):
+                os.remove(session.video_path)
+        except OSError as e:
+            print(f"Error cleaning up video: {e}")
+
+        drop_replay(session.video_path)
+        drop_proxy(session.session_id)
+
+    def reap(self, now=None):
+        """
+        Remove every expired session.
+
+        Returns:
+            Number of sessions removed
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [s for s in self._sessions.values() if s.expired(now)]
+            for session in expired:
+                del self._sessions[session.session_id]
+                self._removed["expired"] += 1
+
+        for session in expired:
+            self._release(session)
+
+        return len(expired)
+
+    def start_reaper(self):
+        """Start the background reaper thread (once)."""
+        if self._reaper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.reap_seconds):
+                removed = self.reap()
+                if removed:
+                    print(f"🧹 Removed {removed} expired video session(s)")
+
+        self._reaper = threading.Thread(target=run, name="video-session-reaper", daemon=True)
+        self._reaper.start()
+
+    def shutdown(self):
+        """Stop the reaper and remove every session."""
+        self._stop.set()
+        for session in self.sessions():
+            self.remove(session.session_id, reason="shutdown")
+
+    def stats(self):
+        """
+        Get session usage.
+
+        Returns:
+            Dictionary with quotas, totals, removals by reason and sessions
+        """
+        now = time.time()
+        sessions = [session.to_dict(now) for session in self.sessions()]
+        with self._lock:
+            removed = dict(self._removed)
+        return {
+            "sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "bytes": sum(session["bytes"] for session in sessions),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "removed": removed,
+            "evictions": removed["evicted"],
+            "active": sessions
+        }
+
+
+# =============================================================================
+# Global Session Manager
+# =============================================================================
+# One manager for the whole API process, created on first use.
+# =============================================================================
+
+# The shared session manager (None until first use)
+_session_manager = None
+
+# Lock for creating/replacing the session manager
+_session_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    """
+    Get the process-wide session manager, creating it on first use.
+
+    Returns:
+        SessionManager instance
+    """
+    global _session_manager
+
+    with _session_manager_lock:
+        if _session_manager is None:
+            _session_manager = SessionManager()
+        return _session_manager
+
+
+def shutdown_session_manager():
+    """Remove every session and stop the reaper (called when the API stops)."""
+    global _session_manager
+
+    with _session_manager_lock:
+        if _session_manager is not None:
+            _session_manager.shutdown()
+            _session_manager = None
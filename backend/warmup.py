@@ -0,0 +1,142 @@
+# =============================================================================
+# Detector Warm-up Module
+# =============================================================================
+# This file loads and warms the detectors in the background at startup.
+#
+# Without warm-up, the first request that needs a detector (e.g.
+# /api/cctv/connect) blocks while YOLO loads from disk and the first
+# inferences initialize the runtime. Here that cost is paid once, in a
+# background thread started by the API's lifespan handler:
+#   1. Each configured backend is loaded into the detector registry and
+#      pinned (so it stays loaded when no room is using it)
+#   2. A few dummy inferences run at every input size the app uses
+#      (full size and the occupancy cascade's low-resolution pass)
+#
+# GET /api/ready reports the progress. Handlers started before warm-up is
+# done simply wait for the same load (the registry loads each detector
+# only once) instead of starting a second one.
+#
+# Set DETECTOR_WARMUP=0 to skip warm-up (e.g. for API-only development).
+# =============================================================================
+
+import os
+import threading
+import time
+
+from .detector_registry import get_registry
+
+# Warm-up settings (overridable through environment variables)
+WARMUP_ENABLED = os.environ.get("DETECTOR_WARMUP", "1") not in ("0", "false", "False")
+WARMUP_RUNS = int(os.environ.get("DETECTOR_WARMUP_RUNS", "3"))
+
+
+def warm_detector(backend, runs=WARMUP_RUNS):
+    """
+    Load one backend's detector, pin it and run dummy inferences.
+
+    Parameters:
+        backend: Inference backend name (see person_detect.BACKENDS)
+        runs: Dummy inferences per input size
+
+    Returns:
+        Seconds the warm-up took
+
+    Raises:
+        FileNotFoundError: If the model (or INT8 build) is missing
+        ValueError: If the backend is not supported
+    """
+    import numpy as np
+    from .person_detect import CASCADE_IMGSZ, EXPORT_IMGSZ, get_backend
+
+    backend = get_backend(backend)
+    start = time.perf_counter()
+
+    detector = get_registry().warm(backend=backend)
+
+    # Gray frames at each input size the app runs the model with
+    for imgsz in (EXPORT_IMGSZ, CASCADE_IMGSZ):
+        frame = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+        for _ in range(runs):
+            detector(frame, conf=0.4, classes=[0], imgsz=imgsz, verbose=False)
+
+    return time.perf_counter() - start
+
+
+# =============================================================================
+# Global Readiness State
+# =============================================================================
+# One entry per backend: "warming", "ready" or "failed". The API reports
+# ready once every requested backend has finished warming.
+# =============================================================================
+
+# Dictionary of backend -> {"status", "seconds", "error"}
+_readiness = {}
+
+# Lock for thread-safe access to the readiness dictionary
+_readiness_lock = threading.Lock()
+
+
+def _warm_all(backends):
+    """Warm-up thread body - warms the backends one after the other."""
+    for backend in backends:
+        try:
+            seconds = warm_detector(backend)
+            state = {"status": "ready", "seconds": round(seconds, 2), "error": None}
+            print(f"✅ Detector '{backend}' warm ({seconds:.1f}s)")
+        except Exception as e:
+            state = {"status": "failed", "seconds": None, "error": str(e)}
+            print(f"⚠️ Could not warm detector '{backend}': {e}")
+
+        with _readiness_lock:
+            _readiness[backend] = state
+
+
+def start_warmup(backends):
+    """
+    Warm detectors in a background thread.
+
+    Backends that are already warm or warming are skipped.
+
+    Parameters:
+        backends: Iterable of backend names
+
+    Returns:
+        The thread doing the warm-up, or None if there was nothing to do
+    """
+    if not WARMUP_ENABLED:
+        return None
+
+    with _readiness_lock:
+        pending = [
+            backend for backend in dict.fromkeys(backends)
+            if _readiness.get(backend, {}).get("status") not in ("warming", "ready")
+        ]
+        for backend in pending:
+            _readiness[backend] = {"status": "warming", "seconds": None, "error": None}
+
+    if not pending:
+        return None
+
+    thread = threading.Thread(target=_warm_all, args=(pending,), daemon=True)
+    thread.start()
+    return thread
+
+
+def get_readiness():
+    """
+    Get the warm-up state of every backend.
+
+    Returns:
+        Dictionary with "ready" (True once no backend is still warming
+        and none failed) and per-backend states
+    """
+    with _readiness_lock:
+        detectors = {backend: dict(state) for backend, state in _readiness.items()}
+
+    ready = all(state["status"] == "ready" for state in detectors.values())
+
+    return {
+        "ready": ready or not WARMUP_ENABLED,
+        "warmup_enabled": WARMUP_ENABLED,
+        "detectors": detectors
+    }
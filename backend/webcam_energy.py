@@ -29,9 +29,11 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 # Import person detection module
 try:
-    from .person_detect import count_people, get_model
+    from .person_detect import count_people
+    from .detector_registry import acquire_detector, release_detector
 except Exception:
-    from backend.person_detect import count_people, get_model
+    from backend.person_detect import count_people
+    from backend.detector_registry import acquire_detector, release_detector
 
 # API endpoint for sending occupancy updates
 API_URL = "http://127.0.0.1:8002/api/occupancy"
@@ -73,9 +75,9 @@ def run_webcam_energy_ai(room_id, stop_event, camera_index=0, show_video=True):
     print(f"✅ Camera opened successfully for '{room_id}'")
     print(f"Camera window display: {'ENABLED' if show_video else 'DISABLED'}")
     
-    # Load the YOLO model
+    # Get the shared YOLO model (released again when the loop stops)
     try:
-        model = get_model()
+        model = acquire_detector()
     except Exception as e:
         print(f"Error loading YOLO: {e}")
         cap.release()
@@ -222,6 +224,7 @@ def run_webcam_energy_ai(room_id, stop_event, camera_index=0, show_video=True):
         # Clean up
         print(f"Stopping AI for '{room_id}'")
         cap.release()
+        release_detector(model)
         if show_video:
             cv2.destroyAllWindows()
 
@@ -6,27 +6,37 @@
 # Main features:
 #   - WebcamStreamProcessor class manages local webcam capture
 #   - Runs YOLO person detection on frames
+#     (batched with other streams by the inference scheduler)
 #   - Draws bounding boxes around detected persons
-#   - Provides MJPEG-encoded frames for web streaming
+#   - Provides MJPEG-encoded frames for web streaming (each frame
+#     encoded once and shared by all viewers, see frame_broadcast.py)
 #   - Tracks occupancy changes and controls energy (lights, AC)
 #
 # Performance optimizations:
-#   - Frame skipping: Only run YOLO every Nth frame
+#   - Adaptive rate: YOLO every Nth frame while the room is changing,
+#     only every few seconds once it has settled
+#   - Motion gate: Skip YOLO entirely while the scene is static
+#   - Tracker: Boxes and counts are carried between detections
+#   - Region of interest: Only the room's part of the view is detected
 #   - Frame resizing: Smaller frames for faster detection
 #   - JPEG quality: Lower quality for faster encoding
 #
 # Used for demo/testing without professional CCTV hardware.
 # =============================================================================
 
-import cv2
-import numpy as np
 import threading
-from ultralytics import YOLO
-from pathlib import Path
 
-# Path to YOLO model file
-BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_PATH = BASE_DIR / "yolov8n.pt"
+from .detector_registry import MODEL_PATH, acquire_detector, release_detector
+from .inference_scheduler import get_scheduler, unregister_source
+from .motion_gate import create_motion_gate, remove_motion_gate
+from .detection_rate import create_rate_controller, remove_rate_controller
+from .frame_broadcast import FrameBroadcaster
+from .person_detect import result_boxes
+from .roi import RegionOfInterest, detect_in_roi
+from .tracker import PersonTracker
+
+# Detection confidence threshold for the webcam
+DETECTION_CONF = 0.4
 
 
 class WebcamStreamProcessor:
@@ -43,7 +53,7 @@ class WebcamStreamProcessor:
     Attributes:
         camera_index: Index of the webcam to use (usually 0)
         room_id: Identifier for the room being monitored
-        model: YOLO detection model
+        model: Shared YOLO detection model (from the detector registry)
         cap: OpenCV video capture object
         current_frame: Latest processed frame with annotations
         person_count: Number of people detected
@@ -56,20 +66,33 @@ class WebcamStreamProcessor:
         occupancy_callback: Function to call when occupancy changes
     """
     
-    def __init__(self, camera_index=0, room_id="Webcam"):
+    def __init__(self, camera_index=0, room_id="Webcam", detection_policy=None,
+                 roi_polygon=None):
         """
         Initialize the webcam stream processor.
         
         Parameters:
             camera_index: Index of the webcam to use (default 0)
             room_id: Identifier for the room being monitored
+            detection_policy: Adaptive detection rate overrides
+                              (see detection_rate.DEFAULT_POLICY)
+            roi_polygon: Room's region of interest as normalized [x, y]
+                         points (None/empty = whole frame)
         """
         # Store configuration
         self.camera_index = camera_index
         self.room_id = room_id
+        self.detection_policy = dict(detection_policy or {})
+        
+        # Region of interest (None = whole frame)
+        self.roi = RegionOfInterest.from_config(roi_polygon)
+        
+        # Shared YOLO model (one copy for all processors)
+        self.model = acquire_detector(MODEL_PATH)
         
-        # Load YOLO model
-        self.model = YOLO(MODEL_PATH)
+        # Set when a stop timed out waiting for the processing thread:
+        # the thread releases the model itself when it exits
+        self._release_model_on_exit = False
         
         # Video capture (None until connected)
         self.cap = None
@@ -93,13 +116,28 @@ class WebcamStreamProcessor:
         self.occupied = False
         self.occupancy_callback = None
         
+        # Identifier of this stream in the inference scheduler
+        self.scheduler_source = f"webcam:{room_id}"
+        
+        # Motion gate and person tracker (created when streaming starts).
+        # Between detections the tracker's predicted boxes are drawn.
+        self.motion_gate = None
+        self.tracker = None
+        
+        # Adaptive detection rate (created when streaming starts)
+        self.detection_rate = None
+        
         # Performance optimization settings
-        self.frame_skip = 3           # Process every Nth frame for YOLO
+        self.frame_skip = 5           # Process every Nth frame for YOLO (while unsettled,
+                                      # the tracker fills in the frames between)
         self.frame_count = 0          # Counter for frame skipping
         self.jpeg_quality = 60        # JPEG quality (lower = faster)
         self.target_fps = 25          # Target FPS for streaming
         self.resize_factor = 0.6      # Resize frames to 60% for faster processing
         
+        # JPEG encoding of the current frame, shared by all viewers
+        self.frames = FrameBroadcaster(self.jpeg_quality)
+        
     def connect(self):
         """
         Connect to webcam.
@@ -110,6 +148,8 @@ class WebcamStreamProcessor:
             True if connection successful
             False if connection failed
         """
+        import cv2
+
         try:
             # Open video capture
             self.cap = cv2.VideoCapture(self.camera_index)
@@ -149,6 +189,11 @@ class WebcamStreamProcessor:
             print("Webcam stream already running")
             return
         
+        # Re-acquire the shared model if it was released by a previous stop
+        self._release_model_on_exit = False
+        if self.model is None:
+            self.model = acquire_detector(MODEL_PATH)
+        
         # Connect if not connected
         if self.cap is None:
             if not self.connect():
@@ -157,9 +202,25 @@ class WebcamStreamProcessor:
         # Mark as running
         self.is_running = True
         
+        # Join the cross-camera inference batch
+        get_scheduler().register_source(self.scheduler_source)
+        
+        # Skip detection while the scene is static, and sample less
+        # often once the room has settled. Unsettled rooms keep the
+        # old "every Nth frame" rate.
+        self.motion_gate = create_motion_gate(self.scheduler_source)
+        policy = {"fast_interval": self.frame_skip / self.target_fps}
+        policy.update(self.detection_policy)
+        self.detection_rate = create_rate_controller(
+            self.scheduler_source,
+            DETECTION_CONF,
+            **policy
+        )
+        self.tracker = PersonTracker()
+        
         # Create and start processing thread
         self.processing_thread = threading.Thread(
-            target=self._process_stream,
+            target=self._run_processing_thread,
             daemon=True
         )
         self.processing_thread.start()
@@ -171,7 +232,7 @@ class WebcamStreamProcessor:
         Stop streaming.
         
         Signals the processing thread to stop, waits for it,
-        and releases the camera.
+        releases the camera and the shared model reference.
         """
         # Signal thread to stop
         self.is_running = False
@@ -180,6 +241,13 @@ class WebcamStreamProcessor:
         if self.processing_thread:
             self.processing_thread.join(timeout=5)
         
+        # Leave the inference batch
+        unregister_source(self.scheduler_source)
+        
+        # Stop reporting motion and detection rate statistics
+        remove_motion_gate(self.motion_gate)
+        remove_rate_controller(self.detection_rate)
+        
         # Release camera
         if self.cap:
             self.cap.release()
@@ -187,9 +255,32 @@ class WebcamStreamProcessor:
         
         # Clear current frame
         self.current_frame = None
+        self.frames.clear()
+        
+        # Release the shared model (unloaded when no processor uses it), unless
+        # the thread is still finishing a frame with it
+        thread = self.processing_thread
+        if thread is not None and thread.is_alive():
+            self._release_model_on_exit = True
+        else:
+            self._release_model()
         
         print("Stopped webcam stream")
     
+    def _release_model(self):
+        """Drop this processor's reference to the shared model."""
+        model, self.model = self.model, None
+        release_detector(model)
+    
+    def _run_processing_thread(self):
+        """Thread body: the processing loop, then a deferred model release."""
+        try:
+            self._process_stream()
+        finally:
+            if self._release_model_on_exit and not self.is_running:
+                self._release_model_on_exit = False
+                self._release_model()
+    
     def _process_stream(self):
         """
         Main loop for processing stream frames.
@@ -197,7 +288,8 @@ class WebcamStreamProcessor:
         This runs in a background thread and:
             1. Limits FPS for smooth streaming
             2. Reads frames from camera
-            3. Runs YOLO detection (with frame skipping)
+            3. Runs YOLO detection on the ROI crop (adaptive rate and
+               motion gate)
             4. Updates energy controls based on occupancy
             5. Annotates frames for streaming
         """
@@ -230,22 +322,27 @@ class WebcamStreamProcessor:
                 # Increment frame counter
                 self.frame_count += 1
                 
-                # Only run YOLO detection on every Nth frame (performance optimization)
-                if self.frame_count % self.frame_skip == 0:
-                    # Optionally resize frame for faster YOLO processing
-                    if self.resize_factor < 1.0:
-                        h, w = frame.shape[:2]
-                        new_w = int(w * self.resize_factor)
-                        new_h = int(h * self.resize_factor)
-                        detection_frame = cv2.resize(frame, (new_w, new_h))
-                    else:
-                        detection_frame = frame
+                # Only motion inside the room's ROI matters
+                roi = self.roi
+                gate_frame = roi.crop(frame)[0] if roi else frame
+                
+                # Only run YOLO detection when the adaptive rate says a check
+                # is due and something moved (performance optimization)
+                if self.detection_rate.should_check() and self.motion_gate.should_detect(gate_frame):
+                    # Run YOLO on the ROI crop, resized for faster processing.
+                    # Boxes come back in full-frame coordinates.
+                    detections = detect_in_roi(frame, roi, self._detect, self.resize_factor)
                     
-                    # Run YOLO detection
-                    results = self.model(detection_frame, conf=0.4, classes=[0], verbose=False)
+                    # Feed the raw result to the adaptive rate controller
+                    self.detection_rate.record(
+                        len(detections),
+                        [box[4] for box in detections]
+                    )
                     
-                    # Count detected persons
-                    person_count = len(results[0].boxes) if results[0] else 0
+                    # Match the detections to the tracked people and count
+                    # them (one-frame flickers are ignored)
+                    boxes = self.tracker.update(detections)
+                    person_count = self.tracker.count()
                     
                     # Determine if room is occupied
                     is_occupied = person_count > 0
@@ -288,60 +385,103 @@ class WebcamStreamProcessor:
                         # Annotate frame with detection results
                         self.current_frame = self._annotate_frame(
                             frame, 
-                            results, 
-                            person_count, 
-                            detection_frame
+                            boxes, 
+                            person_count
                         )
+                        annotated = self.current_frame
                 else:
-                    # For skipped frames, keep using previous detection results
+                    # For skipped frames, draw the tracked boxes moved to
+                    # where the people should be now
                     with self.lock:
-                        if self.current_frame is not None:
-                            pass  # Keep previous frame
+                        self.current_frame = self._annotate_frame(
+                            frame,
+                            self.tracker.predict(),
+                            self.person_count
+                        )
+                        annotated = self.current_frame
+                
+                # Hand it to the viewers (encoded once, on first request)
+                self.frames.publish(annotated)
             
             except Exception as e:
                 print(f"❌ Error processing webcam frame: {e}")
                 continue
 
-    def _annotate_frame(self, frame, results, person_count, detection_frame=None):
+    def _detect(self, region):
+        """
+        Run person detection on a (cropped, resized) frame.
+        
+        Parameters:
+            region: Frame or ROI crop to run detection on
+        
+        Returns:
+            List of (x1, y1, x2, y2, conf) boxes in region pixels
+        """
+        # Run YOLO detection (batched with other streams)
+        results = get_scheduler().detect(
+            region,
+            self.scheduler_source,
+            detector=self.model,
+            conf=DETECTION_CONF,
+            classes=[0]
+        )
+        return result_boxes(results)
+    
+    def set_roi(self, roi_polygon):
+        """
+        Change the room's region of interest while streaming.
+        
+        Parameters:
+            roi_polygon: Normalized [x, y] points (None/empty = whole frame)
+        
+        Raises:
+            ValueError: If the polygon is invalid
+        """
+        self.roi = RegionOfInterest.from_config(roi_polygon)
+        
+        # Start over with a fresh background and an immediate detection
+        if self.motion_gate:
+            self.motion_gate.reset()
+        if self.tracker:
+            self.tracker.reset()
+
+    def _annotate_frame(self, frame, boxes, person_count):
         """
         Annotate frame with YOLO detection boxes and person count.
         
         Parameters:
             frame: Original video frame (full size)
-            results: YOLO detection results
+            boxes: (x1, y1, x2, y2, conf[, track_id]) boxes in
+                   full-frame pixels (tracked, or from roi.detect_in_roi)
             person_count: Number of detected persons
-            detection_frame: Resized frame used for detection (for scaling boxes)
         
         Returns:
             Annotated frame with bounding boxes and status overlay
         """
+        import cv2
+
         # Create copy to avoid modifying original
         annotated_frame = frame.copy()
         
-        # Calculate scale factor if frame was resized for detection
-        scale_factor = 1.0
-        if detection_frame is not None and self.resize_factor < 1.0:
-            scale_factor = 1.0 / self.resize_factor
+        # Outline the room's region of interest
+        if self.roi:
+            self.roi.draw(annotated_frame)
         
-        # Draw bounding boxes (scaled back to original frame size if needed)
-        if results[0] and results[0].boxes:
-            for box in results[0].boxes:
+        # Draw bounding boxes
+        if boxes:
+            for box in boxes:
                 # Get box coordinates
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                
-                # Scale coordinates back to original frame size
-                x1 = int(x1 * scale_factor)
-                y1 = int(y1 * scale_factor)
-                x2 = int(x2 * scale_factor)
-                y2 = int(y2 * scale_factor)
-                
-                confidence = box.conf[0]
+                x1, y1, x2, y2 = map(int, box[:4])
+                confidence = box[4]
                 
                 # Draw rectangle around person
                 cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
                 
-                # Draw confidence label
-                label = f"Person {confidence:.2f}"
+                # Draw confidence label (with the track ID when tracked)
+                if len(box) > 5:
+                    label = f"Person #{box[5]} {confidence:.2f}"
+                else:
+                    label = f"Person {confidence:.2f}"
                 label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
                 
                 # Draw label background
@@ -427,22 +567,54 @@ class WebcamStreamProcessor:
         """
         Get latest frame as JPEG bytes for streaming.
         
+        The frame is encoded once (at jpeg_quality, lower = faster) by
+        the first caller and shared with every other caller.
+        
         Returns:
             JPEG-encoded frame bytes, or None if no frame available
         """
-        with self.lock:
-            # Check if we have a frame
-            if self.current_frame is None:
-                return None
-            
-            # Encode with lower quality for faster streaming
-            encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
-            ret, buffer = cv2.imencode('.jpg', self.current_frame, encode_params)
-            
-            if ret:
-                return buffer.tobytes()
-                
-        return None
+        encoded = self.frames.latest()
+        return encoded.jpeg if encoded else None
+    
+    def get_broadcast_stats(self):
+        """
+        Get JPEG encode sharing statistics.
+        
+        Returns:
+            Dictionary with frames published, encoded and served
+        """
+        return self.frames.stats()
+    
+    def get_motion_stats(self):
+        """
+        Get motion gate statistics (how much inference was skipped).
+        
+        Returns:
+            Dictionary of gate counters, or None if not streaming
+        """
+        gate = self.motion_gate
+        return gate.stats() if gate else None
+    
+    def get_detection_rate(self):
+        """
+        Get adaptive detection rate statistics.
+        
+        Returns:
+            Dictionary with mode, interval and detections/sec,
+            or None if not streaming
+        """
+        controller = self.detection_rate
+        return controller.stats() if controller else None
+    
+    def get_tracking_stats(self):
+        """
+        Get person tracker statistics (active tracks, dwell times).
+        
+        Returns:
+            Dictionary of tracker state, or None if not streaming
+        """
+        tracker = self.tracker
+        return tracker.stats() if tracker else None
     
     def get_person_count(self):
         """
@@ -469,7 +641,8 @@ _webcam_processor = None
 _processor_lock = threading.Lock()
 
 
-def get_webcam_processor(camera_index=0, room_id="Webcam"):
+def get_webcam_processor(camera_index=0, room_id="Webcam", detection_policy=None,
+                         roi_polygon=None):
     """
     Get or create webcam processor.
     
@@ -478,6 +651,8 @@ def get_webcam_processor(camera_index=0, room_id="Webcam"):
     Parameters:
         camera_index: Index of webcam to use
         room_id: Room identifier
+        detection_policy: Adaptive detection rate overrides (new processor only)
+        roi_polygon: Room's region of interest (new processor only)
     
     Returns:
         WebcamStreamProcessor instance
@@ -486,11 +661,14 @@ def get_webcam_processor(camera_index=0, room_id="Webcam"):
     
     with _processor_lock:
         if _webcam_processor is None:
-            _webcam_processor = WebcamStreamProcessor(camera_index, room_id)
+            _webcam_processor = WebcamStreamProcessor(
+                camera_index, room_id, detection_policy, roi_polygon
+            )
         return _webcam_processor
 
 
-def start_webcam_stream(camera_index=0, room_id="Webcam"):
+def start_webcam_stream(camera_index=0, room_id="Webcam", detection_policy=None,
+                        roi_polygon=None):
     """
     Start webcam streaming.
     
@@ -499,8 +677,10 @@ def start_webcam_stream(camera_index=0, room_id="Webcam"):
     Parameters:
         camera_index: Index of webcam to use
         room_id: Room identifier
+        detection_policy: Adaptive detection rate overrides
+        roi_polygon: Room's region of interest (normalized [x, y] points)
     """
-    processor = get_webcam_processor(camera_index, room_id)
+    processor = get_webcam_processor(camera_index, room_id, detection_policy, roi_polygon)
     processor.start_streaming()
 
 
@@ -1,10 +1,34 @@
 import { useEffect, useMemo, useState } from "react";
-import { uploadVideo, getVideoStreamUrl, cleanupVideoSession, getVideoStreamStatus } from "./api";
+import { uploadVideo, getVideoJob, getVideoStreamUrl, cleanupVideoSession, getVideoStreamStatus } from "./api";
+
+// How often the analysis job is polled (ms)
+const JOB_POLL_INTERVAL = 1000;
+
+function describeJob(job) {
+  if (job.status === "queued") return "Queued for analysis...";
+  const percent = Math.round((job.progress?.fraction || 0) * 100);
+  const eta = job.eta_seconds != null ? ` - about ${Math.ceil(job.eta_seconds)}s left` : "";
+  return `Analyzing video... ${percent}%${eta}`;
+}
+
+async function waitForJob(jobId, onProgress) {
+  for (;;) {
+    const job = await getVideoJob(jobId);
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(job.error || "Analysis failed");
+    onProgress(job);
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL));
+  }
+}
 
 export default function VideoUpload({ rooms }) {
   const defaultRoom = rooms[0]?.id || "UploadedVideo";
   const [roomId, setRoomId] = useState(defaultRoom);
   const [frameSkip, setFrameSkip] = useState(5);
+  const [parallel, setParallel] = useState(false);
+  const [sampleSeconds, setSampleSeconds] = useState(0);
+  const [progressive, setProgressive] = useState(false);
+  const [proxy, setProxy] = useState(false);
   const [file, setFile] = useState(null);
   const [status, setStatus] = useState("Upload an mp4 or avi clip to see live detection");
   const [uploading, setUploading] = useState(false);
@@ -53,13 +77,17 @@ export default function VideoUpload({ rooms }) {
     }
 
     setUploading(true);
-    setStatus("Analyzing and processing video...");
+    setStatus("Uploading video...");
     setResult(null);
 
     try {
-      const data = await uploadVideo(roomId, file, frameSkip);
+      // The upload returns a background job - poll it until the analysis is done
+      const job = await uploadVideo(
+        roomId, file, frameSkip, parallel, sampleSeconds, progressive ? "progressive" : "dense", proxy
+      );
+      setSessionId(job.session_id);
+      const data = await waitForJob(job.job_id, (progress) => setStatus(describeJob(progress)));
       setResult(data);
-      setSessionId(data.session_id);
       setStatus("Analysis complete. Starting live stream...");
       setShowStream(true);
       setVideoStatus({
@@ -143,6 +171,49 @@ export default function VideoUpload({ rooms }) {
           />
         </label>
 
+        <label style={{ display: "flex", flexDirection: "column", gap: "6px", fontSize: "13px" }}>
+          Or sample every N seconds (0 = use frame skip)
+          <input
+            type="number"
+            min="0"
+            step="0.5"
+            value={sampleSeconds}
+            onChange={(e) => setSampleSeconds(Number(e.target.value))}
+            disabled={uploading}
+            style={{ padding: "10px", borderRadius: "6px", border: "1px solid #ccc", opacity: uploading ? 0.6 : 1 }}
+          />
+        </label>
+
+        <label style={{ display: "flex", alignItems: "center", gap: "6px", fontSize: "13px" }}>
+          <input
+            type="checkbox"
+            checked={parallel}
+            onChange={(e) => setParallel(e.target.checked)}
+            disabled={uploading}
+          />
+          Parallel analysis (long videos)
+        </label>
+
+        <label style={{ display: "flex", alignItems: "center", gap: "6px", fontSize: "13px" }}>
+          <input
+            type="checkbox"
+            checked={progressive}
+            onChange={(e) => setProgressive(e.target.checked)}
+            disabled={uploading}
+          />
+          Progressive analysis (coarse pass, then refine each change)
+        </label>
+
+        <label style={{ display: "flex", alignItems: "center", gap: "6px", fontSize: "13px" }}>
+          <input
+            type="checkbox"
+            checked={proxy}
+            onChange={(e) => setProxy(e.target.checked)}
+            disabled={uploading}
+          />
+          Pre-render stream (cheaper for many viewers)
+        </label>
+
         <label style={{ display: "flex", flexDirection: "column", gap: "6px", fontSize: "13px" }}>
           Video file (mp4 / avi / mov)
           <input
@@ -281,6 +352,28 @@ export default function VideoUpload({ rooms }) {
             <StatCard label="Video duration" value={`${result.duration_seconds}s @ ${result.fps} fps`} />
             <StatCard label="Occupied frames" value={`${result.occupied_frames}`} />
             <StatCard label="Occupancy ratio" value={`${Math.round(result.occupancy_ratio * 100)}%`} />
+            {result.progressive && (
+              <StatCard
+                label="Progressive"
+                value={`${result.progressive.transitions} changes, ${result.progressive.probes} probes`}
+              />
+            )}
+            {result.cache && (
+              <StatCard
+                label="Cache"
+                value={
+                  result.cache.hit
+                    ? "hit (no detection run)"
+                    : `${result.cache.detected_frames} detected, ${result.cache.reused_frames} reused`
+                }
+              />
+            )}
+            {result.sampling && (
+              <StatCard
+                label="Sampling"
+                value={`every ${result.sampling.stride_frames} frames (${result.sampling.strategy})`}
+              />
+            )}
           </div>
 
           {eventHighlights.length > 0 && (
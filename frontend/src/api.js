@@ -80,24 +80,84 @@ export async function getCctvStatus(roomId) {
     return apiFetch(`${BASE_URL}/api/cctv/status/${roomId}`);
 }
 
-export function getStreamUrl(roomId) {
-    return `${BASE_URL}/api/stream/${roomId}`;
+// Optional stream size/quality/rate, e.g. { maxWidth: 320, quality: 50, maxFps: 5 }
+// for thumbnails. Viewers asking for the same size and quality share one encode.
+function streamQuery({ maxWidth, quality, maxFps } = {}) {
+    const params = new URLSearchParams();
+    if (maxWidth) params.set("max_width", maxWidth);
+    if (quality) params.set("quality", quality);
+    if (maxFps) params.set("max_fps", maxFps);
+    const query = params.toString();
+    return query ? `?${query}` : "";
 }
 
-export async function uploadVideo(roomId, file, frameSkip = 5) {
-    const formData = new FormData();
-    formData.append("room_id", roomId || "UploadedVideo");
-    formData.append("frame_skip", frameSkip);
-    formData.append("file", file);
+export function getStreamUrl(roomId, options) {
+    return `${BASE_URL}/api/stream/${roomId}${streamQuery(options)}`;
+}
+
+export function getMosaicUrl(roomIds = [], { cols, tileWidth, fps } = {}) {
+    const params = new URLSearchParams();
+    if (roomIds.length) params.set("rooms", roomIds.join(","));
+    if (cols) params.set("cols", cols);
+    if (tileWidth) params.set("tile_width", tileWidth);
+    if (fps) params.set("fps", fps);
+    const query = params.toString();
+    return `${BASE_URL}/api/stream/mosaic${query ? `?${query}` : ""}`;
+}
+
+// Large videos are sent in chunks; a failed chunk is resent from the
+// offset the server reports (see /api/video/uploads)
+const UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 3;
+
+export async function uploadVideo(
+    roomId, file, frameSkip = 5, parallel = false, sampleSeconds = 0, mode = "dense", proxy = false
+) {
+    const upload = await apiFetch(`${BASE_URL}/api/video/uploads`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    const uploadUrl = `${BASE_URL}/api/video/uploads/${upload.upload_id}`;
 
-    return apiFetch(`${BASE_URL}/api/video/upload`, {
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+        try {
+            const state = await apiFetch(`${uploadUrl}?offset=${offset}`, {
+                method: "PUT",
+                body: file.slice(offset, offset + UPLOAD_CHUNK_BYTES),
+            });
+            offset = state.offset;
+            retries = 0;
+        } catch (error) {
+            if (++retries > UPLOAD_CHUNK_RETRIES) {
+                throw error;
+            }
+            offset = (await apiFetch(uploadUrl)).offset;
+        }
+    }
+
+    return apiFetch(`${uploadUrl}/complete`, {
         method: "POST",
-        body: formData,
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+            room_id: roomId || "UploadedVideo",
+            frame_skip: frameSkip,
+            parallel,
+            sample_seconds: sampleSeconds,
+            mode,
+            proxy,
+        }),
     });
 }
 
-export function getVideoStreamUrl(sessionId) {
-    return `${BASE_URL}/api/video/stream/${sessionId}`;
+export async function getVideoJob(jobId) {
+    return apiFetch(`${BASE_URL}/api/video/jobs/${jobId}`);
+}
+
+export function getVideoStreamUrl(sessionId, options) {
+    return `${BASE_URL}/api/video/stream/${sessionId}${streamQuery(options)}`;
 }
 
 export async function cleanupVideoSession(sessionId) {